@@ -0,0 +1,100 @@
+"""
+Compare the `skill_evaluation` dataset standardized with object columns (the
+previous schema) and with the compact dtypes of its schema: memory, and the
+groupbys and merge of the level evaluation and upgrade tracker reports.
+
+    python benchmarks/compact_dtypes.py [n_seasons]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from ginnastix_class.config.datasets import DATASETS
+from ginnastix_class.utils.validation import standardize
+
+COMPACT_DTYPES = ("category", "string[pyarrow]", "float32", "Int8", "Int16")
+
+
+def object_schema(schema):
+    return {
+        name: {k: v for k, v in spec.items() if v not in COMPACT_DTYPES}
+        for name, spec in schema.items()
+    }
+
+
+def skill_evaluation_frame(n_seasons):
+    """
+    Synthetic raw `skill_evaluation` sheet: each season, 150 athletes of three
+    levels are scored on about a hundred of 400 skills, three periods a season.
+    """
+    rng = np.random.default_rng(0)
+    events = np.array(["BB", "VT", "UB", "FX"])
+    skill_ids = np.array([f"{e}-{i:03d}" for e in events for i in range(100)])
+    frames = []
+    for season in range(n_seasons):
+        athletes = np.array([f"Athlete {season * 50 + i}" for i in range(150)])
+        for period in range(3):
+            n = 150 * 100
+            skills = rng.integers(0, len(skill_ids), n)
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "Period": f"{2022 + season}-P{period + 1}",
+                        "Event": events[skills // 100],
+                        "Skill": [f"skill {i}" for i in skills],
+                        "Variant": rng.choice(["", "left", "right"], n),
+                        "Athlete": athletes[rng.integers(0, 150, n)],
+                        "Score": rng.integers(0, 11, n) / 2,
+                        "Skill ID": skill_ids[skills],
+                        "Event Skill ID": skill_ids[skills],
+                        "Level": rng.choice(["XB", "XS", "XG"], n),
+                        "Status": rng.choice(["required", "optional", ""], n),
+                        "Inserted At": 45000 + season * 365 + period * 100.5,
+                    }
+                )
+            )
+    return pd.concat(frames, ignore_index=True), skill_ids
+
+
+def report_workload(df, skills_df):
+    df.groupby(
+        ["Level", "Athlete", "Event", "Skill ID"], as_index=False, observed=True
+    ).agg({"Score": "max"})
+    idx = (
+        df.sort_values(["Period", "Inserted At"], ascending=[True, False])
+        .groupby(["Athlete", "Skill ID"], observed=True)["Score"]
+        .idxmax()
+    )
+    pd.merge(skills_df, df.loc[idx], on="Skill ID", how="left")
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(n_seasons=4):
+    raw_df, skill_ids = skill_evaluation_frame(n_seasons)
+    skills_df = pd.DataFrame({"Skill ID": skill_ids})
+    schema = DATASETS["skill_evaluation"]["schema"]
+    print(f"{len(raw_df)} rows, {n_seasons} seasons")
+    for label, _schema in [("object", object_schema(schema)), ("compact", schema)]:
+        ingest = timed(standardize, raw_df, _schema, repeat=1)
+        df = standardize(raw_df, _schema)
+        memory = df.memory_usage(deep=True).sum() / 2**20
+        workload = timed(report_workload, df, skills_df)
+        print(
+            f"{label:>8}: {memory:7.1f} MiB, standardize {ingest:5.2f}s, "
+            f"report groupbys and merge {workload:5.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
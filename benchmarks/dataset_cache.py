@@ -0,0 +1,90 @@
+"""
+Compare loading a cached dataset from a pickle (the previous cache format) and
+from a memory-mapped Feather file, in full and with only the columns used by
+the behavior report. Each load runs in a fresh interpreter, as on a cold start.
+
+    python benchmarks/dataset_cache.py [n_rows]
+"""
+
+import pickle
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from gsheet_body import attendance_frame
+
+from ginnastix_class.utils.dataset_store import DatasetStore
+
+# Columns read by the behavior report (see DataReader)
+COLUMNS = [
+    "Athlete",
+    "Date",
+    "Attended Class Score",
+    "On Time Score",
+    "Prepared Score",
+    "Kind To Others Score",
+    "Listened To Instructions Score",
+    "Completed Assignments Score",
+    "Focused Mindset Score",
+    "Positive Attitude Score",
+    "Overall Behavior Score",
+]
+
+
+def rss():
+    # Current resident set size on Linux. Elsewhere, fall back to the peak
+    # (in bytes on macOS), which the child inherits from this process on Linux
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def load(case, data_dir):
+    store = DatasetStore("local", data_dir=data_dir)
+    rss_before = rss()
+    start = time.perf_counter()
+    if case == "pickle":
+        with open(Path(data_dir) / "attendance.pkl", "rb") as f:
+            df = pickle.load(f)
+    elif case == "feather":
+        df, _ = store.load_cached("attendance")
+    else:
+        df, _ = store.load_cached("attendance", columns=COLUMNS)
+    # Touch every value, as a report would
+    for name in df.columns:
+        df[name].to_numpy().sum() if df[name].dtype.kind in "fiu" else len(df[name])
+    elapsed = time.perf_counter() - start
+    print(elapsed, rss() - rss_before)
+
+
+def main(n_rows=1_000_000):
+    df, _ = attendance_frame(n_rows)
+    print(f"{n_rows} rows x {df.shape[1]} columns ({len(COLUMNS)} projected)")
+    with tempfile.TemporaryDirectory() as data_dir:
+        with open(Path(data_dir) / "attendance.pkl", "wb") as f:
+            pickle.dump(df, f)
+        DatasetStore("local", data_dir=data_dir).save("attendance", df)
+        for case in ["pickle", "feather", "feather (columns)"]:
+            out = subprocess.run(
+                [sys.executable, __file__, "--load", case, data_dir],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            elapsed, rss_increase = out.stdout.split()
+            print(
+                f"{case:>18}: {float(elapsed):6.3f}s, "
+                f"resident memory +{int(rss_increase) / 2**20:7.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--load"]:
+        load(*sys.argv[2:])
+    else:
+        main(*[int(arg) for arg in sys.argv[1:]])
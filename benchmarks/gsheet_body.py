@@ -0,0 +1,90 @@
+"""
+Compare the DataFrame to Sheets API serializer with the previous implementation
+(copy + `fillna("").astype(str)` + `values.tolist()` + `json.dumps` check).
+
+    python benchmarks/gsheet_body.py [n_rows]
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from ginnastix_class.config.datasets import DATASETS
+from ginnastix_class.utils.google_sheets import _dataframe_to_gsheet_body
+
+
+def legacy_dataframe_to_gsheet_body(df, include_columns=False, schema=None):
+    _df = df.copy()
+    for name, spec in (schema or {}).items():
+        if name in _df.columns and spec.get("format"):
+            _df[name] = _df[name].dt.strftime(spec["format"])
+    _df = _df.fillna("").astype(str)
+    values = _df.values.tolist()
+    if include_columns:
+        values = [list(_df.columns)] + values
+    gsheet_body = {"values": values}
+    json.dumps(gsheet_body)
+    return gsheet_body
+
+
+def attendance_frame(n_rows):
+    """
+    Synthetic frame shaped like the `attendance` dataset: repeated names, class
+    dates and insertion times, scores on a small scale and some missing values.
+    """
+    rng = np.random.default_rng(0)
+    schema = DATASETS["attendance"]["schema"]
+    data = {}
+    for name, spec in schema.items():
+        dtype = spec.get("dtype", "object")
+        if dtype == "float":
+            values = rng.integers(0, 5, n_rows) / 4
+            values[rng.random(n_rows) < 0.1] = np.nan
+        elif dtype == "int":
+            values = rng.integers(0, 100, n_rows)
+        elif dtype.startswith("datetime64"):
+            values = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+                rng.integers(0, 1000, n_rows), unit="h"
+            )
+        else:
+            values = pd.Series(
+                rng.choice(["Alice Smith", "Bob Jones", "", None], n_rows),
+                dtype=object,
+            )
+        data[name] = values
+    return pd.DataFrame(data), schema
+
+
+def measure(fn, *args, **kwargs):
+    # Time and memory are measured in separate runs: tracing allocations slows
+    # down the pure-Python parts much more than the vectorized ones
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(n_rows=100_000):
+    df, schema = attendance_frame(n_rows)
+    print(f"{n_rows} rows x {df.shape[1]} columns")
+    assert _dataframe_to_gsheet_body(
+        df, include_columns=True, schema=schema
+    ) == legacy_dataframe_to_gsheet_body(df, include_columns=True, schema=schema)
+    for label, fn in [
+        ("legacy", legacy_dataframe_to_gsheet_body),
+        ("columnar", _dataframe_to_gsheet_body),
+    ]:
+        elapsed, peak = measure(fn, df, include_columns=True, schema=schema)
+        print(f"{label:>10}: {elapsed:6.2f}s, peak memory {peak / 2**20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
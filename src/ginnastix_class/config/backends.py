@@ -0,0 +1,2 @@
+# Directory of the local (offline) dataset backend
+LOCAL_BACKEND_DIR = "data/backend"
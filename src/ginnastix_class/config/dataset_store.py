@@ -0,0 +1,10 @@
+# Directory of the local dataset cache
+CACHE_DIR = "data"
+
+# Seconds during which a cached dataset is used without checking the source for
+# changes, unless the dataset sets its own "cache_ttl" in DATASETS
+CACHE_TTL = 300
+
+# Seconds that interactive commands in stale-while-revalidate mode wait for the
+# background refresh before computing a roster from the reference datasets
+SWR_WAIT = 3
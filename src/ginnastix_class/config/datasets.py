@@ -1,3 +1,6 @@
+# Answers to the attendance questions
+ATTENDANCE_ANSWERS = ["Yes", "Mostly", "Somewhat", "No"]
+
 DATASETS = {
     "periods": {
         "spreadsheet_id": "1ir39WGL9GD35PHEbntNIjlxPswx6H9AtYwm5r0EETLA",
@@ -68,6 +71,9 @@ DATASETS = {
     "student_levels": {
         "spreadsheet_id": "1ir39WGL9GD35PHEbntNIjlxPswx6H9AtYwm5r0EETLA",
         "sheet_range": "Student Levels",
+        "foreign_keys": {
+            "Student": {"dataset": "students", "column": "Student"},
+        },
         "schema": {
             "Student": {"index": 0},
             "Level": {"index": 1},
@@ -95,13 +101,10 @@ DATASETS = {
         "sheet_range": "Holidays",
         "schema": {
             "Holiday": {"index": 0},
-            "Date": {"index": 1},
+            "Date": {"index": 1, "type": "date"},
             "Day": {"index": 2},
-            "Gym Closed": {"index": 3},  # TODO: handle boolean types
-            "No Practice": {
-                "index": 4,
-                "is_nullable": True,
-            },  # TODO: handle boolean types
+            "Gym Closed": {"index": 3, "type": "bool"},
+            "No Practice": {"index": 4, "type": "bool", "is_nullable": True},
             "Notes": {"index": 5, "is_nullable": True},
         },
     },
@@ -119,47 +122,107 @@ DATASETS = {
     "student_classes": {
         "spreadsheet_id": "1ir39WGL9GD35PHEbntNIjlxPswx6H9AtYwm5r0EETLA",
         "sheet_range": "Student Classes",
+        "foreign_keys": {
+            "Student": {"dataset": "students", "column": "Student"},
+        },
         "schema": {
             "Student": {"index": 0},
             "Class": {"index": 1},
-            "Start": {"index": 2},
-            "Stop": {"index": 3, "is_nullable": True},
+            "Start": {"index": 2, "type": "date"},
+            "Stop": {"index": 3, "type": "date", "is_nullable": True},
         },
     },
     "skill_evaluation": {
         "spreadsheet_id": "1ir39WGL9GD35PHEbntNIjlxPswx6H9AtYwm5r0EETLA",
         "sheet_range": "Skill Evaluation",
+        "value_render_option": "UNFORMATTED_VALUE",
+        "append_only": True,
+        "cache_ttl": 0,
+        "foreign_keys": {
+            "Athlete": {"dataset": "students", "column": "Student"},
+            "Skill ID": {"dataset": "skills_v2", "column": "Skill ID"},
+        },
         "schema": {
-            "Period": {"index": 0},
-            "Event": {"index": 1},
-            "Skill": {"index": 2},
-            "Variant": {"index": 3, "is_nullable": True},
-            "Athlete": {"index": 4},
+            "Period": {"index": 0, "dtype": "category"},
+            "Event": {"index": 1, "dtype": "category"},
+            "Skill": {"index": 2, "dtype": "category"},
+            "Variant": {"index": 3, "dtype": "category", "is_nullable": True},
+            "Athlete": {"index": 4, "dtype": "category"},
             "Score": {"index": 5, "dtype": "float"},
-            "Skill ID": {"index": 6},
-            "Event Skill ID": {"index": 7},
-            "Level": {"index": 8},
-            "Status": {"index": 9},
-            "Inserted At": {"index": 10},
+            "Skill ID": {"index": 6, "dtype": "category"},
+            "Event Skill ID": {"index": 7, "dtype": "category"},
+            "Level": {"index": 8, "dtype": "category"},
+            "Status": {"index": 9, "dtype": "category"},
+            "Inserted At": {"index": 10, "type": "datetime"},
         },
     },
     "attendance": {
         "spreadsheet_id": "1ir39WGL9GD35PHEbntNIjlxPswx6H9AtYwm5r0EETLA",
         "sheet_range": "Attendance",
+        "value_render_option": "UNFORMATTED_VALUE",
+        "append_only": True,
+        "cache_ttl": 0,
+        "foreign_keys": {
+            "Athlete": {"dataset": "students", "column": "Student"},
+        },
         "schema": {
-            "Athlete": {"index": 0},
-            "Date": {"index": 1},
-            "Day": {"index": 2},
-            "Attended Class": {"index": 3},
-            "On Time": {"index": 4, "is_nullable": True},
-            "Prepared": {"index": 5, "is_nullable": True},
-            "Kind To Others": {"index": 6, "is_nullable": True},
-            "Listened To Instructions": {"index": 7, "is_nullable": True},
-            "Completed Assignments": {"index": 8, "is_nullable": True},
-            "Focused Mindset": {"index": 9, "is_nullable": True},
-            "Positive Attitude": {"index": 10, "is_nullable": True},
-            "Pain Free": {"index": 11, "is_nullable": True},
-            "Notes": {"index": 12, "is_nullable": True},
+            "Athlete": {"index": 0, "dtype": "category"},
+            "Date": {"index": 1, "type": "date"},
+            "Day": {"index": 2, "dtype": "category"},
+            "Attended Class": {
+                "index": 3,
+                "type": "enum",
+                "values": ATTENDANCE_ANSWERS,
+            },
+            "On Time": {
+                "index": 4,
+                "type": "enum",
+                "values": ATTENDANCE_ANSWERS,
+                "is_nullable": True,
+            },
+            "Prepared": {
+                "index": 5,
+                "type": "enum",
+                "values": ATTENDANCE_ANSWERS,
+                "is_nullable": True,
+            },
+            "Kind To Others": {
+                "index": 6,
+                "type": "enum",
+                "values": ATTENDANCE_ANSWERS,
+                "is_nullable": True,
+            },
+            "Listened To Instructions": {
+                "index": 7,
+                "type": "enum",
+                "values": ATTENDANCE_ANSWERS,
+                "is_nullable": True,
+            },
+            "Completed Assignments": {
+                "index": 8,
+                "type": "enum",
+                "values": ATTENDANCE_ANSWERS,
+                "is_nullable": True,
+            },
+            "Focused Mindset": {
+                "index": 9,
+                "type": "enum",
+                "values": ATTENDANCE_ANSWERS,
+                "is_nullable": True,
+            },
+            "Positive Attitude": {
+                "index": 10,
+                "type": "enum",
+                "values": ATTENDANCE_ANSWERS,
+                "is_nullable": True,
+            },
+            "Pain Free": {
+                "index": 11,
+                "type": "enum",
+                "values": ATTENDANCE_ANSWERS,
+                "is_nullable": True,
+            },
+            "Notes": {"index": 12, "dtype": "string[pyarrow]", "is_nullable": True},
             "Attended Class Score": {
                 "index": 13,
                 "is_nullable": True,
@@ -198,14 +261,17 @@ DATASETS = {
                 "is_nullable": True,
                 "dtype": "float",
             },
-            "Expected Class Size": {"index": 23, "dtype": "int"},
+            "Expected Class Size": {"index": 23, "dtype": "Int16"},
             "Expected Attendance Rate": {"index": 24, "dtype": "float"},
-            "Inserted At": {"index": 25},
+            "Inserted At": {"index": 25, "type": "datetime"},
         },
     },
     "default_routines": {
         "spreadsheet_id": "1K_XlFdPQSrBkkRFfAW48ui2p_L_ESsjrUy0lSV2vbV4",
         "sheet_range": "Default Routines",
+        "foreign_keys": {
+            "Skill ID": {"dataset": "skills_v2", "column": "Skill ID"},
+        },
         "schema": {
             "Level": {"index": 0},
             "Event": {"index": 1},
@@ -220,6 +286,10 @@ DATASETS = {
     "preseason_testout": {
         "spreadsheet_id": "1K_XlFdPQSrBkkRFfAW48ui2p_L_ESsjrUy0lSV2vbV4",
         "sheet_range": "Preseason Test-Out",
+        "foreign_keys": {
+            "Athlete": {"dataset": "students", "column": "Student"},
+            "Skill ID": {"dataset": "skills_v2", "column": "Skill ID"},
+        },
         "schema": {
             "Athlete": {"index": 0},
             "Level": {"index": 1},
@@ -231,6 +301,10 @@ DATASETS = {
     "custom_routines": {
         "spreadsheet_id": "1K_XlFdPQSrBkkRFfAW48ui2p_L_ESsjrUy0lSV2vbV4",
         "sheet_range": "Custom Routines",
+        "foreign_keys": {
+            "Athlete": {"dataset": "students", "column": "Student"},
+            "Skill ID": {"dataset": "skills_v2", "column": "Skill ID"},
+        },
         "schema": {
             "Athlete": {"index": 0},
             "Level": {"index": 1},
@@ -247,6 +321,9 @@ DATASETS = {
     "meet_scores": {
         "spreadsheet_id": "1ak8lJ0cBzvcD114mx50x50K0kKz5BXd9vQuy7P7w-DI",
         "sheet_range": "2026",
+        "foreign_keys": {
+            "Athlete": {"dataset": "students", "column": "Student"},
+        },
         "schema": {
             "Meet": {"index": 0},
             "Level": {"index": 1},
@@ -1,3 +1,40 @@
 CREDENTIALS_FILE = "credentials.json"
 TOKEN_FILE = "token.json"
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+
+# Limits for a single `values.append` request (Google recommends payloads of
+# at most 2 MB)
+APPEND_MAX_ROWS = 5000
+APPEND_MAX_BYTES = 2_000_000
+
+# Per-user request quotas and retry policy
+# ref: https://developers.google.com/workspace/sheets/api/limits
+READ_REQUESTS_PER_MINUTE = 60
+WRITE_REQUESTS_PER_MINUTE = 60
+MAX_RETRIES = 5
+RETRY_MAX_DELAY = 64
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Maximum number of concurrent reads (of spreadsheets by `read_datasets`, of
+# datasets by `DatasetStore.sync`)
+LOAD_MAX_WORKERS = 4
+
+# Range read to detect changes to the sheet of an append-only dataset (see
+# `read_dataset_fingerprints`; the schema's columns are read for other sheets),
+# and how long a probe result is reused
+PROBE_RANGE = "A:A"
+PROBE_MAX_AGE = 60
+
+# Local outbox for deferred appends (see `utils/outbox.py`): how often the
+# background flusher runs, how long to wait for it at exit and after how many
+# seconds a batch claimed by an unfinished flush is retried
+OUTBOX_FILE = "data/outbox.sqlite3"
+OUTBOX_FLUSH_INTERVAL = 30
+OUTBOX_EXIT_TIMEOUT = 10
+OUTBOX_LEASE = 300
+# Header of the hidden column holding the idempotency keys of the rows written
+# from the outbox
+OUTBOX_KEY_COLUMN = "Outbox Key"
+
+# Where per-request records are written when instrumentation is enabled
+INSTRUMENTATION_DIR = "data/instrumentation"
@@ -24,11 +24,11 @@ REF
 """
 
 
-def run_behavior_report(dataset_source="local", debug=False):
+def run_behavior_report(debug=False):
     global DF
     global DATE_LIST
 
-    dr = DataReader(dataset_source)
+    dr = DataReader()
     DF = dr.df_attendance
     DATE_LIST = get_date_list()
     dashboard_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
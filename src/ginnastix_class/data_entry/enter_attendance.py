@@ -1,45 +1,58 @@
 import os
-import pickle
-from datetime import date
 from datetime import datetime
-from datetime import timedelta
 from functools import cached_property
 from functools import reduce
 from pathlib import Path
 
 import pandas as pd
 
-from ginnastix_class.utils.google_sheets import append_dataset_rows
-from ginnastix_class.utils.google_sheets import authenticate
-from ginnastix_class.utils.google_sheets import read_dataset
+from ginnastix_class.config.dataset_store import SWR_WAIT
+from ginnastix_class.utils.backends import get_backend
+from ginnastix_class.utils.dataset_store import get_store
 from ginnastix_class.utils.user_input import get_input
 from ginnastix_class.utils.user_input import get_input_from_df
 
 
 class Attendance:
-    _credentials = None
     _data_dir = "data"
     _expected_attendance_rate = 0.8
     Path(_data_dir).mkdir(parents=True, exist_ok=True)
 
-    def __init__(self, reference_dataset_source, resume_data_entry=False):
-        self._source = reference_dataset_source
+    _reference_datasets = {
+        "class_sessions": "df_class_sessions",
+        "student_classes": "df_student_classes",
+        "holidays": "df_holidays",
+    }
+
+    def __init__(self, resume_data_entry=False):
         self._resume_data_entry = resume_data_entry
-        self.df_class_sessions = self.read_reference_dataset("class_sessions")
-        self.df_student_classes = self.read_reference_dataset("student_classes")
-        self.df_holidays = self.read_reference_dataset("holidays")
+        dfs = get_store().load(list(self._reference_datasets))
+        for name, attr in self._reference_datasets.items():
+            setattr(self, attr, dfs[name])
 
         # Set when self.initialize_class_session() is called
         self.date_str = None
         self.day = None
         self.dt = None
         self.students = None
-
-    @property
-    def credentials(self):
-        if not self._credentials or not self._credentials.valid:
-            self._credentials = authenticate()
-        return self._credentials
+        self.roster = None
+
+    def swap_reference_datasets(self, timeout=0):
+        """
+        Swap in the reference datasets re-read in the background since they
+        were loaded (stale-while-revalidate mode).
+
+        Returns
+        -------
+          bool
+            Whether any dataset changed
+        """
+        dfs = get_store().take_updates(list(self._reference_datasets), timeout)
+        for name, df in dfs.items():
+            setattr(self, self._reference_datasets[name], df)
+        if dfs:
+            self.__dict__.pop("class_days", None)
+        return bool(dfs)
 
     @property
     def bool_options(self):
@@ -51,54 +64,49 @@ class Attendance:
 
     @cached_property
     def class_days(self):
-        # TODO: clean up
-        self.df_student_classes["Start"] = self.df_student_classes["Start"].apply(
-            self.norm_date_string
-        )
-        self.df_holidays["DT"] = self.df_holidays["Date"].apply(self.to_dt)
-        df_holidays_filtered = self.df_holidays[
-            self.df_holidays["No Practice"] == "TRUE"
+        """
+        Days each student had class, from the day they started the class until
+        today, excluding holidays without practice.
+
+        The calendar is a date range joined with the class sessions on the day
+        of the week, then with the students of each class.
+
+        Returns
+        -------
+          pandas.DataFrame
+            Columns "DT" (datetime), "Day", "Class", "Student" and "Date"
+            (`DT` as %m/%d/%Y text)
+        """
+        df_student_classes = self.df_student_classes[["Student", "Class", "Start"]]
+        holidays = self.df_holidays.loc[
+            self.df_holidays["No Practice"].fillna(False), "Date"
         ]
-        min_timestamp = self.df_student_classes["Start"].apply(self.to_dt).min()
-        all_dates = []
-        _date = min_timestamp
-        while _date <= datetime.now():
-            all_dates.append((_date, _date.strftime("%A")))
-            _date += timedelta(days=1)
-        df_dates = pd.DataFrame(all_dates, columns=["DT", "Day"])
+        df_dates = pd.DataFrame(
+            {"DT": pd.date_range(df_student_classes["Start"].min(), datetime.now())}
+        )
+        df_dates = df_dates[~df_dates["DT"].isin(holidays)]
+        df_dates["Day"] = df_dates["DT"].dt.day_name()
+        df_dates["Date"] = df_dates["DT"].dt.strftime("%m/%d/%Y")
         df = pd.merge(
             df_dates,
             self.df_class_sessions[["Day", "Class"]],
             on="Day",
             how="inner",
         )
-        df2 = pd.merge(
-            df,
-            self.df_student_classes[["Student", "Class", "Start"]],
-            on="Class",
-            how="inner",
-        )
-        df3 = pd.merge(
-            df2,
-            df_holidays_filtered[["DT", "Holiday"]],
-            on="DT",
-            how="left",
-        )
-        df3 = df3[
-            (df3["Holiday"].isna()) & (df3["Start"].apply(self.to_dt) <= df3["DT"])
-        ][["DT", "Day", "Class", "Student"]]
-        df3["Date"] = df3["DT"].apply(self.norm_date_string)
-
-        return df3
+        df = pd.merge(df, df_student_classes, on="Class", how="inner")
+        df = df[df["Start"] <= df["DT"]]
+        return df[["DT", "Day", "Class", "Student", "Date"]].reset_index(drop=True)
 
     @cached_property
     def date_info(self):
         # TODO: clean up
         max_display = 12
-        dates = []
-        for _date, _ in self.class_days.groupby(["Date", "Day", "DT"]):
-            dates.append(_date)
-        dates = sorted(dates, key=lambda x: x[2], reverse=True)[0:max_display]
+        df_dates = (
+            self.class_days[["Date", "Day", "DT"]]
+            .drop_duplicates()
+            .sort_values("DT", ascending=False)
+        )
+        dates = list(df_dates.head(max_display).itertuples(index=False, name=None))
         dates.append(("OTHER", "", None))
         date_str, day = get_input_from_df(
             df=pd.DataFrame(dates, columns=["Date", "Day", "DT"]),
@@ -132,32 +140,6 @@ class Attendance:
         else:
             return pd.NaT
 
-    def norm_date_string(self, x):
-        if isinstance(x, str):
-            res = datetime.strptime(x, "%m/%d/%Y").strftime("%m/%d/%Y")
-        elif isinstance(x, datetime) or isinstance(x, date):
-            res = x.strftime("%m/%d/%Y")
-        else:
-            res = x
-        return res
-
-    def read_reference_dataset(self, name):
-        file_name = os.path.join(self._data_dir, f"{name}.pkl")
-        if self._source == "local":
-            print(f"Loading local dataset from file: {file_name}")
-            try:
-                with open(file_name, "rb") as f:
-                    df = pickle.load(f)
-                    return df
-            except Exception as e:
-                print(f"Failed to load local dataset from file: {e}")
-
-        print(f"Reading dataset from Google Sheets: {name}")
-        df = read_dataset(dataset_name=name, credentials=self.credentials)
-        with open(file_name, "wb") as f:
-            pickle.dump(df, f)
-        return df
-
     @cached_property
     def attendance_attributes(self):
         return [
@@ -198,27 +180,49 @@ class Attendance:
             dt = self.to_dt(date_str)
             processed_students = df_partial_batch["Athlete"].to_list()
 
-        self.df_student_classes["Is Active"] = self.df_student_classes["Stop"].apply(
-            lambda x: not (self.to_dt(x) < dt)
-        )
-        self.class_days = pd.merge(
+        # The date prompt used the local cache; the roster uses the reference
+        # datasets re-read in the background if they arrived in time
+        self.swap_reference_datasets(timeout=SWR_WAIT)
+        roster = self.get_roster(dt)
+        students = sorted(list(set(roster) - set(processed_students)))
+
+        # Store class attributes
+        self.date_str = date_str
+        self.day = day
+        self.dt = dt
+        self.students = students
+        self.roster = roster
+
+    def get_roster(self, dt):
+        self.df_student_classes["Is Active"] = ~(self.df_student_classes["Stop"] < dt)
+        class_days = pd.merge(
             self.class_days,
             self.df_student_classes[["Student", "Class", "Is Active"]],
             on=["Student", "Class"],
             how="left",
         )
-        all_students = sorted(
-            self.class_days[
-                (self.class_days["DT"] == dt) & (self.class_days["Is Active"])
-            ]["Student"].to_list()
+        return sorted(
+            class_days[(class_days["DT"] == dt) & (class_days["Is Active"])][
+                "Student"
+            ].to_list()
         )
-        students = sorted(list(set(all_students) - set(processed_students)))
 
-        # Store class attributes
-        self.date_str = date_str
-        self.day = day
-        self.dt = dt
-        self.students = students
+    def warn_if_roster_changed(self):
+        """
+        Warn if the roster changed in Google Sheets after it was computed
+        (stale-while-revalidate mode).
+        """
+        if not self.swap_reference_datasets():
+            return
+        roster = self.get_roster(self.dt)
+        added = sorted(set(roster) - set(self.roster))
+        removed = sorted(set(self.roster) - set(roster))
+        if added or removed:
+            print(
+                f"\nWARNING: the roster for {self.day} {self.date_str} changed in "
+                "Google Sheets during data entry. "
+                f"Added: {added or 'none'}. Removed: {removed or 'none'}."
+            )
 
     def collect_attendance(self):
         print(f"Entering attendance information for {self.day} {self.date_str} ...")
@@ -318,8 +322,9 @@ class Attendance:
     def add(self):
         self.initialize_class_session()
         self.collect_attendance()
+        self.warn_if_roster_changed()
         df_batch = self.process_batch()
-        append_dataset_rows(dataset_name="attendance", df=df_batch)
+        get_backend().append("attendance", df_batch)
 
         # Clean up staging file
         if os.path.exists(self.out_file):
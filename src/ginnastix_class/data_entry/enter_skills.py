@@ -1,6 +1,5 @@
 import json
 import os
-import pickle
 from datetime import datetime
 from functools import cached_property
 from functools import reduce
@@ -9,34 +8,48 @@ from pathlib import Path
 import pandas as pd
 from prompt_toolkit import prompt
 
-from ginnastix_class.utils.google_sheets import append_dataset_rows
-from ginnastix_class.utils.google_sheets import authenticate
-from ginnastix_class.utils.google_sheets import read_dataset
+from ginnastix_class.config.dataset_store import SWR_WAIT
+from ginnastix_class.utils.backends import get_backend
+from ginnastix_class.utils.dataset_store import get_store
 from ginnastix_class.utils.user_input import get_input
 from ginnastix_class.utils.user_input import get_input_from_df
 
 
 class SkillEvaluation:
-    _credentials = None
     _data_dir = "data"
     Path(_data_dir).mkdir(parents=True, exist_ok=True)
 
-    def __init__(self, reference_dataset_source):
-        self._source = reference_dataset_source
-
-        self.df_periods = self.read_reference_dataset("periods")
-        self.df_levels = self.read_reference_dataset("levels")
-        self.df_events = self.read_reference_dataset("events")
-        # self.df_skills = self.read_reference_dataset("skills")
-        self.df_skills = self.read_reference_dataset("skills_v2")
-        self.df_student_classes = self.read_reference_dataset("student_classes")
-        self.df_student_levels = self.read_reference_dataset("student_levels")
-
-    @property
-    def credentials(self):
-        if not self._credentials or not self._credentials.valid:
-            self._credentials = authenticate()
-        return self._credentials
+    _reference_datasets = {
+        "periods": "df_periods",
+        "levels": "df_levels",
+        "events": "df_events",
+        # "skills": "df_skills",
+        "skills_v2": "df_skills",
+        "student_classes": "df_student_classes",
+        "student_levels": "df_student_levels",
+    }
+
+    def __init__(self):
+        dfs = get_store().load(list(self._reference_datasets))
+        for name, attr in self._reference_datasets.items():
+            setattr(self, attr, dfs[name])
+
+    def swap_reference_datasets(self, timeout=0):
+        """
+        Swap in the reference datasets re-read in the background since they
+        were loaded (stale-while-revalidate mode), warning if the students
+        were already selected from a roster that changed.
+        """
+        dfs = get_store().take_updates(list(self._reference_datasets), timeout)
+        for name, df in dfs.items():
+            setattr(self, self._reference_datasets[name], df)
+        roster_changed = {"student_classes", "student_levels"}.intersection(dfs)
+        if roster_changed and "students" in self.__dict__:
+            print(
+                "\nWARNING: student classes or levels changed in Google Sheets "
+                "after the students were selected. Check the selected students: "
+                f"{json.dumps(self.students)}"
+            )
 
     @property
     def bool_options(self):
@@ -58,6 +71,10 @@ class SkillEvaluation:
 
     @cached_property
     def students(self):
+        # The period prompt used the local cache; the roster uses the reference
+        # datasets re-read in the background if they arrived in time
+        self.swap_reference_datasets(timeout=SWR_WAIT)
+
         # Get initial list of students
         level, level_desc = get_input_from_df(
             df=self.df_levels,
@@ -128,29 +145,14 @@ class SkillEvaluation:
             "Status",
         ]
 
-    def read_reference_dataset(self, name):
-        file_name = os.path.join(self._data_dir, f"{name}.pkl")
-        if self._source == "local":
-            print(f"Loading local dataset from file: {file_name}")
-            try:
-                with open(file_name, "rb") as f:
-                    df = pickle.load(f)
-                    return df
-            except Exception as e:
-                print(f"Failed to load local dataset from file: {e}")
-
-        print(f"Reading dataset from Google Sheets: {name}")
-        df = read_dataset(dataset_name=name, credentials=self.credentials)
-        with open(file_name, "wb") as f:
-            pickle.dump(df, f)
-        return df
-
     def add(self):
         _evaluation_period = self.evaluation_period
         _students = self.students
 
         continue_data_entry = True
         while continue_data_entry:
+            self.swap_reference_datasets()
+
             # event
             _event, _event_desc = get_input_from_df(
                 df=self.df_events,
@@ -258,7 +260,7 @@ class SkillEvaluation:
                     keep_default_na=False,
                 )
                 df_batch["Inserted At"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                append_dataset_rows(dataset_name="skill_evaluation", df=df_batch)
+                get_backend().append("skill_evaluation", df_batch)
                 continue_data_entry = False
 
         # Clean up staging file
@@ -3,41 +3,205 @@ from datetime import datetime
 
 import click
 
+from ginnastix_class.config.datasets import DATASETS
 from ginnastix_class.dashboard.behavior_report.main import run_behavior_report
 from ginnastix_class.data_entry.enter_attendance import Attendance
 from ginnastix_class.data_entry.enter_skills import SkillEvaluation
 from ginnastix_class.reports.level_evaluation import generate_reports
 from ginnastix_class.reports.upgrade_tracker import run_upgrade_tracker
+from ginnastix_class.utils.backends import BACKENDS
+from ginnastix_class.utils.backends import GoogleSheetsBackend
+from ginnastix_class.utils.backends import LocalDirectoryBackend
+from ginnastix_class.utils.backends import copy_datasets
+from ginnastix_class.utils.backends import set_backend
+from ginnastix_class.utils.dataset_store import get_store
+from ginnastix_class.utils.dataset_store import set_store
+from ginnastix_class.utils.google_sheets import flush_outbox
+from ginnastix_class.utils.google_sheets import get_outbox_flusher
+from ginnastix_class.utils.instrumentation import enable_instrumentation
+from ginnastix_class.utils.integrity import check_integrity
+from ginnastix_class.utils.outbox import get_outbox
 
 
 @click.group()
-def cli():
-    pass
+@click.option(
+    "--backend",
+    type=click.Choice(BACKENDS),
+    default="gsheets",
+    envvar="GINNASTIX_BACKEND",
+    show_default=True,
+    help="Where datasets are read from and written to",
+)
+@click.option(
+    "--defer-writes/--no-defer-writes",
+    default=True,
+    envvar="GINNASTIX_DEFER_WRITES",
+    show_default=True,
+    help="Queue new rows in a local outbox and write them to Google Sheets in "
+    "the background",
+)
+@click.option(
+    "--instrument",
+    is_flag=True,
+    envvar="GINNASTIX_INSTRUMENT",
+    help="Record every Google Sheets API call (JSON lines under "
+    "data/instrumentation/) and print a summary at exit",
+)
+@click.pass_context
+def cli(ctx, backend, defer_writes, instrument):
+    if instrument:
+        enable_instrumentation()
+    set_backend(backend, deferred=defer_writes)
+    # Send the rows left in the outbox by earlier runs in the background
+    # (`flush` sends them itself)
+    if (
+        backend == "gsheets"
+        and ctx.invoked_subcommand != "flush"
+        and get_outbox().pending()
+    ):
+        get_outbox_flusher().wake()
+
+
+@cli.command()
+def flush():
+    """Write the rows waiting in the local outbox to Google Sheets."""
+    written = flush_outbox()
+    for dataset_name, n_rows in written.items():
+        print(f"{dataset_name}: {n_rows} rows written")
+    pending = get_outbox().pending()
+    if pending:
+        raise click.ClickException(f"Rows still waiting in the outbox: {pending}")
+    print("Outbox is empty")
+
+
+@cli.command()
+@click.argument("dataset_names", nargs=-1, type=click.Choice(list(DATASETS)))
+def export_backend(dataset_names):
+    """
+    Copy every dataset (or DATASET_NAMES) from Google Sheets to the local
+    backend (data/backend/), to run commands offline with `--backend local` or
+    `--backend memory`.
+    """
+    copied = copy_datasets(
+        GoogleSheetsBackend(), LocalDirectoryBackend(), list(dataset_names or DATASETS)
+    )
+    for dataset_name, n_rows in copied.items():
+        print(f"{dataset_name}: {n_rows} rows copied")
+
+
+@cli.command()
+@click.argument("dataset_names", nargs=-1, type=click.Choice(list(DATASETS)))
+@click.option(
+    "--clear-cache",
+    is_flag=True,
+    help="Re-read all datasets instead of only those that changed",
+)
+def sync(dataset_names, clear_cache):
+    """
+    Refresh the local cache of every dataset (or of DATASET_NAMES), e.g. from
+    cron before classes start. Exits with an error if a dataset fails to be
+    read or validated.
+    """
+    set_store("gsheets" if clear_cache else "auto")
+    results = get_store().sync(dataset_names)
+
+    print(f"\n{'dataset':<20} {'status':<8} {'rows':>8} {'seconds':>8}")
+    for dataset_name, result in results.items():
+        rows = "" if result["rows"] is None else result["rows"]
+        print(
+            f"{dataset_name:<20} {result['status']:<8} {rows:>8} "
+            f"{result['seconds']:>8.2f}"
+        )
+    failed = {
+        dataset_name: result["error"]
+        for dataset_name, result in results.items()
+        if result["status"] == "failed"
+    }
+    for dataset_name, error in failed.items():
+        print(f"\n{dataset_name}: {error}")
+    if failed:
+        raise click.ClickException(f"Failed to sync: {', '.join(failed)}")
+
+
+@cli.command()
+@click.argument("dataset_names", nargs=-1, type=click.Choice(list(DATASETS)))
+@click.option(
+    "--clear-cache",
+    is_flag=True,
+    help="Re-read all datasets instead of only those that changed",
+)
+def check(dataset_names, clear_cache):
+    """
+    Check the foreign keys of every dataset (or of DATASET_NAMES) against the
+    datasets they reference, listing the keys that are missing with their row
+    numbers in Google Sheets. Exits with an error if any key is missing.
+    """
+    set_store("gsheets" if clear_cache else "auto")
+    results = check_integrity(dataset_names)
+
+    for result in results:
+        orphans = result["orphans"]
+        print(
+            f"\n{result['dataset']}.{result['column']}: {len(orphans)} keys "
+            f"missing from {result['references']}"
+        )
+        for key, rows in orphans.items():
+            print(f"  {key!r}: {_format_rows(rows)}")
+    if results:
+        datasets = dict.fromkeys(result["dataset"] for result in results)
+        raise click.ClickException(f"Missing keys in: {', '.join(datasets)}")
+    print("All foreign keys are valid")
 
 
 @cli.command()
-@click.option("--clear-cache", is_flag=True)
-def skills(clear_cache):
-    reference_dataset_source = "gsheets" if clear_cache else "local"
-    skill_evaluation = SkillEvaluation(reference_dataset_source)
+@click.option(
+    "--clear-cache",
+    is_flag=True,
+    help="Re-read all reference datasets instead of only those that changed",
+)
+@click.option(
+    "--swr",
+    is_flag=True,
+    envvar="GINNASTIX_SWR",
+    help="Start from the local cache and re-read changed reference datasets "
+    "in the background (stale-while-revalidate)",
+)
+def skills(clear_cache, swr):
+    set_store(_store_source(clear_cache, swr))
+    skill_evaluation = SkillEvaluation()
     skill_evaluation.add()
 
 
 @cli.command()
-@click.option("--clear-cache", is_flag=True)
+@click.option(
+    "--clear-cache",
+    is_flag=True,
+    help="Re-read all reference datasets instead of only those that changed",
+)
 @click.option("--resume-data-entry", is_flag=True)
-def attendance(clear_cache, resume_data_entry):
-    reference_dataset_source = "gsheets" if clear_cache else "local"
-    attendance = Attendance(reference_dataset_source, resume_data_entry)
+@click.option(
+    "--swr",
+    is_flag=True,
+    envvar="GINNASTIX_SWR",
+    help="Start from the local cache and re-read changed reference datasets "
+    "in the background (stale-while-revalidate)",
+)
+def attendance(clear_cache, resume_data_entry, swr):
+    set_store(_store_source(clear_cache, swr))
+    attendance = Attendance(resume_data_entry)
     attendance.add()
 
 
 @cli.command()
-@click.option("--clear-cache", is_flag=True)
+@click.option(
+    "--clear-cache",
+    is_flag=True,
+    help="Re-read all reference datasets instead of only those that changed",
+)
 @click.option("--debug", is_flag=True)
 def behavior_report(clear_cache, debug):
-    reference_dataset_source = "gsheets" if clear_cache else "local"
-    run_behavior_report(reference_dataset_source, debug)
+    set_store("gsheets" if clear_cache else "auto")
+    run_behavior_report(debug)
 
 
 @cli.command()
@@ -53,11 +217,36 @@ def behavior_report(clear_cache, debug):
     help="Optional evaluation reference date for generating historical evaluations post hoc",
 )
 @click.option("--athlete-name", default=None, help="Only process one athlete")
-def level_evaluation(target_directory, evaluation_date, athlete_name):
+@click.option(
+    "--clear-cache",
+    is_flag=True,
+    help="Re-read all reference datasets instead of only those that changed",
+)
+def level_evaluation(target_directory, evaluation_date, athlete_name, clear_cache):
+    set_store("gsheets" if clear_cache else "auto")
     evaluation_dt = datetime.strptime(evaluation_date, "%Y-%m-%d")
     generate_reports(evaluation_dt, target_directory, athlete_name)
 
 
 @cli.command()
-def upgrade_tracker():
+@click.option(
+    "--clear-cache",
+    is_flag=True,
+    help="Re-read all reference datasets instead of only those that changed",
+)
+def upgrade_tracker(clear_cache):
+    set_store("gsheets" if clear_cache else "auto")
     run_upgrade_tracker()
+
+
+def _format_rows(rows, limit=10):
+    text = ", ".join(str(row) for row in rows[:limit])
+    if len(rows) > limit:
+        text += f", ... ({len(rows)} rows)"
+    return f"row {text}" if len(rows) == 1 else f"rows {text}"
+
+
+def _store_source(clear_cache, swr):
+    if clear_cache:
+        return "gsheets"
+    return "swr" if swr else "auto"
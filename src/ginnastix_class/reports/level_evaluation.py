@@ -8,33 +8,12 @@ import numpy as np
 import pandas as pd
 from matplotlib.backends.backend_pdf import PdfPages
 
-from ginnastix_class.utils.google_sheets import authenticate
-from ginnastix_class.utils.google_sheets import read_dataset
+from ginnastix_class.utils.dataset_store import get_store
 
 EVENT_MAPPING = {"BB": "Beam", "VT": "Vault", "UB": "Bars", "FX": "Floor"}
 LEVEL_MAPPING = {"XB": "Bronze", "XS": "Silver", "XG": "Gold"}
 
 
-def read_reference_dataset(name, data_dir="data", source="gsheet", credentials=None):
-    Path(data_dir).mkdir(parents=True, exist_ok=True)
-    file_name = os.path.join(data_dir, f"{name}.pkl")
-    if source == "local":
-        print(f"Loading local dataset from file: {file_name}")
-        try:
-            with open(file_name, "rb") as f:
-                df = pickle.load(f)
-                return df
-        except Exception as e:
-            print(f"Failed to load local dataset from file: {e}")
-
-    print(f"Reading dataset from Google Sheets: {name}")
-    credentials = credentials or authenticate()
-    df = read_dataset(dataset_name=name, credentials=credentials)
-    with open(file_name, "wb") as f:
-        pickle.dump(df, f)
-    return df
-
-
 def skill_description(s):
     ignore = [None, ""]
     names = [s["Skill Description"], s["Variant Description"]]
@@ -49,13 +28,13 @@ def process_skill_evaluations(
 ):
     # Exclude records created after the given reference timestamp
     skill_evaluation_df = skill_evaluation_df[
-        skill_evaluation_df["Inserted At"] <= str(evaluation_dt)
+        skill_evaluation_df["Inserted At"] <= evaluation_dt
     ]
     idx = (
         skill_evaluation_df.sort_values(
             ["Period", "Inserted At"], ascending=[True, False]
         )
-        .groupby(["Athlete", "Skill ID"])["Score"]
+        .groupby(["Athlete", "Skill ID"], observed=True)["Score"]
         .idxmax()
     )
     recent_skill_evaluation_df = skill_evaluation_df.loc[idx]
@@ -370,9 +349,10 @@ def generate_reports(
     target_season, this_evaluation_period, next_evaluation_period = get_date_params(
         evaluation_dt
     )
-    skill_evaluation_df = read_reference_dataset("skill_evaluation")
-    skills_df = read_reference_dataset("skills_v2")
-    student_classes_df = read_reference_dataset("student_classes")
+    dfs = get_store().load(["skill_evaluation", "skills_v2", "student_classes"])
+    skill_evaluation_df = dfs["skill_evaluation"]
+    skills_df = dfs["skills_v2"]
+    student_classes_df = dfs["student_classes"]
 
     level_evaluation_df = process_skill_evaluations(
         skill_evaluation_df, skills_df, student_classes_df, evaluation_dt
@@ -1,13 +1,8 @@
-import os
-import pickle
-from pathlib import Path
-
 import numpy as np
 import pandas as pd
 
-from ginnastix_class.utils.google_sheets import authenticate
-from ginnastix_class.utils.google_sheets import read_dataset
-from ginnastix_class.utils.google_sheets import truncate_reload_dataset_rows
+from ginnastix_class.utils.backends import get_backend
+from ginnastix_class.utils.dataset_store import get_store
 
 
 # helpers
@@ -76,26 +71,6 @@ def ready_to_upgrade(row):
     return "FALSE"
 
 
-def read_reference_dataset(name, data_dir="data", source="gsheet", credentials=None):
-    Path(data_dir).mkdir(parents=True, exist_ok=True)
-    file_name = os.path.join(data_dir, f"{name}.pkl")
-    if source == "local":
-        print(f"Loading local dataset from file: {file_name}")
-        try:
-            with open(file_name, "rb") as f:
-                df = pickle.load(f)
-                return df
-        except Exception as e:
-            print(f"Failed to load local dataset from file: {e}")
-
-    print(f"Reading dataset from Google Sheets: {name}")
-    credentials = credentials or authenticate()
-    df = read_dataset(dataset_name=name, credentials=credentials)
-    with open(file_name, "wb") as f:
-        pickle.dump(df, f)
-    return df
-
-
 def skill_description(s):
     ignore = [None, ""]
     names = [s["Skill Description"], s["Variant Description"]]
@@ -109,13 +84,24 @@ def _run_upgrade_tracker():
     ######################################################## Data
     # Raw datasets
     EVENT_MAPPING = {"BB": "Beam", "VT": "Vault", "UB": "Bars", "FX": "Floor"}
-    levels_df = read_reference_dataset("levels")
-    default_routines_df = read_reference_dataset("default_routines")
-    preseason_testout_df = read_reference_dataset("preseason_testout")
-    custom_routines_df = read_reference_dataset("custom_routines")
-    skill_evaluation_df = read_reference_dataset("skill_evaluation")
-    skills_df = read_reference_dataset("skills_v2")  # noqa
-    meet_scores_df = read_reference_dataset("meet_scores")
+    dfs = get_store().load(
+        [
+            "levels",
+            "default_routines",
+            "preseason_testout",
+            "custom_routines",
+            "skill_evaluation",
+            "skills_v2",
+            "meet_scores",
+        ]
+    )
+    levels_df = dfs["levels"]
+    default_routines_df = dfs["default_routines"]
+    preseason_testout_df = dfs["preseason_testout"]
+    custom_routines_df = dfs["custom_routines"]
+    skill_evaluation_df = dfs["skill_evaluation"]
+    skills_df = dfs["skills_v2"]
+    meet_scores_df = dfs["meet_scores"]
 
     # Derived datasets
     athlete_df = meet_scores_df[["Level", "Athlete"]].drop_duplicates()
@@ -379,13 +365,16 @@ def _run_upgrade_tracker():
     )
 
     # Augment with analytics
+    # The keys are categorical: only group the observed combinations
     augmented_skill_eval_df = skill_evaluation_df.groupby(
-        ["Level", "Athlete", "Event", "Skill ID"], as_index=False
+        ["Level", "Athlete", "Event", "Skill ID"], as_index=False, observed=True
     ).agg({"Score": "max"})
     augmented_skill_eval_df = augmented_skill_eval_df.rename(
         columns={"Skill ID": "Upgrade Skill ID", "Score": "Skill Score"}
     )
-    augmented_skill_eval_df = augmented_skill_eval_df.replace({"Event": EVENT_MAPPING})
+    augmented_skill_eval_df["Event"] = (
+        augmented_skill_eval_df["Event"].astype(object).replace(EVENT_MAPPING)
+    )
 
     scores_summary = pivoted_routine_scores.merge(
         augmented_skill_eval_df,
@@ -444,7 +433,11 @@ def _run_upgrade_tracker():
 
 def run_upgrade_tracker():
     scores_summary = _run_upgrade_tracker()
-    truncate_reload_dataset_rows(dataset_name="upgrade_tracker", df=scores_summary)
+    get_backend().replace(
+        "upgrade_tracker",
+        scores_summary,
+        key_columns=["Level", "Athlete", "Event", "Event Routine"],
+    )
 
 
 if __name__ == "__main__":
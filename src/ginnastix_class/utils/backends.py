@@ -0,0 +1,267 @@
+import os
+import threading
+from pathlib import Path
+from typing import Protocol
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from ginnastix_class.config.backends import LOCAL_BACKEND_DIR
+from ginnastix_class.utils.google_sheets import _get_dataset_config
+from ginnastix_class.utils.google_sheets import append_dataset_rows
+from ginnastix_class.utils.google_sheets import get_session
+from ginnastix_class.utils.google_sheets import read_dataset
+from ginnastix_class.utils.google_sheets import read_dataset_fingerprints
+from ginnastix_class.utils.google_sheets import read_dataset_tail
+from ginnastix_class.utils.google_sheets import read_datasets
+from ginnastix_class.utils.google_sheets import swap_reload_dataset_rows
+from ginnastix_class.utils.google_sheets import sync_dataset_rows
+from ginnastix_class.utils.validation import standardize
+from ginnastix_class.utils.validation import validate_dataset
+
+
+class DatasetBackend(Protocol):
+    """Storage for the datasets configured in `DATASETS`."""
+
+    def read(self, dataset_name):
+        """Return the dataset as a standardized, validated DataFrame."""
+
+    def append(self, dataset_name, df):
+        """Append rows to the dataset."""
+
+    def replace(self, dataset_name, df, key_columns=None):
+        """
+        Replace the contents of the dataset (in place by `key_columns` when the
+        backend supports it).
+        """
+
+    def metadata(self, dataset_name):
+        """
+        Return size information about the stored dataset.
+
+        Returns
+        -------
+          dict
+            `row_count` and `column_count`
+        """
+
+
+class GoogleSheetsBackend:
+    """
+    Datasets stored in Google Sheets (the production backend).
+
+    With `deferred`, appended rows go through the local outbox and are written
+    in the background (see `append_dataset_rows`).
+    """
+
+    def __init__(self, session=None, deferred=False):
+        self.session = session or get_session()
+        self.deferred = deferred
+
+    def read(self, dataset_name):
+        return read_dataset(dataset_name, session=self.session)
+
+    def read_many(self, dataset_names):
+        """Read several datasets with one request per spreadsheet."""
+        return read_datasets(dataset_names, session=self.session)
+
+    def read_tail(self, dataset_name, start, validate=True):
+        """
+        Return the first row and the rows from `start` onwards (see
+        `read_dataset_tail`).
+        """
+        return read_dataset_tail(
+            dataset_name, start, session=self.session, validate=validate
+        )
+
+    def fingerprints(self, dataset_names):
+        """
+        Return fingerprints of the datasets' current contents (see
+        `read_dataset_fingerprints`).
+        """
+        return read_dataset_fingerprints(dataset_names, session=self.session)
+
+    def append(self, dataset_name, df):
+        append_dataset_rows(
+            dataset_name, df, session=self.session, deferred=self.deferred
+        )
+
+    def replace(self, dataset_name, df, key_columns=None):
+        if key_columns:
+            sync_dataset_rows(dataset_name, df, key_columns, session=self.session)
+        else:
+            swap_reload_dataset_rows(dataset_name, df, session=self.session)
+
+    def metadata(self, dataset_name):
+        # Grid size of the sheet, which may include trailing empty rows
+        dataset_cfg = _get_dataset_config(dataset_name)
+        properties = self.session.sheet_properties(dataset_cfg["spreadsheet_id"])[
+            dataset_cfg["sheet_range"]
+        ]
+        grid_properties = properties.get("gridProperties", {})
+        return {
+            "row_count": grid_properties.get("rowCount"),
+            "column_count": grid_properties.get("columnCount"),
+        }
+
+
+class LocalDirectoryBackend:
+    """Datasets stored as one Feather (Arrow IPC) file each in a directory."""
+
+    def __init__(self, directory=None):
+        self.directory = directory or LOCAL_BACKEND_DIR
+
+    def path(self, dataset_name):
+        return os.path.join(self.directory, f"{dataset_name}.feather")
+
+    def read(self, dataset_name):
+        schema = _get_dataset_config(dataset_name)["schema"]
+        if not os.path.exists(self.path(dataset_name)):
+            raise FileNotFoundError(
+                f"Dataset '{dataset_name}' not found in {self.directory} "
+                "(copy it from Google Sheets with `ginnastix-class export-backend`)"
+            )
+        df = pd.read_feather(self.path(dataset_name))
+        df = standardize(df, schema)
+        validate_dataset(df, schema)
+        return df
+
+    def append(self, dataset_name, df):
+        # Only the new rows are validated: the stored rows passed the schema
+        # when they were written
+        df = _validated(dataset_name, df)
+        if os.path.exists(self.path(dataset_name)):
+            stored_df = pd.read_feather(self.path(dataset_name))
+            df = pd.concat([stored_df, df], ignore_index=True)
+        self._write(dataset_name, df)
+
+    def replace(self, dataset_name, df, key_columns=None):
+        self._write(dataset_name, _validated(dataset_name, df))
+
+    def metadata(self, dataset_name):
+        table = feather.read_table(self.path(dataset_name), memory_map=True)
+        return {"row_count": table.num_rows, "column_count": table.num_columns}
+
+    def _write(self, dataset_name, df):
+        Path(self.directory).mkdir(parents=True, exist_ok=True)
+        _to_arrow_compatible(df).to_feather(self.path(dataset_name))
+
+
+class InMemoryBackend:
+    """
+    Datasets held in memory for the duration of the process.
+
+    Datasets that are not in memory yet are read from the `source` backend (if
+    any) the first time they are used.
+    """
+
+    def __init__(self, datasets=None, source=None):
+        self.datasets = dict(datasets or {})
+        self.source = source
+        self._lock = threading.Lock()
+
+    def read(self, dataset_name):
+        self._load(dataset_name)
+        if dataset_name not in self.datasets:
+            raise KeyError(f"Dataset '{dataset_name}' not loaded in memory")
+        return self.datasets[dataset_name].copy()
+
+    def _load(self, dataset_name):
+        with self._lock:
+            if dataset_name in self.datasets or self.source is None:
+                return
+            try:
+                self.datasets[dataset_name] = self.source.read(dataset_name)
+            except FileNotFoundError:
+                pass
+
+    def append(self, dataset_name, df):
+        df = _validated(dataset_name, df)
+        self._load(dataset_name)
+        if dataset_name in self.datasets:
+            df = pd.concat([self.datasets[dataset_name], df], ignore_index=True)
+        self.datasets[dataset_name] = df
+
+    def replace(self, dataset_name, df, key_columns=None):
+        self.datasets[dataset_name] = _validated(dataset_name, df)
+
+    def metadata(self, dataset_name):
+        rows, columns = self.read(dataset_name).shape
+        return {"row_count": rows, "column_count": columns}
+
+
+def _validated(dataset_name, df):
+    schema = _get_dataset_config(dataset_name)["schema"]
+    df = standardize(df, schema).reset_index(drop=True)
+    validate_dataset(df, schema)
+    return df
+
+
+def _to_arrow_compatible(df):
+    # Object columns may mix strings with other scalars (like the text read
+    # from Google Sheets); store them as text so Arrow can type the column
+    df = df.copy()
+    for col in df.select_dtypes(include="object").columns:
+        df[col] = df[col].map(
+            lambda x: x if x is None or isinstance(x, str) or pd.isna(x) else str(x)
+        )
+    return df
+
+
+def copy_datasets(source, target, dataset_names):
+    """
+    Copy datasets between backends, e.g. from Google Sheets to a local directory
+    (see the `export-backend` command). The datasets are read together when the
+    source can read several datasets at once.
+
+    Returns
+    -------
+      dict[str, int]
+        Number of rows copied per dataset
+    """
+    if hasattr(source, "read_many"):
+        dfs = source.read_many(dataset_names)
+    else:
+        dfs = {
+            dataset_name: source.read(dataset_name) for dataset_name in dataset_names
+        }
+    for dataset_name, df in dfs.items():
+        target.replace(dataset_name, df)
+    return {dataset_name: len(df) for dataset_name, df in dfs.items()}
+
+
+BACKENDS = ("gsheets", "local", "memory")
+
+_backend = None
+
+
+def set_backend(name, deferred=False, **kwargs):
+    """
+    Select the backend used by the application for this process.
+
+    The in-memory backend is seeded from the local directory backend (when it
+    has data), each dataset being read on first use, so that commands can run
+    without touching the network and only read the datasets they need.
+    `deferred` only applies to Google Sheets, whose appends can be queued in
+    the local outbox.
+    """
+    global _backend
+    if name == "gsheets":
+        _backend = GoogleSheetsBackend(deferred=deferred, **kwargs)
+    elif name == "local":
+        _backend = LocalDirectoryBackend(**kwargs)
+    elif name == "memory":
+        datasets = kwargs.pop("datasets", None)
+        source = None if datasets else LocalDirectoryBackend()
+        _backend = InMemoryBackend(datasets, source=source, **kwargs)
+    else:
+        raise ValueError(f"Unknown backend '{name}': expected one of {BACKENDS}")
+    return _backend
+
+
+def get_backend():
+    """Return the selected backend (Google Sheets unless set otherwise)."""
+    global _backend
+    if _backend is None:
+        _backend = GoogleSheetsBackend()
+    return _backend
@@ -0,0 +1,666 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+from ginnastix_class.config.dataset_store import CACHE_DIR
+from ginnastix_class.config.dataset_store import CACHE_TTL
+from ginnastix_class.config.datasets import DATASETS
+from ginnastix_class.config.google_sheets import LOAD_MAX_WORKERS
+from ginnastix_class.config.google_sheets import PROBE_MAX_AGE
+from ginnastix_class.utils.backends import get_backend
+from ginnastix_class.utils.progress import print_progress
+from ginnastix_class.utils.progress import quiet
+from ginnastix_class.utils.validation import compile_schema
+
+SOURCES = ("auto", "local", "gsheets", "swr")
+
+# Dataset configuration that changes what is read from Google Sheets
+_READ_CONFIG = ("schema", "spreadsheet_id", "sheet_range", "value_render_option")
+
+
+class DatasetStore:
+    """
+    Datasets read through a local cache, shared by every command.
+
+    Datasets are cached as uncompressed Feather (Arrow IPC) files, which are
+    memory-mapped when read, so loading only some of the columns of a dataset
+    only reads those columns from disk. Each cached dataset has a manifest
+    (`<name>.meta.json`) recording when it was fetched and last checked, the
+    hash of its configuration (see `schema_hash`), the backend it was read from
+    (see `backend_identity`), its row count, the revision (fingerprint) of the
+    source it was read from and the range of rows that passed its schema. A
+    cached dataset whose configuration or backend changed is always re-read;
+    otherwise how the cache is used depends on `source`:
+
+      - "local": use the cached copy whenever there is one
+      - "auto": use the cached copy if it was checked less than its TTL ago,
+        or if the source is unchanged since it was fetched (see
+        `dataset_fingerprints`); re-read it otherwise
+      - "gsheets": always re-read from the backend, in full (append-only
+        datasets included)
+      - "swr" (stale-while-revalidate): use the cached copy whenever there is
+        one, and re-read the datasets that changed in a background thread as
+        "auto" would. Callers pick up the re-read datasets with `take_updates`
+
+    Rows are validated once: cached rows that already passed the dataset's
+    schema are not validated again, so the cost of validating a dataset that
+    grew (e.g. an append-only dataset read incrementally) is that of its new
+    rows.
+
+    Datasets are loaded at most once per store (i.e. once per run, unless
+    several threads load the same dataset at the same time) and handed out as
+    copies. A dataset loaded with only some of its columns is memoized
+    separately from the full dataset.
+    """
+
+    def __init__(self, source="auto", data_dir=None, backend=None, ttls=None):
+        if source not in SOURCES:
+            raise ValueError(f"Unknown source '{source}': expected one of {SOURCES}")
+        self.source = source
+        self.data_dir = data_dir or CACHE_DIR
+        self.ttls = ttls or {}
+        self._backend = backend
+        self._memo = {}
+        self._lock = threading.RLock()
+        self._updated = set()
+        self._revalidations = []
+        self._revalidation_errors = []
+
+    @property
+    def backend(self):
+        return self._backend or get_backend()
+
+    def read(self, name, columns=None):
+        """Return a dataset (see `load`)."""
+        return self.load([name], columns={name: columns} if columns else None)[name]
+
+    def load(self, names, columns=None):
+        """
+        Return several datasets, keyed by name.
+
+        Datasets that are not memoized or usable from the cache are re-read
+        together: with one request per spreadsheet when the backend can read
+        several datasets at once, and incrementally for append-only datasets,
+        on a bounded thread pool. The store is not locked while datasets are
+        read, so loads from several threads are not serialized.
+
+        Parameters
+        ----------
+          names : list[str]
+          columns : dict[str, list[str]], optional
+            Columns to load, keyed by dataset name (all columns by default).
+            Only these columns are read from the cache file.
+
+        Returns
+        -------
+          dict[str, pandas.DataFrame]
+        """
+        names = list(dict.fromkeys(names))
+        keys = {name: _memo_key(name, (columns or {}).get(name)) for name in names}
+        with self._lock:
+            missing = [
+                name
+                for name in names
+                if keys[name] not in self._memo and (name, None) not in self._memo
+            ]
+
+        # The lock only guards the memo: checking for changes and reading are
+        # done without it, so that loads from other threads are not serialized
+        fingerprints, offline = self._fingerprints(missing)
+        cached, stale = {}, []
+        for name in missing:
+            df = self._read_cache(name, fingerprints.get(name), offline, keys[name][1])
+            if df is None:
+                stale.append(name)
+            else:
+                cached[keys[name]] = df
+        fetched = self._fetch(stale, fingerprints)
+
+        with self._lock:
+            self._memo.update(cached)
+            for name, df in fetched.items():
+                self._memo[(name, None)] = df
+            if self.source == "swr":
+                self._revalidate(
+                    [
+                        name
+                        for name in missing
+                        if name not in stale and not self._within_ttl(name)
+                    ]
+                )
+
+            dfs = {}
+            for name in names:
+                _, projection = key = keys[name]
+                if key in self._memo:
+                    dfs[name] = self._memo[key].copy()
+                else:
+                    dfs[name] = self._memo[(name, None)][list(projection)].copy()
+            return dfs
+
+    def sync(self, names=None, max_workers=None):
+        """
+        Refresh the cache of several datasets (all datasets by default)
+        concurrently, on a bounded thread pool.
+
+        Each dataset is handled as by `load`: depending on `source` it is kept
+        if unchanged, or re-read (incrementally for append-only datasets). A
+        dataset that fails to be read or validated does not stop the others.
+        Unlike `load`, a dataset that needed checking for changes fails if the
+        source could not be reached, instead of falling back to the cache.
+
+        Returns
+        -------
+          dict[str, dict]
+            Keyed by dataset name: "status" ("cached", "read" or "failed"),
+            "rows" (None if failed), "seconds" and "error" (None unless failed)
+        """
+        names = list(dict.fromkeys(names or DATASETS))
+        fingerprints, offline = self._fingerprints(names)
+
+        def sync_one(name):
+            start = time.perf_counter()
+            status, df, error = "cached", None, None
+            try:
+                if offline and not self._within_ttl(name):
+                    raise ConnectionError(
+                        "Could not check the dataset for changes in the source"
+                    )
+                df = self._read_cache(name, fingerprints.get(name), offline)
+                if df is None:
+                    status = "read"
+                    df = self._fetch([name], fingerprints)[name]
+            except Exception as e:
+                status, error = "failed", e
+            else:
+                with self._lock:
+                    self.invalidate(name)
+                    self._memo[(name, None)] = df
+            return {
+                "status": status,
+                "rows": None if df is None else len(df),
+                "seconds": time.perf_counter() - start,
+                "error": error,
+            }
+
+        max_workers = max(1, min(len(names), max_workers or LOAD_MAX_WORKERS))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {name: pool.submit(sync_one, name) for name in names}
+            return {name: future.result() for name, future in futures.items()}
+
+    def take_updates(self, names, timeout=0):
+        """
+        Return the datasets re-read by background revalidation ("swr" source)
+        since they were loaded or last taken. Errors of the background
+        revalidation are reported here, on the calling thread.
+
+        Parameters
+        ----------
+          names : list[str]
+          timeout : float
+            Seconds to wait for running revalidations to finish
+
+        Returns
+        -------
+          dict[str, pandas.DataFrame]
+            The re-read datasets among `names` (empty if none changed)
+        """
+        deadline = time.monotonic() + timeout
+        for thread in list(self._revalidations):
+            thread.join(max(0, deadline - time.monotonic()))
+        with self._lock:
+            errors, self._revalidation_errors = self._revalidation_errors, []
+            updated = [name for name in names if name in self._updated]
+            self._updated.difference_update(updated)
+            dfs = {name: self._memo[(name, None)].copy() for name in updated}
+        for error in errors:
+            print(f"Failed to refresh datasets in the background: {error}")
+        return dfs
+
+    def _revalidate(self, names):
+        if not names:
+            return
+        thread = threading.Thread(
+            target=self._run_revalidation,
+            args=(names,),
+            name="dataset-revalidation",
+            daemon=True,
+        )
+        self._revalidations.append(thread)
+        thread.start()
+
+    def _run_revalidation(self, names):
+        # Runs while the user is being prompted, so progress messages (including
+        # those of the requests' retries) are not printed and errors are
+        # reported by `take_updates`
+        try:
+            with quiet():
+                fingerprints, offline = self._fingerprints(names, revalidate=True)
+                if offline:
+                    return
+                stale = [
+                    name
+                    for name in names
+                    if not self._check_revision(name, fingerprints.get(name))
+                ]
+                dfs = self._fetch(stale, fingerprints)
+        except Exception as e:
+            with self._lock:
+                self._revalidation_errors.append(e)
+            return
+        with self._lock:
+            for name, df in dfs.items():
+                self.invalidate(name)
+                self._memo[(name, None)] = df
+                self._updated.add(name)
+
+    def invalidate(self, name=None):
+        """Forget the memoized copies of a dataset (or of all datasets)."""
+        with self._lock:
+            for key in list(self._memo):
+                if name is None or key[0] == name:
+                    del self._memo[key]
+
+    def paths(self, name):
+        """
+        Return the paths of the cached dataset and of its manifest.
+
+        Returns
+        -------
+          tuple[str, str]
+        """
+        return (
+            os.path.join(self.data_dir, f"{name}.feather"),
+            os.path.join(self.data_dir, f"{name}.meta.json"),
+        )
+
+    def ttl(self, name):
+        return self.ttls.get(name, DATASETS.get(name, {}).get("cache_ttl", CACHE_TTL))
+
+    def load_cached(self, name, columns=None):
+        """
+        Load a cached dataset (or some of its columns) and its manifest.
+
+        Returns
+        -------
+          tuple[pandas.DataFrame | None, dict]
+            The cached DataFrame (None if there is no readable cache) and its
+            manifest (empty if missing)
+        """
+        file_name, _ = self.paths(name)
+        try:
+            # Selecting columns after opening the memory map keeps the other
+            # columns on disk (`feather.read_table(columns=...)` copies them)
+            with pa.memory_map(file_name) as source:
+                table = pa.ipc.open_file(source).read_all()
+            if columns is not None:
+                table = table.select(columns)
+            df = table.to_pandas(split_blocks=True)
+        except Exception as e:
+            print_progress(f"Failed to load local dataset from file: {e}")
+            return None, {}
+        return df, self.load_manifest(name)
+
+    def load_manifest(self, name):
+        """Return the manifest of a cached dataset (empty if missing)."""
+        try:
+            with open(self.paths(name)[1]) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def is_current(self, name, manifest):
+        """
+        Return whether a cached dataset was read with the current configuration
+        of the dataset (see `schema_hash`), from the current backend.
+        """
+        return manifest.get("schema_hash") == schema_hash(name) and manifest.get(
+            "backend"
+        ) == backend_identity(self.backend)
+
+    def save(self, name, df, fingerprint=None):
+        """
+        Cache a dataset with its manifest. The row count is the watermark for
+        incremental refreshes of append-only datasets. `df` is expected to have
+        passed the dataset's schema (as returned by the backend), so all its
+        rows are recorded as validated.
+
+        The file is written next to the cache and moved in place, so readers
+        (and memory maps of the previous file) never see a partial file.
+        """
+        Path(self.data_dir).mkdir(parents=True, exist_ok=True)
+        file_name, _ = self.paths(name)
+        try:
+            table = pa.Table.from_pandas(
+                df.reset_index(drop=True), preserve_index=False
+            )
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            print_progress(f"Failed to cache dataset '{name}': {e}")
+            return
+        feather.write_feather(table, f"{file_name}.tmp", compression="uncompressed")
+        os.replace(f"{file_name}.tmp", file_name)
+        now = datetime.now().isoformat()
+        self._write_manifest(
+            name,
+            {
+                "fetched_at": now,
+                "checked_at": now,
+                "schema_hash": schema_hash(name),
+                "backend": backend_identity(self.backend),
+                "row_count": len(df),
+                "source_revision": fingerprint,
+                "validated": _validated(name, len(df)),
+            },
+        )
+
+    def _write_manifest(self, name, manifest):
+        with open(self.paths(name)[1], "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    def _fingerprints(self, names, revalidate=False):
+        # Only "auto" (and "swr" revalidation) needs the source revision, and
+        # only for datasets whose cached copy is older than its TTL. Returns the
+        # fingerprints and whether the source could not be reached
+        if not (self.source == "auto" or revalidate) or not hasattr(
+            self.backend, "fingerprints"
+        ):
+            return {}, False
+        names = [name for name in names if not self._within_ttl(name)]
+        if not names:
+            return {}, False
+        try:
+            return dataset_fingerprints(names, self.backend), False
+        except Exception as e:
+            print_progress(
+                f"Failed to check datasets for changes, using local cache: {e}"
+            )
+            return {}, True
+
+    def _within_ttl(self, name):
+        manifest = self.load_manifest(name)
+        if not self.is_current(name, manifest):
+            return False
+        try:
+            checked_at = datetime.fromisoformat(manifest["checked_at"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        age = (datetime.now() - checked_at).total_seconds()
+        return age < self.ttl(name)
+
+    def _read_cache(self, name, fingerprint, offline=False, columns=None):
+        if self.source == "gsheets":
+            return None
+        file_name, _ = self.paths(name)
+        if not os.path.exists(file_name):
+            return None
+        if not self.is_current(name, self.load_manifest(name)):
+            print_progress(
+                f"Configuration or backend of dataset '{name}' changed, re-reading it"
+            )
+            return None
+        df, manifest = self.load_cached(name, columns)
+        if df is None:
+            return None
+        # A projection cannot be checked against the whole schema; its rows
+        # are validated when the full dataset is loaded
+        if columns is None and not self._validate(name, df, manifest):
+            return None
+        if self.source in ("local", "swr") or offline or self._within_ttl(name):
+            print_progress(f"Loading local dataset from file: {file_name}")
+            return df
+        if self._check_revision(name, fingerprint):
+            return df
+        return None
+
+    def _validate(self, name, df, manifest):
+        # Validate the cached rows that have not passed the dataset's schema yet
+        # and record them in the manifest. Returns whether the rows are valid
+        start = _validated_rows(name, manifest)
+        if start >= len(df):
+            return True
+        try:
+            _validate_rows(name, df, start)
+        except Exception as e:
+            print_progress(f"Local dataset '{name}' is invalid, re-reading it: {e}")
+            return False
+        self._write_manifest(name, {**manifest, "validated": _validated(name, len(df))})
+        return True
+
+    def _check_revision(self, name, fingerprint):
+        # Whether the cached dataset was read from the given source revision,
+        # in which case it is marked as checked now
+        manifest = self.load_manifest(name)
+        if not (
+            fingerprint is not None
+            and self.is_current(name, manifest)
+            and manifest.get("source_revision") == fingerprint
+        ):
+            return False
+        print_progress(f"Local dataset is up to date: {name}")
+        self._write_manifest(
+            name, {**manifest, "checked_at": datetime.now().isoformat()}
+        )
+        return True
+
+    def _fetch(self, names, fingerprints):
+        # Append-only datasets are refreshed incrementally, each with its own
+        # request (concurrently). The tail read only checks the first and last
+        # cached rows, so edits to earlier rows are only picked up by a full
+        # read ("gsheets")
+        tail_reads = [
+            name
+            for name in names
+            if self.source != "gsheets"
+            and DATASETS.get(name, {}).get("append_only")
+            and hasattr(self.backend, "read_tail")
+        ]
+        dfs = {}
+        if tail_reads:
+            max_workers = min(len(tail_reads), LOAD_MAX_WORKERS)
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                # Each read runs in a copy of this context, so it is silenced
+                # (see `quiet`) when this thread is
+                futures = {
+                    name: pool.submit(
+                        copy_context().run,
+                        self._refresh_tail,
+                        name,
+                        fingerprints.get(name),
+                    )
+                    for name in tail_reads
+                }
+                for name, future in futures.items():
+                    if (df := future.result()) is not None:
+                        dfs[name] = df
+        full_reads = [name for name in names if name not in dfs]
+
+        if full_reads:
+            print_progress(
+                f"Reading datasets from {backend_identity(self.backend)}: "
+                f"{', '.join(full_reads)}"
+            )
+            if hasattr(self.backend, "read_many"):
+                fetched = self.backend.read_many(full_reads)
+            else:
+                fetched = {name: self.backend.read(name) for name in full_reads}
+            for name, df in fetched.items():
+                self.save(name, df, fingerprints.get(name))
+                dfs[name] = df
+        return dfs
+
+    def _refresh_tail(self, name, fingerprint):
+        # Read only the rows past the cached row count, checking that the header,
+        # the first row and the last cached row are unchanged
+        if not self.is_current(name, self.load_manifest(name)):
+            return None
+        cached_df, manifest = self.load_cached(name)
+        row_count = manifest.get("row_count")
+        if cached_df is None or not row_count or row_count != len(cached_df):
+            return None
+
+        print_progress(
+            f"Reading new rows from {backend_identity(self.backend)}: {name} "
+            f"(after row {row_count})"
+        )
+        try:
+            # The new rows are validated once concatenated to the cached rows
+            first_df, tail_df = self.backend.read_tail(
+                name, start=row_count - 1, validate=False
+            )
+        except Exception as e:
+            print_progress(f"Incremental read failed, reading full dataset: {e}")
+            return None
+        if not (
+            _same_rows(first_df, cached_df.iloc[:1])
+            and _same_rows(tail_df.iloc[:1], cached_df.iloc[-1:])
+        ):
+            print_progress(
+                f"Cached rows changed in the backend, reading full dataset: {name}"
+            )
+            return None
+
+        new_df = tail_df.iloc[1:]
+        print_progress(f"Read {len(new_df)} new rows for dataset: {name}")
+        if len(new_df):
+            df = _concat_rows(cached_df, new_df)
+        else:
+            df = cached_df
+        # Only the new rows are validated, the cached rows already passed the
+        # schema (see `_validate`)
+        try:
+            _validate_rows(name, df, _validated_rows(name, manifest))
+        except Exception as e:
+            print_progress(f"Incremental read failed, reading full dataset: {e}")
+            return None
+        self.save(name, df, fingerprint)
+        return df
+
+
+def _memo_key(name, columns):
+    return (name, tuple(columns) if columns else None)
+
+
+def _concat_rows(df, new_df):
+    # Categorical columns with different categories would be concatenated as
+    # object columns
+    categorical = {
+        name: "category"
+        for name, dtype in df.dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype)
+    }
+    return pd.concat([df, new_df], ignore_index=True).astype(categorical)
+
+
+def _validated(name, rows):
+    # Manifest entry recording that the first `rows` rows passed the schema
+    schema = DATASETS.get(name, {}).get("schema")
+    return {
+        "schema_hash": compile_schema(schema).hash if schema else None,
+        "rows": rows,
+    }
+
+
+def _validated_rows(name, manifest):
+    # Number of leading rows of a cached dataset that passed its current schema
+    validated = manifest.get("validated") or {}
+    if validated.get("schema_hash") != _validated(name, 0)["schema_hash"]:
+        return 0
+    return min(validated.get("rows", 0), manifest.get("row_count") or 0)
+
+
+def _validate_rows(name, df, start):
+    schema = DATASETS.get(name, {}).get("schema")
+    if schema:
+        compile_schema(schema).validate(df, start=start)
+
+
+def schema_hash(name):
+    """
+    Return a hash of the configuration a dataset is read with: its schema,
+    spreadsheet, sheet range and value render option. A cached dataset whose
+    hash differs is re-read.
+    """
+    dataset_cfg = DATASETS.get(name, {})
+    config = {key: dataset_cfg.get(key) for key in _READ_CONFIG}
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+def backend_identity(backend):
+    """
+    Return the identity of a backend, recorded in the manifest of the datasets
+    cached from it: its class name and, for backends stored in (or seeded from)
+    a directory, that directory.
+    """
+    directory = getattr(backend, "directory", None) or getattr(
+        getattr(backend, "source", None), "directory", None
+    )
+    if isinstance(directory, (str, os.PathLike)):
+        return f"{type(backend).__name__}({os.path.abspath(directory)})"
+    return type(backend).__name__
+
+
+def _same_rows(df, other):
+    # Compare serialized values so that dtype details (e.g. object vs string
+    # columns, NaN vs None) do not cause spurious mismatches
+    if len(df) != len(other) or list(df.columns) != list(other.columns):
+        return False
+    return df.to_json(orient="values", date_format="iso") == other.to_json(
+        orient="values", date_format="iso"
+    )
+
+
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+
+
+def dataset_fingerprints(names, backend=None):
+    """
+    Return the fingerprints of several datasets' current contents in the
+    backend, keyed by name.
+
+    Only the given datasets are probed, together (with a single request per
+    spreadsheet), and the results are reused for `PROBE_MAX_AGE` seconds.
+    """
+    backend = backend or get_backend()
+    with _fingerprints_lock:
+        now = time.monotonic()
+        expired = [
+            name
+            for name in names
+            if name not in _fingerprints or now - _fingerprints[name][0] > PROBE_MAX_AGE
+        ]
+        if expired:
+            for name, fingerprint in backend.fingerprints(expired).items():
+                _fingerprints[name] = (now, fingerprint)
+        return {name: _fingerprints[name][1] for name in names}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def set_store(source="auto", **kwargs):
+    """Configure the dataset store used by the application for this process."""
+    global _store
+    with _store_lock:
+        _store = DatasetStore(source, **kwargs)
+        return _store
+
+
+def get_store():
+    """Return the process-wide dataset store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DatasetStore()
+        return _store
@@ -1,20 +1,45 @@
+import hashlib
 import json
+import logging
 import os.path
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from datetime import datetime
+from functools import cache
+from itertools import islice
+from pathlib import Path
 
+import numpy as np
 import pandas as pd
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from pandas.api.types import is_datetime64_any_dtype
 
 from ginnastix_class.config.datasets import DATASETS
+from ginnastix_class.config.google_sheets import APPEND_MAX_BYTES
+from ginnastix_class.config.google_sheets import APPEND_MAX_ROWS
 from ginnastix_class.config.google_sheets import CREDENTIALS_FILE
+from ginnastix_class.config.google_sheets import LOAD_MAX_WORKERS
+from ginnastix_class.config.google_sheets import OUTBOX_KEY_COLUMN
+from ginnastix_class.config.google_sheets import PROBE_RANGE
 from ginnastix_class.config.google_sheets import SCOPES
 from ginnastix_class.config.google_sheets import TOKEN_FILE
+from ginnastix_class.utils.instrumentation import dataset_context
+from ginnastix_class.utils.instrumentation import tags_dataset
+from ginnastix_class.utils.outbox import BackgroundFlusher
+from ginnastix_class.utils.outbox import get_outbox
+from ginnastix_class.utils.request_executor import get_executor
+from ginnastix_class.utils.validation import compile_schema
 from ginnastix_class.utils.validation import standardize
 from ginnastix_class.utils.validation import validate_dataset
 
+logger = logging.getLogger(__name__)
+
 
 def authenticate(credentials_file=None, token_file=None, scopes=None):
     """
@@ -75,8 +100,167 @@ def authenticate(credentials_file=None, token_file=None, scopes=None):
     return creds
 
 
+class SheetsSession:
+    """
+    Google Sheets connection shared by the dataset helpers.
+
+    Credentials are loaded once and the `spreadsheets()` resource is built
+    once per thread, on first use, so consecutive API calls reuse both. Each
+    thread gets its own resource because the underlying `httplib2` transport
+    is not thread-safe. Sheet properties (title, sheetId, index and grid size)
+    are cached per spreadsheet and kept up to date from the replies of the
+    batch updates sent through the session. Value writes that may resize a
+    sheet (appends, updates past the last row) drop the cached properties of
+    its spreadsheet instead (see `invalidate_sheet_properties`).
+    """
+
+    def __init__(self, credentials=None):
+        self._credentials = credentials
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._sheet_properties = {}
+
+    @property
+    def credentials(self):
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = authenticate()
+            return self._credentials
+
+    @property
+    def sheet(self):
+        if getattr(self._local, "sheet", None) is None:
+            self._local.sheet = get_sheet(self.credentials)
+        return self._local.sheet
+
+    def sheet_properties(self, spreadsheet_id):
+        """
+        Return the properties of every sheet in a spreadsheet.
+
+        Returns
+        -------
+          dict[str, dict]
+            Sheet properties keyed by sheet title
+        """
+        with self._lock:
+            if spreadsheet_id not in self._sheet_properties:
+                result = read_sheet_properties(self.sheet, spreadsheet_id)
+                self._sheet_properties[spreadsheet_id] = {
+                    _sheet["properties"]["title"]: _sheet["properties"]
+                    for _sheet in result.get("sheets", [])
+                }
+            return self._sheet_properties[spreadsheet_id]
+
+    def invalidate_sheet_properties(self, spreadsheet_id):
+        """
+        Forget the cached properties of a spreadsheet after a write that may
+        have changed the size of one of its sheets. They are read again on
+        next use.
+        """
+        with self._lock:
+            self._sheet_properties.pop(spreadsheet_id, None)
+
+    def batch_update(self, spreadsheet_id, requests):
+        """
+        Apply a list of requests to a spreadsheet in one `batchUpdate` call.
+
+        References
+        ----------
+        https://developers.google.com/workspace/sheets/api/reference/rest/v4/spreadsheets/batchUpdate
+        """
+        body = {"requests": requests}
+        response = execute_request(
+            self.sheet.batchUpdate(spreadsheetId=spreadsheet_id, body=body),
+            kind="write",
+        )
+        with self._lock:
+            if spreadsheet_id in self._sheet_properties:
+                try:
+                    _patch_sheet_properties(
+                        self._sheet_properties[spreadsheet_id],
+                        requests,
+                        response.get("replies", []),
+                    )
+                except Exception:
+                    # Fall back to a fresh read on next use
+                    del self._sheet_properties[spreadsheet_id]
+        return response
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session(credentials=None):
+    """
+    Return the process-wide Sheets session.
+
+    A dedicated session is returned when explicit credentials are given.
+    """
+    global _session
+    if credentials is not None:
+        return SheetsSession(credentials)
+    with _session_lock:
+        if _session is None:
+            _session = SheetsSession()
+        return _session
+
+
+def _patch_sheet_properties(sheet_properties, requests, replies):
+    by_id = {props["sheetId"]: props for props in sheet_properties.values()}
+    for request, reply in zip(requests, replies):
+        ((kind, params),) = request.items()
+        if kind in ("addSheet", "duplicateSheet"):
+            props = reply[kind]["properties"]
+            for _props in by_id.values():
+                if _props.get("index", 0) >= props.get("index", 0):
+                    _props["index"] = _props.get("index", 0) + 1
+            by_id[props["sheetId"]] = props
+        elif kind == "deleteSheet":
+            props = by_id.pop(params["sheetId"])
+            for _props in by_id.values():
+                if _props.get("index", 0) > props.get("index", 0):
+                    _props["index"] = _props.get("index", 0) - 1
+        elif kind == "updateSheetProperties":
+            props = by_id[params["properties"]["sheetId"]]
+            for field in params["fields"].split(","):
+                *parents, key = field.strip().split(".")
+                source, target = params["properties"], props
+                for parent in parents:
+                    source = source.get(parent, {})
+                    target = target.setdefault(parent, {})
+                target[key] = source[key]
+        elif kind in ("insertDimension", "deleteDimension"):
+            _range = params["range"]
+            props = by_id[_range["sheetId"]]
+            key = "rowCount" if _range["dimension"] == "ROWS" else "columnCount"
+            n = _range["endIndex"] - _range["startIndex"]
+            props["gridProperties"][key] += n if kind == "insertDimension" else -n
+        elif kind == "appendDimension":
+            props = by_id[params["sheetId"]]
+            key = "rowCount" if params["dimension"] == "ROWS" else "columnCount"
+            props["gridProperties"][key] += params["length"]
+    sheet_properties.clear()
+    sheet_properties.update({props["title"]: props for props in by_id.values()})
+
+
+def execute_request(request, kind="read"):
+    """
+    Execute an API request through the process-wide request executor, which
+    applies the read/write rate limits and retries throttled requests.
+    """
+    return get_executor().execute(request, kind)
+
+
+@cache
+def _discovery_document():
+    # Use the discovery document bundled with googleapiclient instead of
+    # fetching (and re-parsing) it every time the service is built
+    return json.loads(get_static_doc("sheets", "v4"))
+
+
 def get_sheets_service(credentials):
-    return build("sheets", "v4", credentials=credentials)
+    return build_from_document(_discovery_document(), credentials=credentials)
 
 
 def get_sheet(credentials):
@@ -85,20 +269,60 @@ def get_sheet(credentials):
     return sheet
 
 
-def read_sheet_data(sheet, spreadsheet_id, sheet_range):
+def read_sheet_data(sheet, spreadsheet_id, sheet_range, value_render_option=None):
     """
     Return a range of values from a spreadsheet.
 
+    Values are returned as displayed (`FORMATTED_VALUE`) unless another
+    `value_render_option` is given. With `UNFORMATTED_VALUE`, numbers are
+    returned as numbers and dates as serial numbers.
+
     References
     ----------
     https://developers.google.com/workspace/sheets/api/reference/rest/v4/spreadsheets.values/get
+    https://developers.google.com/workspace/sheets/api/reference/rest/v4/ValueRenderOption
     """
-    result = (
-        sheet.values().get(spreadsheetId=spreadsheet_id, range=sheet_range).execute()
+    result = execute_request(
+        sheet.values().get(
+            spreadsheetId=spreadsheet_id,
+            range=sheet_range,
+            **_render_options(value_render_option),
+        )
     )
     return result
 
 
+def read_sheet_data_batch(
+    sheet, spreadsheet_id, sheet_ranges, value_render_option=None
+):
+    """
+    Return several ranges of values from a spreadsheet in a single request.
+
+    The value ranges are returned in the same order as the requested ranges.
+
+    References
+    ----------
+    https://developers.google.com/workspace/sheets/api/reference/rest/v4/spreadsheets.values/batchGet
+    """
+    result = execute_request(
+        sheet.values().batchGet(
+            spreadsheetId=spreadsheet_id,
+            ranges=list(sheet_ranges),
+            **_render_options(value_render_option),
+        )
+    )
+    return result
+
+
+def _render_options(value_render_option):
+    if not value_render_option:
+        return {}
+    return {
+        "valueRenderOption": value_render_option,
+        "dateTimeRenderOption": "SERIAL_NUMBER",
+    }
+
+
 def read_sheet_properties(sheet, spreadsheet_id):
     """
     Return the spreadsheet properties at the given ID.
@@ -108,73 +332,439 @@ def read_sheet_properties(sheet, spreadsheet_id):
     https://developers.google.com/workspace/sheets/api/reference/rest/v4/spreadsheets/get
     https://developers.google.com/workspace/sheets/api/guides/field-masks
     """
-    result = sheet.get(
-        spreadsheetId=spreadsheet_id, fields="sheets.properties"
-    ).execute()
+    result = execute_request(
+        sheet.get(spreadsheetId=spreadsheet_id, fields="sheets.properties")
+    )
     return result
 
 
-def read_dataset(dataset_name, credentials=None):
+@tags_dataset
+def read_dataset(dataset_name, credentials=None, session=None):
     dataset_cfg = _get_dataset_config(dataset_name)
-    credentials = credentials or authenticate()
-    sheet = get_sheet(credentials)
+    session = session or get_session(credentials)
+    sheet = session.sheet
 
     data_result = read_sheet_data(
         sheet,
         spreadsheet_id=dataset_cfg["spreadsheet_id"],
         sheet_range=dataset_cfg["sheet_range"],
+        value_render_option=dataset_cfg.get("value_render_option"),
     )
-    df = pd.DataFrame(
-        data_result["values"][dataset_cfg.get("data_index", 1) :],
-        columns=data_result["values"][dataset_cfg.get("columns_index", 0)],
+    return _values_to_dataset(data_result["values"], dataset_cfg)
+
+
+@tags_dataset
+def read_dataset_tail(
+    dataset_name, start, credentials=None, session=None, validate=True
+):
+    """
+    Read the rows of a dataset from data row `start` (0-based) onwards.
+
+    The header row, the first data row and the rows from `start` onwards are
+    fetched with a single `values.batchGet` call, so that callers holding the
+    earlier rows can check that they are unchanged before appending the rest.
+
+    Returns
+    -------
+      tuple[pandas.DataFrame, pandas.DataFrame]
+        The first row and the rows from `start` onwards, standardized and,
+        unless `validate` is False (for callers that validate the rows they
+        keep), validated. Validation fails if the header changed.
+    """
+    dataset_cfg = _get_dataset_config(dataset_name)
+    session = session or get_session(credentials)
+
+    sheet_name = dataset_cfg["sheet_range"]
+    last_column = _column_letter(len(dataset_cfg["schema"]) - 1)
+    header_row = dataset_cfg.get("columns_index", 0) + 1
+    first_row = dataset_cfg.get("data_index", 1) + 1
+    data_result = read_sheet_data_batch(
+        session.sheet,
+        spreadsheet_id=dataset_cfg["spreadsheet_id"],
+        sheet_ranges=[
+            _a1_range(sheet_name, f"A{header_row}:{last_column}{header_row}"),
+            _a1_range(sheet_name, f"A{first_row}:{last_column}{first_row}"),
+            _a1_range(sheet_name, f"A{first_row + start}:{last_column}"),
+        ],
+        value_render_option=dataset_cfg.get("value_render_option"),
+    )
+    header, first, tail = (
+        value_range.get("values", []) for value_range in data_result["valueRanges"]
+    )
+    dataset_cfg = {**dataset_cfg, "columns_index": 0, "data_index": 1}
+    return (
+        _values_to_dataset(header + first, dataset_cfg, validate),
+        _values_to_dataset(header + tail, dataset_cfg, validate),
     )
-    df = standardize(df, dataset_cfg["schema"])
-    validate_dataset(df, dataset_cfg["schema"])
-    return df
 
 
-def append_dataset_rows(dataset_name, df, credentials=None, include_columns=False):
+@tags_dataset
+def read_datasets(dataset_names, credentials=None, session=None, max_workers=None):
+    """
+    Read several datasets with one request per spreadsheet.
+
+    Datasets are grouped by spreadsheet ID (and value render option) and each
+    group is fetched with a single `values.batchGet` call, so the number of
+    round trips is bounded by the number of distinct spreadsheets rather than
+    the number of datasets. The groups are fetched concurrently on a bounded
+    thread pool (of at most `max_workers` threads, `LOAD_MAX_WORKERS` by
+    default).
+
+    Returns
+    -------
+      dict[str, pandas.DataFrame]
+        Datasets keyed by name, in the order they were requested
+    """
+    dataset_cfgs = {name: _get_dataset_config(name) for name in dataset_names}
+    session = session or get_session(credentials)
+
+    names_by_request = {}
+    for name, dataset_cfg in dataset_cfgs.items():
+        key = (dataset_cfg["spreadsheet_id"], dataset_cfg.get("value_render_option"))
+        names_by_request.setdefault(key, []).append(name)
+
+    def read_group(spreadsheet_id, value_render_option, names):
+        # Runs on a pool thread, which has its own Sheets resource (see
+        # `SheetsSession.sheet`). Its API calls are attributed to the datasets
+        # of the group only
+        with dataset_context(",".join(names)):
+            data_result = read_sheet_data_batch(
+                session.sheet,
+                spreadsheet_id=spreadsheet_id,
+                sheet_ranges=[dataset_cfgs[name]["sheet_range"] for name in names],
+                value_render_option=value_render_option,
+            )
+        return {
+            name: _values_to_dataset(value_range.get("values", []), dataset_cfgs[name])
+            for name, value_range in zip(names, data_result["valueRanges"])
+        }
+
+    dfs = {}
+    max_workers = max(1, min(len(names_by_request), max_workers or LOAD_MAX_WORKERS))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Each group is read in a copy of this context, so that progress
+        # messages stay silenced in background threads (see `quiet`)
+        futures = [
+            pool.submit(copy_context().run, read_group, *key, names)
+            for key, names in names_by_request.items()
+        ]
+        for future in futures:
+            dfs.update(future.result())
+
+    return {name: dfs[name] for name in dataset_cfgs}
+
+
+@tags_dataset
+def read_dataset_fingerprints(dataset_names, credentials=None, session=None):
+    """
+    Fingerprint the current contents of several datasets with one request per
+    spreadsheet.
+
+    The fingerprint is a hash of the values of the dataset's `probe_range`, read
+    with `values.batchGet`, so it changes when rows are added, removed or
+    edited in that range. Unless configured otherwise, this is the first column
+    of append-only datasets, whose rows are not edited, and the columns of the
+    schema of other (small, reference) datasets. It is cheap to compute
+    compared to reading the append-only datasets.
+
+    Returns
+    -------
+      dict[str, str]
+        Fingerprints keyed by dataset name
+    """
+    dataset_cfgs = {name: _get_dataset_config(name) for name in dataset_names}
+    session = session or get_session(credentials)
+
+    names_by_spreadsheet = {}
+    for name, dataset_cfg in dataset_cfgs.items():
+        names_by_spreadsheet.setdefault(dataset_cfg["spreadsheet_id"], []).append(name)
+
+    fingerprints = {}
+    for spreadsheet_id, names in names_by_spreadsheet.items():
+        data_result = read_sheet_data_batch(
+            session.sheet,
+            spreadsheet_id=spreadsheet_id,
+            sheet_ranges=[
+                _a1_range(
+                    dataset_cfgs[name]["sheet_range"], _probe_range(dataset_cfgs[name])
+                )
+                for name in names
+            ],
+        )
+        for name, value_range in zip(names, data_result["valueRanges"]):
+            fingerprints[name] = hashlib.sha256(
+                json.dumps(value_range.get("values", [])).encode()
+            ).hexdigest()
+
+    return fingerprints
+
+
+@tags_dataset
+def append_dataset_rows(
+    dataset_name,
+    df,
+    credentials=None,
+    include_columns=False,
+    session=None,
+    max_rows=None,
+    max_bytes=None,
+    checkpoint_dir="data",
+    deferred=False,
+):
+    """
+    Append rows to a dataset in chunks of at most `max_rows` rows and
+    (approximately) `max_bytes` bytes of JSON each.
+
+    When more than one chunk is needed, the number of committed rows is stored
+    in a checkpoint file under `checkpoint_dir` after every chunk. Appending the
+    same rows again after an interruption resumes after the last committed
+    chunk instead of re-sending (and duplicating) the rows before it.
+
+    With `deferred`, the chunks are stored in the local outbox instead and
+    written by a background flusher (see `flush_outbox`), so the call returns
+    without waiting for (or needing) the network.
+    """
     # Validate
     dataset_cfg = _get_dataset_config(dataset_name)
     df = standardize(df, dataset_cfg["schema"])
     validate_dataset(df, dataset_cfg["schema"])
 
-    # Convert dataframe to JSON-serializable array
-    gsheet_body = _dataframe_to_gsheet_body(df, include_columns=include_columns)
+    if deferred:
+        rows = _iter_gsheet_rows(
+            df, include_columns=include_columns, schema=dataset_cfg["schema"]
+        )
+        chunks = _chunk_rows(
+            rows,
+            max_rows=max_rows or APPEND_MAX_ROWS,
+            max_bytes=max_bytes or APPEND_MAX_BYTES,
+        )
+        get_outbox().enqueue(dataset_name, chunks)
+        print(f"Queued n={df.shape[0]} records for Google Sheets")
+        get_outbox_flusher().wake()
+        return
+
+    # Resume from a previous, interrupted append of the same rows
+    fingerprint = _dataframe_fingerprint(df, include_columns)
+    checkpoint_file = os.path.join(checkpoint_dir, f"{dataset_name}.append.json")
+    committed_rows = _read_append_checkpoint(checkpoint_file, fingerprint)
+    if committed_rows:
+        print(f"Resuming append after {committed_rows} committed rows")
+
+    # Convert dataframe to JSON-serializable rows, chunked as they are produced
+    total_rows = df.shape[0] + int(include_columns)
+    rows = _iter_gsheet_rows(
+        df, include_columns=include_columns, schema=dataset_cfg["schema"]
+    )
+    chunks = _chunk_rows(
+        islice(rows, committed_rows, None),
+        max_rows=max_rows or APPEND_MAX_ROWS,
+        max_bytes=max_bytes or APPEND_MAX_BYTES,
+    )
 
     # Get current state of sheet
-    credentials = credentials or authenticate()
-    sheet = get_sheet(credentials)
+    session = session or get_session(credentials)
 
     # Write data
     print(f"Writing n={df.shape[0]} records to Google Sheets")
-    result = (
-        sheet.values()
-        .append(
-            spreadsheetId=dataset_cfg["spreadsheet_id"],
-            range=dataset_cfg["sheet_range"],
-            valueInputOption="USER_ENTERED",
-            insertDataOption="INSERT_ROWS",
-            body=gsheet_body,
+    url = f"https://docs.google.com/spreadsheets/d/{dataset_cfg['spreadsheet_id']}"
+    for i, chunk in enumerate(chunks):
+        result = _append_values(session, dataset_cfg, chunk)
+        committed_rows += len(chunk)
+        if committed_rows < total_rows:
+            print(f"Chunk {i + 1}: {committed_rows}/{total_rows} rows committed")
+            _write_append_checkpoint(checkpoint_file, fingerprint, committed_rows)
+        print(f"{result.get('updates').get('updatedCells')} cells updated in {url}")
+
+    if os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+
+
+def _append_values(session, dataset_cfg, values):
+    try:
+        return execute_request(
+            session.sheet.values().append(
+                spreadsheetId=dataset_cfg["spreadsheet_id"],
+                range=dataset_cfg["sheet_range"],
+                valueInputOption="USER_ENTERED",
+                insertDataOption="INSERT_ROWS",
+                body={"values": values},
+            ),
+            kind="write",
         )
-        .execute()
+    finally:
+        # Inserted rows change the grid size (even if the call failed, some
+        # rows may have been inserted)
+        session.invalidate_sheet_properties(dataset_cfg["spreadsheet_id"])
+
+
+def flush_outbox(outbox=None, credentials=None, session=None):
+    """
+    Write the rows waiting in the outbox to Google Sheets.
+
+    Entries are sent per dataset in coalesced batches, each one `values.append`
+    call (see `Outbox.claim`). Every row is written with the idempotency key of
+    its entry, in a hidden column of the sheet (see `_outbox_key_column`). A
+    stale batch, left by a flush that was interrupted after sending it, is
+    only sent again if its keys are not in that column.
+
+    Returns
+    -------
+      dict[str, int]
+        Number of rows written per dataset
+    """
+    outbox = outbox or get_outbox()
+    written = {}
+    for dataset_name in outbox.pending():
+        with dataset_context(dataset_name):
+            written[dataset_name] = _flush_outbox_dataset(
+                outbox, dataset_name, credentials, session
+            )
+    return {name: n_rows for name, n_rows in written.items() if n_rows}
+
+
+def _flush_outbox_dataset(outbox, dataset_name, credentials, session):
+    dataset_cfg = _get_dataset_config(dataset_name)
+    written = 0
+    key_column = None
+    while batch := outbox.claim(dataset_name, APPEND_MAX_ROWS, APPEND_MAX_BYTES):
+        batch_id, rows, keys, stale = batch
+        session = session or get_session(credentials)
+        try:
+            if key_column is None:
+                key_column = _outbox_key_column(session, dataset_cfg)
+            if stale and _rows_landed(session, dataset_cfg, key_column, keys):
+                print(f"Queued rows were already written to '{dataset_name}'")
+            else:
+                # A leading apostrophe keeps the key as text (a key such as
+                # "12e3..." would otherwise be entered as a number)
+                values = [
+                    row + [""] * (key_column - len(row)) + [f"'{key}"]
+                    for row, key in zip(rows, keys)
+                ]
+                result = _append_values(session, dataset_cfg, values)
+                written += len(rows)
+                print(
+                    f"{result.get('updates').get('updatedCells')} cells updated "
+                    f"in '{dataset_name}' from the outbox"
+                )
+        except BaseException:
+            outbox.abandon(batch_id)
+            raise
+        outbox.complete(batch_id)
+    return written
+
+
+def _outbox_key_column(session, dataset_cfg):
+    """
+    Return the index of the column holding the idempotency keys of the rows
+    written from the outbox. The column is added (hidden, after the last column
+    of the header) on first use.
+    """
+    spreadsheet_id = dataset_cfg["spreadsheet_id"]
+    sheet_name = dataset_cfg["sheet_range"]
+    header_index = dataset_cfg.get("columns_index", 0)
+    data_result = read_sheet_data(
+        session.sheet,
+        spreadsheet_id,
+        _a1_range(sheet_name, f"{header_index + 1}:{header_index + 1}"),
     )
-    url = f"https://docs.google.com/spreadsheets/d/{dataset_cfg['spreadsheet_id']}"
-    print(f"{result.get('updates').get('updatedCells')} cells updated in {url}")
+    header = (data_result.get("values") or [[]])[0]
+    if OUTBOX_KEY_COLUMN in header:
+        return header.index(OUTBOX_KEY_COLUMN)
+
+    index = len(header)
+    props = session.sheet_properties(spreadsheet_id)[sheet_name]
+    sheet_id = props["sheetId"]
+    requests = []
+    missing_columns = index + 1 - props["gridProperties"]["columnCount"]
+    if missing_columns > 0:
+        requests.append(
+            {
+                "appendDimension": {
+                    "sheetId": sheet_id,
+                    "dimension": "COLUMNS",
+                    "length": missing_columns,
+                }
+            }
+        )
+    requests += [
+        {
+            "updateCells": {
+                "rows": [
+                    {
+                        "values": [
+                            {"userEnteredValue": {"stringValue": OUTBOX_KEY_COLUMN}}
+                        ]
+                    }
+                ],
+                "start": {
+                    "sheetId": sheet_id,
+                    "rowIndex": header_index,
+                    "columnIndex": index,
+                },
+                "fields": "userEnteredValue",
+            }
+        },
+        {
+            "updateDimensionProperties": {
+                "range": {
+                    "sheetId": sheet_id,
+                    "dimension": "COLUMNS",
+                    "startIndex": index,
+                    "endIndex": index + 1,
+                },
+                "properties": {"hiddenByUser": True},
+                "fields": "hiddenByUser",
+            }
+        },
+    ]
+    session.batch_update(spreadsheet_id, requests)
+    return index
+
+
+def _rows_landed(session, dataset_cfg, key_column, keys):
+    # Only the key column is read. The rows of a batch are written by a single
+    # `values.append` call, so either all of its keys are there or none is.
+    column = _column_letter(key_column)
+    first_row = dataset_cfg.get("data_index", 1) + 1
+    data_result = read_sheet_data(
+        session.sheet,
+        dataset_cfg["spreadsheet_id"],
+        _a1_range(dataset_cfg["sheet_range"], f"{column}{first_row}:{column}"),
+    )
+    written_keys = {row[0] for row in data_result.get("values", []) if row}
+    return keys[0] in written_keys
 
 
-def truncate_reload_dataset_rows(dataset_name, df, credentials=None):
+_outbox_flusher = None
+_outbox_flusher_lock = threading.Lock()
+
+
+def get_outbox_flusher():
+    """Return the process-wide background flusher of the outbox, started."""
+    global _outbox_flusher
+    with _outbox_flusher_lock:
+        if _outbox_flusher is None:
+            _outbox_flusher = BackgroundFlusher(
+                flush_outbox, pending=lambda: get_outbox().pending()
+            ).start()
+        return _outbox_flusher
+
+
+@tags_dataset
+def truncate_reload_dataset_rows(dataset_name, df, credentials=None, session=None):
     # Validate
     dataset_cfg = _get_dataset_config(dataset_name)
     df = standardize(df, dataset_cfg["schema"])
     validate_dataset(df, dataset_cfg["schema"])
 
     # Convert dataframe to JSON-serializable array
-    gsheet_body = _dataframe_to_gsheet_body(df, include_columns=True)
+    gsheet_body = _dataframe_to_gsheet_body(
+        df, include_columns=True, schema=dataset_cfg["schema"]
+    )
 
     # Get current state of sheet
-    credentials = credentials or authenticate()
-    sheet = get_sheet(credentials)
+    session = session or get_session(credentials)
 
     # Truncate data
     rand_id = datetime.now().strftime("%Y%m%d%H%M%S")
@@ -184,32 +774,25 @@ def truncate_reload_dataset_rows(dataset_name, df, credentials=None):
         dataset_cfg["spreadsheet_id"],
         sheet_name=dataset_cfg["sheet_range"],
         new_sheet_name=temp_sheet_name,
+        session=session,
     )
     print("Truncating sheet")
     truncate_sheet(
         dataset_cfg["spreadsheet_id"],
         sheet_name=dataset_cfg["sheet_range"],
+        session=session,
     )
 
     try:
         # Write data
         print(f"Writing n={df.shape[0]} records to Google Sheets")
-        result = (
-            sheet.values()
-            .append(
-                spreadsheetId=dataset_cfg["spreadsheet_id"],
-                range=dataset_cfg["sheet_range"],
-                valueInputOption="USER_ENTERED",
-                insertDataOption="INSERT_ROWS",
-                body=gsheet_body,
-            )
-            .execute()
-        )
+        result = _append_values(session, dataset_cfg, gsheet_body["values"])
         url = f"https://docs.google.com/spreadsheets/d/{dataset_cfg['spreadsheet_id']}"
         print(f"{result.get('updates').get('updatedCells')} cells updated in {url}")
         delete_sheet(
             dataset_cfg["spreadsheet_id"],
             sheet_name=temp_sheet_name,
+            session=session,
         )
     except Exception:
         # Do rollback
@@ -221,15 +804,276 @@ def truncate_reload_dataset_rows(dataset_name, df, credentials=None):
             dataset_cfg["spreadsheet_id"],
             sheet_name=dataset_cfg["sheet_range"],
             prompt_user=True,
+            session=session,
         )
         duplicate_sheet(
             dataset_cfg["spreadsheet_id"],
             sheet_name=temp_sheet_name,
             new_sheet_name=dataset_cfg["sheet_range"],
+            session=session,
         )
         raise
 
 
+@tags_dataset
+def swap_reload_dataset_rows(dataset_name, df, credentials=None, session=None):
+    """
+    Replace the contents of a dataset by writing a staging sheet and swapping it in.
+
+    The live sheet is duplicated (to keep its formatting) and the copy's values
+    are cleared in one batch update; the new contents are then written to the
+    copy. A final batch update deletes the live sheet and renames the copy in
+    its place, so the swap is atomic and the live sheet is never left empty.
+    If writing fails, the staging sheet is removed and the live sheet is left
+    untouched, without prompting.
+    """
+    # Validate
+    dataset_cfg = _get_dataset_config(dataset_name)
+    df = standardize(df, dataset_cfg["schema"])
+    validate_dataset(df, dataset_cfg["schema"])
+
+    # Convert dataframe to JSON-serializable array
+    gsheet_body = _dataframe_to_gsheet_body(
+        df, include_columns=True, schema=dataset_cfg["schema"]
+    )
+
+    # Get current state of sheet
+    session = session or get_session(credentials)
+    spreadsheet_id = dataset_cfg["spreadsheet_id"]
+    sheet_name = dataset_cfg["sheet_range"]
+    live_sheet_id = get_sheet_id(spreadsheet_id, sheet_name, session=session)
+    sheet_properties = session.sheet_properties(spreadsheet_id)
+    live_index = sheet_properties[sheet_name].get("index", 0)
+    url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}"
+
+    # Create an empty staging copy of the sheet
+    staging_sheet_name = f"_staging_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    staging_sheet_id = _new_sheet_id(sheet_properties)
+    print(f"Creating staging sheet '{staging_sheet_name}'")
+    session.batch_update(
+        spreadsheet_id,
+        [
+            {
+                "duplicateSheet": {
+                    "sourceSheetId": live_sheet_id,
+                    "insertSheetIndex": live_index + 1,
+                    "newSheetId": staging_sheet_id,
+                    "newSheetName": staging_sheet_name,
+                }
+            },
+            {
+                "updateCells": {
+                    "range": {"sheetId": staging_sheet_id},
+                    "fields": "userEnteredValue",
+                }
+            },
+        ],
+    )
+
+    try:
+        # Write data
+        print(f"Writing n={df.shape[0]} records to Google Sheets")
+        try:
+            result = execute_request(
+                session.sheet.values().update(
+                    spreadsheetId=spreadsheet_id,
+                    range=_a1_range(staging_sheet_name, "A1"),
+                    valueInputOption="USER_ENTERED",
+                    body=gsheet_body,
+                ),
+                kind="write",
+            )
+        finally:
+            # The staging sheet grows if the new contents have more rows
+            session.invalidate_sheet_properties(spreadsheet_id)
+
+        # Swap the staging sheet in
+        session.batch_update(
+            spreadsheet_id,
+            [
+                {"deleteSheet": {"sheetId": live_sheet_id}},
+                {
+                    "updateSheetProperties": {
+                        "properties": {
+                            "sheetId": staging_sheet_id,
+                            "title": sheet_name,
+                            "index": live_index,
+                        },
+                        "fields": "title,index",
+                    }
+                },
+            ],
+        )
+    except Exception:
+        print(f"Encountered an error when writing new data to '{sheet_name}'")
+        print(f"Removing staging sheet '{staging_sheet_name}'")
+        session.batch_update(
+            spreadsheet_id, [{"deleteSheet": {"sheetId": staging_sheet_id}}]
+        )
+        raise
+
+    print(f"{result.get('updatedCells')} cells updated in {url}")
+
+
+@tags_dataset
+def sync_dataset_rows(dataset_name, df, key_columns, credentials=None, session=None):
+    """
+    Update a dataset in place, writing only the rows and cells that changed.
+
+    The current sheet is read and diffed against `df` by `key_columns`. Rows
+    whose key disappeared are removed and rows with a new key are inserted with
+    `deleteDimension`/`insertDimension` requests (one batch update), then the
+    changed cells are written with one `values.batchUpdate`. Falls back to
+    `swap_reload_dataset_rows` when the header changed, keys are not unique or
+    the rows that are kept are not in the same relative order.
+    """
+    # Validate
+    dataset_cfg = _get_dataset_config(dataset_name)
+    df = standardize(df, dataset_cfg["schema"])
+    validate_dataset(df, dataset_cfg["schema"])
+
+    # Get current state of sheet
+    session = session or get_session(credentials)
+    spreadsheet_id = dataset_cfg["spreadsheet_id"]
+    sheet_name = dataset_cfg["sheet_range"]
+    url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}"
+    data_result = read_sheet_data(
+        session.sheet,
+        spreadsheet_id,
+        sheet_name,
+        value_render_option=dataset_cfg.get("value_render_option"),
+    )
+    try:
+        current_df = _values_to_dataset(data_result.get("values", []), dataset_cfg)
+    except Exception as e:
+        print(f"Cannot diff against the current contents of '{sheet_name}': {e}")
+        current_df = None
+
+    # Compare serialized values so that both sides have the same representation
+    new_rows = _dataframe_to_gsheet_body(df, schema=dataset_cfg["schema"])["values"]
+    key_idxs = [list(df.columns).index(col) for col in key_columns]
+    new_keys = [tuple(row[i] for i in key_idxs) for row in new_rows]
+    if current_df is not None and list(current_df.columns) == list(df.columns):
+        current_rows = _dataframe_to_gsheet_body(
+            current_df, schema=dataset_cfg["schema"]
+        )["values"]
+        current_keys = [tuple(row[i] for i in key_idxs) for row in current_rows]
+        plan = _plan_row_sync(current_keys, new_keys)
+    else:
+        plan = None
+    if plan is None:
+        print(f"Falling back to a full reload of '{sheet_name}'")
+        return swap_reload_dataset_rows(dataset_name, df, session=session)
+    deleted, inserted = plan
+
+    # Remove and insert rows
+    data_index = dataset_cfg.get("data_index", 1)
+    sheet_id = get_sheet_id(spreadsheet_id, sheet_name, session=session)
+    dimension_requests = [
+        {
+            "deleteDimension": {
+                "range": {
+                    "sheetId": sheet_id,
+                    "dimension": "ROWS",
+                    "startIndex": data_index + start,
+                    "endIndex": data_index + stop,
+                }
+            }
+        }
+        for start, stop in reversed(_contiguous_runs(deleted))
+    ] + [
+        {
+            "insertDimension": {
+                "range": {
+                    "sheetId": sheet_id,
+                    "dimension": "ROWS",
+                    "startIndex": data_index + start,
+                    "endIndex": data_index + stop,
+                },
+                "inheritFromBefore": data_index + start > 0,
+            }
+        }
+        for start, stop in _contiguous_runs(inserted)
+    ]
+    if dimension_requests:
+        print(f"Deleting {len(deleted)} and inserting {len(inserted)} rows")
+        session.batch_update(spreadsheet_id, dimension_requests)
+
+    # Write changed cells
+    current_by_key = dict(zip(current_keys, current_rows))
+    data = []
+    for i, (key, row) in enumerate(zip(new_keys, new_rows)):
+        current_row = current_by_key.get(key)
+        if current_row is None:
+            changed = [value != "" for value in row]
+        else:
+            changed = [a != b for a, b in zip(row, current_row)]
+        row_number = data_index + i + 1
+        for start, stop in _contiguous_runs([j for j, c in enumerate(changed) if c]):
+            cell_range = (
+                f"{_column_letter(start)}{row_number}:"
+                f"{_column_letter(stop - 1)}{row_number}"
+            )
+            data.append(
+                {
+                    "range": _a1_range(sheet_name, cell_range),
+                    "values": [row[start:stop]],
+                }
+            )
+    if not data:
+        print(f"No cells changed in '{sheet_name}'")
+        return
+
+    result = execute_request(
+        session.sheet.values().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={"valueInputOption": "USER_ENTERED", "data": data},
+        ),
+        kind="write",
+    )
+    print(f"{result.get('totalUpdatedCells')} cells updated in {url}")
+
+
+def _plan_row_sync(current_keys, new_keys):
+    """
+    Return the positions to delete from the current rows and to insert into the
+    new rows, or None if the rows cannot be synced in place.
+    """
+    if len(set(current_keys)) != len(current_keys) or len(set(new_keys)) != len(
+        new_keys
+    ):
+        return None
+    new_key_set = set(new_keys)
+    current_key_set = set(current_keys)
+    deleted = [i for i, key in enumerate(current_keys) if key not in new_key_set]
+    inserted = [i for i, key in enumerate(new_keys) if key not in current_key_set]
+    kept_current = [key for key in current_keys if key in new_key_set]
+    kept_new = [key for key in new_keys if key in current_key_set]
+    if kept_current != kept_new:
+        return None
+    return deleted, inserted
+
+
+def _contiguous_runs(positions):
+    """Group sorted positions into half-open (start, stop) ranges."""
+    runs = []
+    for i in sorted(positions):
+        if runs and runs[-1][1] == i:
+            runs[-1][1] = i + 1
+        else:
+            runs.append([i, i + 1])
+    return [tuple(run) for run in runs]
+
+
+def _column_letter(index):
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
 def _get_dataset_config(dataset_name):
     dataset = DATASETS.get(dataset_name)
     if not dataset:
@@ -237,33 +1081,165 @@ def _get_dataset_config(dataset_name):
     return dataset
 
 
-def _dataframe_to_gsheet_body(df, include_columns=False):
-    _df = df.copy()
-    _df = _df.fillna("").astype(str)  # prevent JSON serialization error
-    print("Preparing data batch for Google Sheets API")
-    print("\n----------  data sample  ----------\n")
-    print(_df.head())
-    print("...")
-    print("\n----------  data sample  ----------\n")
-    values = _df.values.tolist()
+def _chunk_rows(values, max_rows, max_bytes):
+    chunk, chunk_bytes = [], 0
+    for row in values:
+        row_bytes = len(json.dumps(row)) + 1
+        if chunk and (len(chunk) >= max_rows or chunk_bytes + row_bytes > max_bytes):
+            yield chunk
+            chunk, chunk_bytes = [], 0
+        chunk.append(row)
+        chunk_bytes += row_bytes
+    if chunk:
+        yield chunk
+
+
+def _dataframe_fingerprint(df, include_columns=False):
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    digest = hashlib.sha256(row_hashes.tobytes())
     if include_columns:
-        values = [list(_df.columns)] + values
+        digest.update(json.dumps([str(col) for col in df.columns]).encode())
+    return digest.hexdigest()
 
-    gsheet_body = {"values": values}
-    try:
-        json.dumps(gsheet_body)
-        return gsheet_body
-    except TypeError as e:
-        raise ValueError(
-            f"Failed to convert dataframe to JSON-serializable dictionary: {e}"
-        )
+
+def _read_append_checkpoint(checkpoint_file, fingerprint):
+    if not os.path.exists(checkpoint_file):
+        return 0
+    with open(checkpoint_file, "r") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("fingerprint") != fingerprint:
+        print(f"Ignoring checkpoint for different rows: {checkpoint_file}")
+        return 0
+    return checkpoint["committed_rows"]
+
+
+def _write_append_checkpoint(checkpoint_file, fingerprint, committed_rows):
+    Path(checkpoint_file).parent.mkdir(parents=True, exist_ok=True)
+    with open(checkpoint_file, "w") as f:
+        json.dump({"fingerprint": fingerprint, "committed_rows": committed_rows}, f)
+
+
+def _probe_range(dataset_cfg):
+    if "probe_range" in dataset_cfg:
+        return dataset_cfg["probe_range"]
+    if dataset_cfg.get("append_only"):
+        return PROBE_RANGE
+    return f"A:{_column_letter(len(dataset_cfg['schema']) - 1)}"
+
+
+def _a1_range(sheet_name, cell_range=None):
+    sheet_name = sheet_name.replace("'", "''")
+    return f"'{sheet_name}'!{cell_range}" if cell_range else f"'{sheet_name}'"
+
+
+def _new_sheet_id(sheet_properties):
+    sheet_ids = {props["sheetId"] for props in sheet_properties.values()}
+    while True:
+        sheet_id = random.randint(1, 2**31 - 1)
+        if sheet_id not in sheet_ids:
+            return sheet_id
 
 
-def create_sheet_in_workbook(spreadsheet_id, sheet_name, credentials=None):
-    credentials = credentials or authenticate()
-    sheet = get_sheet(credentials)
-    body = {"requests": [{"addSheet": {"properties": {"title": sheet_name}}}]}
-    response = sheet.batchUpdate(spreadsheetId=spreadsheet_id, body=body).execute()
+def _values_to_dataset(values, dataset_cfg, validate=True):
+    df = pd.DataFrame(
+        values[dataset_cfg.get("data_index", 1) :],
+        columns=values[dataset_cfg.get("columns_index", 0)],
+    )
+    if OUTBOX_KEY_COLUMN in df.columns:
+        # Idempotency keys of the rows written from the outbox
+        df = df.drop(columns=OUTBOX_KEY_COLUMN)
+    if dataset_cfg.get("value_render_option") == "UNFORMATTED_VALUE":
+        # Text columns may hold cells that Google Sheets parsed as numbers or
+        # booleans; keep them as text, as they would be displayed
+        schema = compile_schema(dataset_cfg["schema"])
+        for name, column in schema.columns.items():
+            if name in df.columns and column["is_text"]:
+                df[name] = df[name].map(_unformatted_to_text)
+    df = standardize(df, dataset_cfg["schema"])
+    if validate:
+        validate_dataset(df, dataset_cfg["schema"])
+    return df
+
+
+def _unformatted_to_text(x):
+    if isinstance(x, bool):
+        return "TRUE" if x else "FALSE"
+    if isinstance(x, (int, float)):
+        return str(x)
+    return x
+
+
+def _dataframe_to_gsheet_body(df, include_columns=False, schema=None):
+    values = list(_iter_gsheet_rows(df, include_columns=include_columns, schema=schema))
+    return {"values": values}
+
+
+def _iter_gsheet_rows(df, include_columns=False, schema=None):
+    """
+    Yield the rows of a DataFrame as lists of strings for the Sheets API.
+
+    Columns are converted one at a time (see `_serialize_column`) and rows are
+    assembled lazily from the converted columns, so the frame is not copied and
+    the only full copy of the payload is the converted column values. All the
+    values are strings, so the rows are always JSON-serializable; only the
+    header needs to be checked.
+    """
+    logger.debug("Preparing data batch for Google Sheets API:\n%s", df.head())
+    if include_columns:
+        header = list(df.columns)
+        try:
+            json.dumps(header)
+        except TypeError as e:
+            raise ValueError(
+                f"Failed to convert dataframe to JSON-serializable dictionary: {e}"
+            )
+        yield header
+
+    specs = compile_schema(schema).columns if schema else {}
+    columns = [
+        _serialize_column(df.iloc[:, i], specs.get(name))
+        for i, name in enumerate(df.columns)
+    ]
+    yield from map(list, zip(*columns))
+
+
+def _serialize_column(s, spec=None):
+    """
+    Convert a column to a list of strings, with "" for missing values.
+
+    Text columns go through a single `astype(str)`. Other columns are factorized
+    first so that each distinct value is formatted once (dates, scores and flags
+    repeat a lot): datetimes with a `format` in their schema spec are formatted
+    with `strftime`, other datetimes as `str(Timestamp)`, columns of the "bool"
+    type as TRUE/FALSE and other numbers and booleans with `str()`, as
+    `astype(str)` would. `spec` is a compiled column spec (see `Schema`).
+    """
+    if s.dtype == object:
+        values = s.astype(str).to_numpy(dtype=object)
+        values[s.isna().to_numpy()] = ""
+        return values.tolist()
+
+    codes, uniques = pd.factorize(s)
+    if spec and spec.get("format") and is_datetime64_any_dtype(s.dtype):
+        labels = uniques.strftime(spec["format"]).tolist()
+    elif spec and spec.get("type") == "bool":
+        labels = ["TRUE" if x else "FALSE" for x in uniques.tolist()]
+    elif s.dtype.kind in "mM":
+        labels = [str(x) for x in uniques.astype(object)]
+    elif s.dtype.kind in "biu" or s.dtype == "float64":
+        labels = [str(x) for x in uniques.tolist()]
+    else:
+        labels = pd.Series(uniques).astype(str).tolist()
+    # Missing values have code -1, which picks the trailing ""
+    return np.array(labels + [""], dtype=object)[codes].tolist()
+
+
+def create_sheet_in_workbook(
+    spreadsheet_id, sheet_name, credentials=None, session=None
+):
+    session = session or get_session(credentials)
+    requests = [{"addSheet": {"properties": {"title": sheet_name}}}]
+    response = session.batch_update(spreadsheet_id, requests)
     print(
         f"Sheet '{sheet_name}' added successfully to spreadsheet ID: {spreadsheet_id}"
     )
@@ -276,73 +1252,60 @@ def create_sheet_in_workbook(spreadsheet_id, sheet_name, credentials=None):
     return new_sheet_id
 
 
-def get_sheet_id(spreadsheet_id, sheet_name, sheet=None, credentials=None):
-    credentials = credentials or authenticate()
-    sheet = sheet or get_sheet(credentials)
-
-    spreadsheet_metadata = sheet.get(
-        spreadsheetId=spreadsheet_id, fields="sheets(properties(sheetId,title))"
-    ).execute()
-
-    sheet_id = None
-    url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}"
-    sheets = spreadsheet_metadata.get("sheets", [])
-    for _sheet in sheets:
-        properties = _sheet.get("properties", {})
-        if properties.get("title") == sheet_name:
-            sheet_id = properties.get("sheetId")
-    if not sheet_id:
+def get_sheet_id(spreadsheet_id, sheet_name, credentials=None, session=None):
+    session = session or get_session(credentials)
+    properties = session.sheet_properties(spreadsheet_id).get(sheet_name)
+    if properties is None:
+        url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}"
         raise ValueError(f"Sheet with name '{sheet_name}' not found in {url}")
 
-    return sheet_id
-
+    return properties["sheetId"]
 
-def duplicate_sheet(spreadsheet_id, sheet_name, new_sheet_name, credentials=None):
-    credentials = credentials or authenticate()
-    sheet = get_sheet(credentials)
 
-    sheet_id = get_sheet_id(spreadsheet_id, sheet_name, sheet, credentials)
+def duplicate_sheet(
+    spreadsheet_id, sheet_name, new_sheet_name, credentials=None, session=None
+):
+    session = session or get_session(credentials)
+    sheet_id = get_sheet_id(spreadsheet_id, sheet_name, session=session)
 
-    body = {
-        "requests": [
-            {
-                "duplicateSheet": {
-                    "sourceSheetId": sheet_id,
-                    "newSheetName": new_sheet_name,
-                }
+    requests = [
+        {
+            "duplicateSheet": {
+                "sourceSheetId": sheet_id,
+                "newSheetName": new_sheet_name,
             }
-        ]
-    }
-    response = sheet.batchUpdate(spreadsheetId=spreadsheet_id, body=body).execute()
+        }
+    ]
+    response = session.batch_update(spreadsheet_id, requests)
+    new_sheet_id = response["replies"][0]["duplicateSheet"]["properties"]["sheetId"]
     url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}"
     print(f"Sheet duplicated to '{new_sheet_name}' in {url}")
-    print(f"New sheet ID: {sheet_id}")
+    print(f"New sheet ID: {new_sheet_id}")
     return response
 
 
-def truncate_sheet(spreadsheet_id, sheet_name, credentials=None):
-    credentials = credentials or authenticate()
-    sheet = get_sheet(credentials)
-    result = (
-        sheet.values()
-        .clear(
+def truncate_sheet(spreadsheet_id, sheet_name, credentials=None, session=None):
+    session = session or get_session(credentials)
+    sheet = session.sheet
+    result = execute_request(
+        sheet.values().clear(
             spreadsheetId=spreadsheet_id,
             range=sheet_name,
-        )
-        .execute()
+        ),
+        kind="write",
     )
     url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}"
     print(f"Sheet '{sheet_name}' truncated in {url}")
     return result
 
 
-def delete_sheet(spreadsheet_id, sheet_name, credentials=None, prompt_user=True):
-    credentials = credentials or authenticate()
-    sheet = get_sheet(credentials)
-    sheet_id = get_sheet_id(spreadsheet_id, sheet_name, sheet, credentials)
+def delete_sheet(
+    spreadsheet_id, sheet_name, credentials=None, prompt_user=True, session=None
+):
+    session = session or get_session(credentials)
+    sheet_id = get_sheet_id(spreadsheet_id, sheet_name, session=session)
     requests = [{"deleteSheet": {"sheetId": sheet_id}}]
 
-    body = {"requests": requests}
     url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}"
 
     answer = "Y"
@@ -351,6 +1314,6 @@ def delete_sheet(spreadsheet_id, sheet_name, credentials=None, prompt_user=True)
             f"\nAre you sure you want to delete sheet '{sheet_name}' in {url}\n\n(Y/n) >> "
         )
     if answer == "Y":
-        response = sheet.batchUpdate(spreadsheetId=spreadsheet_id, body=body).execute()
+        response = session.batch_update(spreadsheet_id, requests)
         print(f"Sheet '{sheet_name}' (ID={sheet_id}) deleted successfully in {url}")
         return response
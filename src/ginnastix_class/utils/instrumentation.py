@@ -0,0 +1,194 @@
+import atexit
+import inspect
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+
+from ginnastix_class.config.google_sheets import INSTRUMENTATION_DIR
+
+_dataset = ContextVar("dataset", default=None)
+
+
+@contextmanager
+def dataset_context(dataset_name):
+    """Attribute the Sheets API calls made in this block to a dataset."""
+    token = _dataset.set(dataset_name)
+    try:
+        yield
+    finally:
+        _dataset.reset(token)
+
+
+def tags_dataset(fn):
+    """
+    Attribute the Sheets API calls made by `fn` to the dataset (or datasets)
+    given as its first argument.
+    """
+    parameter = next(iter(inspect.signature(fn).parameters))
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        dataset_name = args[0] if args else kwargs[parameter]
+        if not isinstance(dataset_name, str):
+            dataset_name = ",".join(dataset_name)
+        with dataset_context(dataset_name):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+class Instrumentation:
+    """
+    Record of the Google Sheets API calls made by the process.
+
+    One JSON line per call is appended to `path` with the operation, dataset,
+    spreadsheet, wall time (including retries and rate limiting), request and
+    response sizes, cells read or written and retry count. `summary` aggregates
+    the records by operation.
+    """
+
+    def __init__(self, path=None, clock=None):
+        if path is None:
+            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+            path = Path(INSTRUMENTATION_DIR) / f"{timestamp}.jsonl"
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.records = []
+        self._clock = clock or time.perf_counter
+        self._started_at = self._clock()
+        self._lock = threading.Lock()
+
+    def record_request(self, request, kind, result, error, seconds, retries, waited):
+        operation = getattr(request, "methodId", None) or type(request).__name__
+        record = {
+            "timestamp": datetime.now().isoformat(),
+            "operation": operation.removeprefix("sheets."),
+            "kind": kind,
+            "dataset": _dataset.get(),
+            "spreadsheet_id": _spreadsheet_id(getattr(request, "uri", None)),
+            "seconds": round(seconds, 6),
+            "rate_limit_seconds": round(waited, 6),
+            "request_bytes": _size(getattr(request, "body", None)),
+            "response_bytes": _size(result),
+            "cells": _count_cells(result),
+            "retries": retries,
+            "error": None if error is None else f"{type(error).__name__}: {error}",
+        }
+        line = json.dumps(record)
+        with self._lock:
+            self.records.append(record)
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+    def summary(self):
+        """
+        Return a table of the API calls, time, bytes and cells per operation.
+
+        Calls are counted against the per-minute read or write quota (one unit
+        per call, retries included).
+        """
+        with self._lock:
+            records = list(self.records)
+        rows = {}
+        for record in records:
+            row = rows.setdefault(
+                record["operation"],
+                {
+                    "calls": 0,
+                    "errors": 0,
+                    "retries": 0,
+                    "quota": 0,
+                    "seconds": 0.0,
+                    "request_bytes": 0,
+                    "response_bytes": 0,
+                    "cells": 0,
+                },
+            )
+            row["calls"] += 1
+            row["errors"] += record["error"] is not None
+            row["retries"] += record["retries"]
+            row["quota"] += record["retries"] + 1
+            row["seconds"] += record["seconds"]
+            row["request_bytes"] += record["request_bytes"]
+            row["response_bytes"] += record["response_bytes"]
+            row["cells"] += record["cells"]
+
+        header = (
+            f"{'operation':<32} {'calls':>6} {'errors':>6} {'retries':>7} "
+            f"{'quota':>6} {'seconds':>8} {'sent KB':>9} {'recv KB':>9} {'cells':>9}"
+        )
+        lines = [header, "-" * len(header)]
+        for operation, row in sorted(rows.items()):
+            lines.append(
+                f"{operation:<32} {row['calls']:>6} {row['errors']:>6} "
+                f"{row['retries']:>7} {row['quota']:>6} {row['seconds']:>8.2f} "
+                f"{row['request_bytes'] / 1024:>9.1f} "
+                f"{row['response_bytes'] / 1024:>9.1f} {row['cells']:>9}"
+            )
+        api_seconds = sum(row["seconds"] for row in rows.values())
+        lines.append(
+            f"\nSheets API time: {api_seconds:.2f}s "
+            f"(run time: {self._clock() - self._started_at:.2f}s)"
+        )
+        lines.append(f"Records: {self.path}")
+        return "\n".join(lines)
+
+
+def _spreadsheet_id(uri):
+    match = re.search(r"/spreadsheets/([^/?:]+)", uri or "")
+    return match.group(1) if match else None
+
+
+def _size(payload):
+    if payload is None:
+        return 0
+    if isinstance(payload, (str, bytes)):
+        return len(payload)
+    return len(json.dumps(payload))
+
+
+def _count_cells(result):
+    # Cells read (values.get/batchGet, spreadsheets.get grid data) or written
+    # (values.append/update/batchUpdate)
+    if not isinstance(result, dict):
+        return 0
+    if "values" in result:
+        return sum(len(row) for row in result["values"])
+    if "valueRanges" in result:
+        return sum(_count_cells(value_range) for value_range in result["valueRanges"])
+    if "updates" in result:
+        return result["updates"].get("updatedCells", 0)
+    if "updatedCells" in result or "totalUpdatedCells" in result:
+        return result.get("updatedCells", result.get("totalUpdatedCells", 0))
+    if "sheets" in result:
+        return sum(
+            len(row.get("values", []))
+            for sheet in result["sheets"]
+            for grid in sheet.get("data", [])
+            for row in grid.get("rowData", [])
+        )
+    return 0
+
+
+_instrumentation = None
+
+
+def enable_instrumentation(path=None):
+    """
+    Record the Sheets API calls of this process and print a summary at exit.
+    """
+    global _instrumentation
+    _instrumentation = Instrumentation(path)
+    atexit.register(lambda: print(f"\n{_instrumentation.summary()}"))
+    return _instrumentation
+
+
+def get_instrumentation():
+    """Return the active instrumentation, or None if it is not enabled."""
+    return _instrumentation
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+from ginnastix_class.config.datasets import DATASETS
+from ginnastix_class.utils.dataset_store import get_store
+
+
+def foreign_keys(dataset_names=None):
+    """
+    Return the foreign keys declared in `DATASETS` (of the given datasets only,
+    if any).
+
+    Returns
+    -------
+      list[tuple[str, str, str, str]]
+        Dataset, column, referenced dataset and referenced column
+    """
+    return [
+        (name, column, reference["dataset"], reference["column"])
+        for name, dataset_cfg in DATASETS.items()
+        if not dataset_names or name in dataset_names
+        for column, reference in dataset_cfg.get("foreign_keys", {}).items()
+    ]
+
+
+def find_orphans(dfs, keys):
+    """
+    Find the values of foreign key columns that are missing from the columns
+    they reference.
+
+    The keys of each referenced column are collected once into a hash index,
+    shared by every column referencing it. Each referencing column is then
+    checked in one vectorized lookup (per category rather than per row for
+    categorical columns). Missing values are not checked.
+
+    Parameters
+    ----------
+      dfs : dict[str, pandas.DataFrame]
+        Datasets keyed by name, with at least their key columns
+      keys : list[tuple[str, str, str, str]]
+        Foreign keys, as returned by `foreign_keys`
+
+    Returns
+    -------
+      list[dict]
+        One item per foreign key with orphaned keys: "dataset", "column",
+        "references" ("<dataset>.<column>") and "orphans", the row numbers in
+        Google Sheets of each orphaned key
+    """
+    indexes = {}
+    results = []
+    for name, column, ref_name, ref_column in keys:
+        if (ref_name, ref_column) not in indexes:
+            indexes[(ref_name, ref_column)] = pd.Index(
+                dfs[ref_name][ref_column].dropna().unique()
+            )
+        s = dfs[name][column]
+        is_orphan = _is_orphan(s, indexes[(ref_name, ref_column)])
+        if not is_orphan.any():
+            continue
+
+        first_row = DATASETS.get(name, {}).get("data_index", 1) + 1
+        rows = np.flatnonzero(is_orphan) + first_row
+        orphans = {}
+        for key, row in zip(s.to_numpy()[is_orphan].tolist(), rows.tolist()):
+            orphans.setdefault(key, []).append(row)
+        results.append(
+            {
+                "dataset": name,
+                "column": column,
+                "references": f"{ref_name}.{ref_column}",
+                "orphans": orphans,
+            }
+        )
+    return results
+
+
+def _is_orphan(s, index):
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # Missing values have code -1, which picks the trailing True
+        is_known = np.append(s.cat.categories.isin(index), True)
+        return ~is_known[s.cat.codes.to_numpy()]
+    return (s.notna() & ~s.isin(index)).to_numpy()
+
+
+def check_integrity(dataset_names=None, store=None):
+    """
+    Check the foreign keys of every dataset (or of the given datasets), loading
+    only their key columns and those they reference (see `find_orphans`).
+    """
+    keys = foreign_keys(dataset_names)
+    columns = {}
+    for name, column, ref_name, ref_column in keys:
+        columns.setdefault(name, {})[column] = None
+        columns.setdefault(ref_name, {})[ref_column] = None
+    columns = {name: list(dataset_columns) for name, dataset_columns in columns.items()}
+    dfs = (store or get_store()).load(list(columns), columns=columns)
+    return find_orphans(dfs, keys)
@@ -0,0 +1,260 @@
+import atexit
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from ginnastix_class.config.google_sheets import OUTBOX_EXIT_TIMEOUT
+from ginnastix_class.config.google_sheets import OUTBOX_FILE
+from ginnastix_class.config.google_sheets import OUTBOX_FLUSH_INTERVAL
+from ginnastix_class.config.google_sheets import OUTBOX_LEASE
+
+
+class Outbox:
+    """
+    Durable queue of rows waiting to be appended to Google Sheets, stored in a
+    SQLite file.
+
+    Each entry holds the serialized rows of at most one `values.append` request
+    and a unique idempotency key, written to the sheet along with its rows. A
+    flush claims a batch of consecutive entries of one dataset, sends them and
+    deletes them once the write succeeded. A batch whose flush was interrupted
+    stays claimed; once its lease expires it is claimed again as `stale`, so
+    the flusher can look for its keys in the sheet before sending it again.
+    """
+
+    def __init__(self, path=None, lease=None, clock=None):
+        self.path = path or OUTBOX_FILE
+        self.lease = OUTBOX_LEASE if lease is None else lease
+        self._clock = clock or time.time
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL UNIQUE,
+                    dataset TEXT NOT NULL,
+                    rows TEXT NOT NULL,
+                    n_rows INTEGER NOT NULL,
+                    n_bytes INTEGER NOT NULL,
+                    created_at TEXT NOT NULL,
+                    batch TEXT,
+                    claimed_at REAL
+                )
+                """
+            )
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent flushes
+        # (e.g. the background flusher and `ginnastix-class flush`) never claim
+        # the same entries
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def enqueue(self, dataset_name, chunks):
+        """
+        Add rows to the outbox, one entry per chunk, in a single transaction.
+
+        Returns
+        -------
+          list[str]
+            Idempotency keys of the new entries
+        """
+        keys = []
+        created_at = datetime.now().isoformat()
+        with self._transaction() as conn:
+            for rows in chunks:
+                payload = json.dumps(rows)
+                key = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO entries "
+                    "(key, dataset, rows, n_rows, n_bytes, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, dataset_name, payload, len(rows), len(payload), created_at),
+                )
+                keys.append(key)
+        return keys
+
+    def claim(self, dataset_name, max_rows, max_bytes):
+        """
+        Claim the next batch of entries of a dataset.
+
+        A stale batch (claimed by a flush that did not finish) is returned first.
+        Otherwise, consecutive unclaimed entries are coalesced into one batch of
+        at most `max_rows` rows and `max_bytes` bytes (always at least one
+        entry). Nothing is claimed while another flush holds a batch of the
+        same dataset, so rows are written in the order they were queued.
+
+        Returns
+        -------
+          tuple[str, list[list[str]], list[str], bool] | None
+            Batch ID, rows, idempotency key of each row and whether the batch
+            is stale, or None if there is nothing to send
+        """
+        now = self._clock()
+        with self._transaction() as conn:
+            claimed = conn.execute(
+                "SELECT batch, MAX(claimed_at) FROM entries "
+                "WHERE dataset = ? AND batch IS NOT NULL GROUP BY batch "
+                "ORDER BY MIN(id) LIMIT 1",
+                (dataset_name,),
+            ).fetchone()
+            if claimed:
+                batch_id, claimed_at = claimed
+                if now - claimed_at < self.lease:
+                    return None
+                conn.execute(
+                    "UPDATE entries SET claimed_at = ? WHERE batch = ?",
+                    (now, batch_id),
+                )
+                return (batch_id, *self._batch_rows(conn, batch_id), True)
+
+            entries = conn.execute(
+                "SELECT id, n_rows, n_bytes FROM entries "
+                "WHERE dataset = ? AND batch IS NULL ORDER BY id",
+                (dataset_name,),
+            )
+            ids, total_rows, total_bytes = [], 0, 0
+            for entry_id, n_rows, n_bytes in entries:
+                if ids and (
+                    total_rows + n_rows > max_rows or total_bytes + n_bytes > max_bytes
+                ):
+                    break
+                ids.append(entry_id)
+                total_rows += n_rows
+                total_bytes += n_bytes
+            if not ids:
+                return None
+            batch_id = uuid.uuid4().hex
+            conn.executemany(
+                "UPDATE entries SET batch = ?, claimed_at = ? WHERE id = ?",
+                [(batch_id, now, entry_id) for entry_id in ids],
+            )
+            return (batch_id, *self._batch_rows(conn, batch_id), False)
+
+    def _batch_rows(self, conn, batch_id):
+        rows, keys = [], []
+        for key, payload, n_rows in conn.execute(
+            "SELECT key, rows, n_rows FROM entries WHERE batch = ? ORDER BY id",
+            (batch_id,),
+        ):
+            rows.extend(json.loads(payload))
+            keys.extend([key] * n_rows)
+        return rows, keys
+
+    def complete(self, batch_id):
+        """Remove the entries of a batch that was written."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM entries WHERE batch = ?", (batch_id,))
+
+    def abandon(self, batch_id):
+        """
+        Give up a batch whose write failed. It may or may not have reached the
+        sheet, so it is left claimed and expired, to be verified on next claim.
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE entries SET claimed_at = 0 WHERE batch = ?", (batch_id,)
+            )
+
+    def pending(self):
+        """
+        Return the number of rows waiting in the outbox.
+
+        Returns
+        -------
+          dict[str, int]
+            Row counts keyed by dataset name
+        """
+        with self._transaction() as conn:
+            counts = conn.execute(
+                "SELECT dataset, SUM(n_rows) FROM entries "
+                "GROUP BY dataset ORDER BY dataset"
+            ).fetchall()
+        return dict(counts)
+
+
+class BackgroundFlusher:
+    """
+    Run `flush` on a daemon thread every `interval` seconds, or sooner when
+    woken up.
+
+    At interpreter exit the thread is asked for a last flush and waited for at
+    most `exit_timeout` seconds; rows that could not be sent stay in the
+    outbox for the next run.
+    """
+
+    def __init__(self, flush, pending=None, interval=None, exit_timeout=None):
+        self.flush = flush
+        self.pending = pending
+        self.interval = interval or OUTBOX_FLUSH_INTERVAL
+        self.exit_timeout = (
+            OUTBOX_EXIT_TIMEOUT if exit_timeout is None else exit_timeout
+        )
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="outbox-flusher", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.stop)
+        return self
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(self.exit_timeout)
+        pending = self.pending() if self.pending else {}
+        if pending:
+            rows = ", ".join(f"{name}: {n}" for name, n in pending.items())
+            print(
+                f"Rows still waiting to be written to Google Sheets ({rows}). "
+                "They will be sent on the next run, or run `ginnastix-class flush`."
+            )
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Failed to flush outbox, will retry later: {e}")
+            if self._stopping.is_set():
+                return
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    """Return the process-wide outbox."""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = Outbox()
+        return _outbox
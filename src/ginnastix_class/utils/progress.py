@@ -0,0 +1,25 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_quiet = ContextVar("quiet", default=False)
+
+
+@contextmanager
+def quiet():
+    """
+    Silence the progress messages printed in this block, e.g. by a background
+    thread while the user is being prompted. Threads started from the block
+    are only silenced if they run in a copy of its context
+    (`contextvars.copy_context`).
+    """
+    token = _quiet.set(True)
+    try:
+        yield
+    finally:
+        _quiet.reset(token)
+
+
+def print_progress(*args):
+    """Print a progress message, unless silenced (see `quiet`)."""
+    if not _quiet.get():
+        print(*args)
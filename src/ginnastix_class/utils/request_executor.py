@@ -0,0 +1,185 @@
+import random
+import threading
+import time
+from collections import Counter
+
+from googleapiclient.errors import HttpError
+
+from ginnastix_class.config.google_sheets import MAX_RETRIES
+from ginnastix_class.config.google_sheets import READ_REQUESTS_PER_MINUTE
+from ginnastix_class.config.google_sheets import RETRY_MAX_DELAY
+from ginnastix_class.config.google_sheets import RETRY_STATUS_CODES
+from ginnastix_class.config.google_sheets import WRITE_REQUESTS_PER_MINUTE
+from ginnastix_class.utils.instrumentation import get_instrumentation
+from ginnastix_class.utils.progress import print_progress
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that allows `rate` acquisitions per `period`
+    seconds, with bursts of up to `capacity` acquisitions.
+    """
+
+    def __init__(self, rate, period=60, capacity=None, clock=None, sleep=None):
+        self.rate = rate
+        self.period = period
+        self.capacity = capacity or rate
+        self._clock = clock or time.monotonic
+        self._sleep = sleep or time.sleep
+        self._tokens = self.capacity
+        self._updated_at = self._clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take one token, blocking until one is available.
+
+        Returns
+        -------
+          float
+            Number of seconds spent waiting
+        """
+        waited = 0
+        while True:
+            with self._lock:
+                now = self._clock()
+                elapsed = now - self._updated_at
+                self._tokens = min(
+                    self.capacity, self._tokens + elapsed * self.rate / self.period
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) * self.period / self.rate
+            self._sleep(delay)
+            waited += delay
+
+
+class RequestExecutor:
+    """
+    Execute Google API requests within the Sheets quotas.
+
+    Reads and writes draw from separate token buckets sized to the per-minute
+    read and write quotas. Reads that fail with a retryable HTTP status (429
+    or 5xx) or a connection error are retried with jittered exponential
+    backoff, honoring the `Retry-After` header when the server sends one.
+    Writes (appends, row insertions and deletions) are not idempotent: a 5xx
+    or a lost connection may hide a write that was applied, so they are only
+    retried when the server provably did not apply them (429, or a refused
+    connection). Other errors are left to the caller (e.g. the append
+    checkpoint or the outbox, which check what reached the sheet).
+    Throttled and retried calls are counted in `stats`, and each request is
+    recorded when instrumentation is enabled.
+    """
+
+    def __init__(
+        self,
+        read_rate=None,
+        write_rate=None,
+        max_retries=None,
+        max_delay=None,
+        clock=None,
+        sleep=None,
+    ):
+        self._sleep = sleep or time.sleep
+        self.buckets = {
+            "read": TokenBucket(
+                read_rate or READ_REQUESTS_PER_MINUTE, clock=clock, sleep=self._sleep
+            ),
+            "write": TokenBucket(
+                write_rate or WRITE_REQUESTS_PER_MINUTE, clock=clock, sleep=self._sleep
+            ),
+        }
+        self.max_retries = MAX_RETRIES if max_retries is None else max_retries
+        self.max_delay = max_delay or RETRY_MAX_DELAY
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    def execute(self, request, kind="read"):
+        instrumentation = get_instrumentation()
+        if instrumentation is None:
+            return self._execute(request, kind, {})
+
+        call = {"retries": 0, "waited": 0.0}
+        result, error = None, None
+        start = time.perf_counter()
+        try:
+            result = self._execute(request, kind, call)
+            return result
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            instrumentation.record_request(
+                request,
+                kind,
+                result,
+                error,
+                seconds=time.perf_counter() - start,
+                retries=call["retries"],
+                waited=call["waited"],
+            )
+
+    def _execute(self, request, kind, call):
+        attempt = 0
+        while True:
+            waited = self.buckets[kind].acquire()
+            self._count("calls")
+            if waited:
+                self._count("rate_limited")
+                call["waited"] = call.get("waited", 0) + waited
+            try:
+                return request.execute()
+            except HttpError as e:
+                if e.status_code not in RETRY_STATUS_CODES:
+                    raise
+                if kind == "write" and e.status_code != 429:
+                    raise
+                if e.status_code == 429:
+                    self._count("throttled")
+                delay = _retry_after(e)
+                error = e
+            except (ConnectionError, TimeoutError) as e:
+                if kind == "write" and not isinstance(e, ConnectionRefusedError):
+                    raise
+                delay = None
+                error = e
+
+            if attempt >= self.max_retries:
+                self._count("failed")
+                raise error
+            if delay is None:
+                delay = random.uniform(0, min(self.max_delay, 2**attempt))
+            attempt += 1
+            call["retries"] = attempt
+            self._count("retried")
+            print_progress(
+                f"Retrying Google Sheets request in {delay:.1f}s "
+                f"(attempt {attempt}/{self.max_retries}): {error}"
+            )
+            self._sleep(delay)
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+
+def _retry_after(error):
+    try:
+        return float(error.resp.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide request executor."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = RequestExecutor()
+        return _executor
@@ -1,49 +1,239 @@
+import hashlib
 import json
+import threading
 
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
+from pandas.api.types import pandas_dtype
 
-def validate_dataset(df, schema):
-    errors = dict()
-    for name, spec in schema.items():
-        # Check if column exists
-        if name not in df.columns:
-            message = f"Column '{name}' does not exist"
-            errors[name] = errors.get(name, []) + [message]
-            continue
-
-        # Check column index
-        index = spec["index"]
-        _index = list(df.columns).index(name)
-        if index != _index:
-            message = f"Incorrect index for column '{name}': Expected {index}, Observed {_index}"
-            errors[name] = errors.get(name, []) + [message]
-
-        # Check column datatype
-        dtype = spec.get("dtype", "object")
-        _dtype = df.dtypes.loc[name]
-        if dtype != _dtype:
-            message = f"Incorrect data type for column '{name}': Expected {dtype}, Observed {_dtype}"
-            errors[name] = errors.get(name, []) + [message]
-
-        # Check column nulls
-        is_nullable = spec.get("is_nullable", False)
-        _isnull = df[name].isnull()
-        if not is_nullable and _isnull.any():
-            message = f"Column '{name}' has {int(_isnull.sum())} missing values"
-            errors[name] = errors.get(name, []) + [message]
-
-    if errors:
-        message = json.dumps(errors, indent=2)
-        raise Exception(f"Schema validation failed:\n{message}\n\n{df.head()}")
+# Column types with their pandas dtype and default format (for dates, the
+# format of the text in Google Sheets, also used to write them back)
+COLUMN_TYPES = {
+    "date": {"dtype": "datetime64[ns]", "format": "%m/%d/%Y"},
+    "datetime": {"dtype": "datetime64[ns]", "format": "%Y-%m-%d %H:%M:%S"},
+    "bool": {"dtype": "boolean"},
+    "enum": {"dtype": "category"},
+}
 
+# Dtypes of columns holding text
+TEXT_DTYPES = ("object", "category", "string[pyarrow]")
 
-def standardize(df, schema):
-    _df = df.copy()
-    _df = _df.replace("", None)
-    _df = _df.astype(
-        {
-            k: attr.get("dtype", "object")
-            for k, attr in schema.items()
-            if k in _df.columns
+
+class Schema:
+    """
+    Compiled dataset schema.
+
+    A schema maps column names to specs with the keys:
+
+      - "index": position of the column
+      - "type": "date", "datetime", "bool" or "enum" (optional, see
+        `COLUMN_TYPES`). Dates are parsed from serial numbers or from text in
+        "format", booleans from TRUE/FALSE and enums are categorical columns
+        restricted to "values"
+      - "dtype": pandas dtype of other columns ("object" by default)
+      - "format": format of dates in Google Sheets
+      - "is_nullable": whether missing values are allowed (False by default)
+
+    Compiling resolves the dtypes and parsers of the columns and their
+    positions once, so that `standardize` and `validate` only do vectorized
+    work per column. `hash` identifies the schema, e.g. to remember which rows
+    of a dataset already passed it.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.hash = hashlib.sha256(_schema_key(spec).encode()).hexdigest()
+        self.columns = {
+            name: _compile_column(name, column_spec)
+            for name, column_spec in spec.items()
+        }
+        self.positions = {
+            name: column.get("index") for name, column in self.columns.items()
         }
+
+    def standardize(self, df):
+        """
+        Cast the columns of a dataset to the types of the schema, in one pass
+        over the columns. Empty strings become missing values.
+
+        Values that do not fit a bool or enum column are left as they are, so
+        that `validate` reports them.
+        """
+        columns = {}
+        for name in df.columns:
+            s = df[name]
+            if s.dtype == object:
+                s = s.replace("", None)
+            if name in self.columns:
+                s = _parse_column(s, self.columns[name])
+            columns[name] = s
+        return pd.DataFrame(columns, index=df.index)
+
+    def validate(self, df, start=0):
+        """
+        Check the columns, their positions, types and missing values.
+
+        Only the values of the rows from `start` (0-based) onwards are checked,
+        e.g. the rows appended to a dataset whose earlier rows already passed
+        the same schema. The columns and their types are always checked.
+        """
+        errors = dict()
+        positions = {name: i for i, name in enumerate(df.columns)}
+        rows = df.iloc[start:]
+        for name, column in self.columns.items():
+            # Check if column exists
+            if name not in positions:
+                message = f"Column '{name}' does not exist"
+                errors[name] = errors.get(name, []) + [message]
+                continue
+            s = rows.iloc[:, positions[name]]
+
+            # Check column index
+            index = self.positions[name]
+            _index = positions[name]
+            if index != _index:
+                message = f"Incorrect index for column '{name}': Expected {index}, Observed {_index}"
+                errors[name] = errors.get(name, []) + [message]
+
+            # Check column datatype
+            if not _same_dtype(column["dtype"], s.dtype):
+                message = f"Incorrect data type for column '{name}': Expected {column['dtype_name']}, Observed {s.dtype}"
+                errors[name] = errors.get(name, []) + [message]
+                invalid = _invalid_values(s, column)
+                if invalid:
+                    message = f"Column '{name}' has invalid values: {invalid}"
+                    errors[name] = errors.get(name, []) + [message]
+
+            # Check column nulls
+            is_nullable = column["is_nullable"]
+            _isnull = s.isnull()
+            if not is_nullable and _isnull.any():
+                message = f"Column '{name}' has {int(_isnull.sum())} missing values"
+                errors[name] = errors.get(name, []) + [message]
+
+        if errors:
+            message = json.dumps(errors, indent=2)
+            raise Exception(f"Schema validation failed:\n{message}\n\n{rows.head()}")
+
+
+def _compile_column(name, spec):
+    column_type = spec.get("type")
+    if column_type is not None and column_type not in COLUMN_TYPES:
+        raise ValueError(
+            f"Unknown type '{column_type}' for column '{name}': "
+            f"expected one of {list(COLUMN_TYPES)}"
+        )
+    column = {**COLUMN_TYPES.get(column_type, {}), **spec}
+    column["type"] = column_type
+    column["dtype_name"] = str(column.get("dtype", "object"))
+    column["is_nullable"] = spec.get("is_nullable", False)
+    if column_type == "enum":
+        column["dtype"] = pd.CategoricalDtype(spec["values"])
+    else:
+        column["dtype"] = pandas_dtype(column["dtype_name"])
+    column["is_text"] = column_type == "enum" or (
+        column_type is None and column["dtype_name"] in TEXT_DTYPES
     )
-    return _df
+    return column
+
+
+def _same_dtype(dtype, observed):
+    # A plain "category" dtype matches categorical columns of any categories
+    if isinstance(dtype, pd.CategoricalDtype) and dtype.categories is None:
+        return isinstance(observed, pd.CategoricalDtype)
+    return dtype == observed
+
+
+def _parse_column(s, column):
+    dtype = column["dtype"]
+    if is_datetime64_any_dtype(dtype):
+        return to_datetime(s, column.get("format")).astype(dtype)
+    if column["type"] == "bool":
+        return to_bool(s)
+    if column["type"] == "enum" and _invalid_values(s, column):
+        return s
+    return s.astype(dtype)
+
+
+def _invalid_values(s, column):
+    # Distinct values that do not fit a bool or enum column
+    if column["type"] == "bool":
+        if s.dtype == bool or s.dtype == "boolean":
+            return []
+        s = s[~s.astype("string").str.upper().isin(["TRUE", "FALSE"])]
+    elif column["type"] == "enum":
+        s = s[~s.isin(column["values"])]
+    else:
+        return []
+    return sorted(s.dropna().astype(str).unique().tolist())
+
+
+def to_bool(s):
+    """
+    Convert a column of Google Sheets checkboxes or TRUE/FALSE text to a
+    nullable boolean column in one vectorized step. If some values are not
+    booleans, the column is returned unchanged.
+    """
+    if s.dtype == bool or s.dtype == "boolean":
+        return s.astype("boolean")
+    values = s.astype("string").str.upper().map({"TRUE": True, "FALSE": False})
+    values = values.astype("boolean")
+    if (values.isna() & s.notna()).any():
+        return s
+    return values
+
+
+_schemas = {}
+_schemas_lock = threading.Lock()
+
+
+def compile_schema(schema):
+    """
+    Return the compiled `Schema` of a schema dict, compiling each distinct
+    schema once.
+    """
+    if isinstance(schema, Schema):
+        return schema
+    key = _schema_key(schema)
+    with _schemas_lock:
+        if key not in _schemas:
+            _schemas[key] = Schema(schema)
+        return _schemas[key]
+
+
+def _schema_key(schema):
+    return json.dumps(schema, sort_keys=True, default=str)
+
+
+def validate_dataset(df, schema, start=0):
+    compile_schema(schema).validate(df, start=start)
+
+
+def standardize(df, schema):
+    """
+    Cast the columns of a dataset to the types of its schema (see
+    `Schema.standardize`).
+
+    Besides the column types of `COLUMN_TYPES`, the schema can use compact
+    pandas dtypes: "category" for text with few distinct values (names,
+    levels, events...), "string[pyarrow]" for free text and narrow or nullable
+    numbers such as "float32", "Int8" or "Int16".
+    """
+    return compile_schema(schema).standardize(df)
+
+
+def to_datetime(s, format=None):
+    """
+    Convert a column of Google Sheets dates to datetimes in one vectorized step.
+
+    Serial numbers (days since 1899-12-30, as returned with the `SERIAL_NUMBER`
+    date-time render option) and text in the given `format` are both accepted.
+    """
+    if is_datetime64_any_dtype(s):
+        return s
+    serials = pd.to_numeric(s, errors="coerce")
+    dt = pd.to_datetime(serials, unit="D", origin="1899-12-30").dt.round("s")
+    is_text = serials.isna() & s.notna()
+    if is_text.any():
+        dt = dt.mask(is_text, pd.to_datetime(s[is_text], format=format))
+    return dt
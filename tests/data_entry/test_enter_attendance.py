@@ -0,0 +1,97 @@
+from datetime import datetime
+from unittest import mock
+
+import pandas as pd
+import pytest
+
+from ginnastix_class.data_entry.enter_attendance import Attendance
+
+
+class FixedDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2025, 9, 10, 18, 30)
+
+
+@pytest.fixture
+def m_get_store():
+    dfs = {
+        "class_sessions": pd.DataFrame(
+            {
+                "Class": ["Bronze", "Bronze", "Silver"],
+                "Day": ["Monday", "Wednesday", "Monday"],
+                "Start Time": ["5pm", "5pm", "6pm"],
+                "Stop Time": ["6pm", "6pm", "7pm"],
+                "Training Hours": [1.0, 1.0, 1.0],
+            }
+        ),
+        "student_classes": pd.DataFrame(
+            {
+                "Student": ["Ann", "Bob", "Cat"],
+                "Class": ["Bronze", "Silver", "Bronze"],
+                "Start": pd.to_datetime(["2025-09-01", "2025-09-01", "2025-09-04"]),
+                "Stop": pd.to_datetime([None, None, None]),
+            }
+        ),
+        "holidays": pd.DataFrame(
+            {
+                "Holiday": ["Labor Day", "Gym Event", "Teacher Day"],
+                "Date": pd.to_datetime(["2025-09-01", "2025-09-03", "2025-09-08"]),
+                "Day": ["Monday", "Wednesday", "Monday"],
+                "Gym Closed": pd.array([True, True, False], dtype="boolean"),
+                "No Practice": pd.array([True, False, None], dtype="boolean"),
+                "Notes": [None, None, None],
+            }
+        ),
+    }
+    with mock.patch(
+        "ginnastix_class.data_entry.enter_attendance.get_store"
+    ) as m_get_store:
+        m_get_store.return_value.load.side_effect = lambda names: {
+            name: dfs[name].copy() for name in names
+        }
+        yield dfs
+
+
+@mock.patch("ginnastix_class.data_entry.enter_attendance.datetime", FixedDatetime)
+def test_attendance__class_days(m_get_store):
+    attendance = Attendance()
+
+    out_df = attendance.class_days
+
+    # Labor Day has no practice; Cat only has class after starting on 9/4
+    expected_df = pd.DataFrame(
+        {
+            "DT": pd.to_datetime(
+                [
+                    "2025-09-03",
+                    "2025-09-08",
+                    "2025-09-08",
+                    "2025-09-08",
+                    "2025-09-10",
+                    "2025-09-10",
+                ]
+            ),
+            "Day": [
+                "Wednesday",
+                "Monday",
+                "Monday",
+                "Monday",
+                "Wednesday",
+                "Wednesday",
+            ],
+            "Class": ["Bronze", "Bronze", "Bronze", "Silver", "Bronze", "Bronze"],
+            "Student": ["Ann", "Ann", "Cat", "Bob", "Ann", "Cat"],
+            "Date": [
+                "09/03/2025",
+                "09/08/2025",
+                "09/08/2025",
+                "09/08/2025",
+                "09/10/2025",
+                "09/10/2025",
+            ],
+        }
+    )
+    pd.testing.assert_frame_equal(out_df, expected_df)
+    # The reference datasets are left untouched
+    assert list(attendance.df_holidays.columns) == list(m_get_store["holidays"].columns)
@@ -0,0 +1,99 @@
+from unittest import mock
+
+import pandas as pd
+import pytest
+
+from ginnastix_class.utils.backends import InMemoryBackend
+from ginnastix_class.utils.backends import LocalDirectoryBackend
+from ginnastix_class.utils.backends import copy_datasets
+
+
+@pytest.fixture(autouse=True)
+def m__get_dataset_config():
+    with mock.patch("ginnastix_class.utils.backends._get_dataset_config") as m:
+        m.return_value = {
+            "schema": {
+                "name": {"index": 0},
+                "score": {"index": 1, "dtype": "float", "is_nullable": True},
+                "notes": {"index": 2, "is_nullable": True},
+            }
+        }
+        yield m
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame(
+        {
+            "name": ["a", "b"],
+            "score": ["1.5", ""],
+            "notes": pd.Series(["", 3], dtype=object),
+        }
+    )
+
+
+@pytest.mark.parametrize("kind", ["local", "memory"])
+def test_backend__append_replace(kind, df, tmp_path):
+    backend = LocalDirectoryBackend(tmp_path) if kind == "local" else InMemoryBackend()
+
+    backend.replace("dataset", df)
+    backend.append("dataset", df.iloc[:1])
+    out = backend.read("dataset")
+
+    expected_notes = [None, "3", None] if kind == "local" else [None, 3, None]
+    expected_df = pd.DataFrame(
+        {
+            "name": ["a", "b", "a"],
+            "score": [1.5, None, 1.5],
+            "notes": pd.Series(expected_notes, dtype=object),
+        }
+    )
+    pd.testing.assert_frame_equal(out, expected_df)
+    assert backend.metadata("dataset") == {"row_count": 3, "column_count": 3}
+
+
+def test_in_memory_backend__missing():
+    with pytest.raises(KeyError):
+        InMemoryBackend().read("dataset")
+
+
+def test_in_memory_backend__lazy_source(df, tmp_path):
+    source = LocalDirectoryBackend(tmp_path)
+    source.replace("dataset", df)
+    backend = InMemoryBackend(source=source)
+    assert backend.datasets == {}
+
+    backend.append("dataset", df.iloc[:1])
+
+    # Read from the source on first use only, then kept in memory
+    assert list(backend.datasets) == ["dataset"]
+    assert backend.read("dataset")["name"].tolist() == ["a", "b", "a"]
+    assert source.read("dataset")["name"].tolist() == ["a", "b"]
+    with pytest.raises(KeyError):
+        backend.read("other")
+
+
+def test_local_directory_backend__missing(tmp_path):
+    with pytest.raises(FileNotFoundError, match="export-backend"):
+        LocalDirectoryBackend(tmp_path).read("dataset")
+
+
+def test_copy_datasets(df, tmp_path):
+    source = InMemoryBackend()
+    source.replace("dataset", df)
+    source.replace("other", df.iloc[:1])
+    source.read_many = mock.Mock(
+        side_effect=lambda names: {name: source.read(name) for name in names}
+    )
+    target = LocalDirectoryBackend(tmp_path)
+
+    copied = copy_datasets(source, target, ["dataset", "other"])
+
+    # Read together, then written to the target
+    assert copied == {"dataset": 2, "other": 1}
+    source.read_many.assert_called_once_with(["dataset", "other"])
+    columns = ["name", "score"]
+    pd.testing.assert_frame_equal(
+        target.read("dataset")[columns], source.read("dataset")[columns]
+    )
+    assert target.metadata("other") == {"row_count": 1, "column_count": 3}
@@ -0,0 +1,399 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pandas as pd
+import pytest
+
+from ginnastix_class.utils import dataset_store
+from ginnastix_class.utils.dataset_store import DatasetStore
+
+
+class FakeBackend:
+    """Backend serving `df`, recording the calls made to it."""
+
+    def __init__(self, df, fingerprint="v1"):
+        self.df = df
+        self.fingerprint = fingerprint
+        self.calls = []
+
+    def read(self, dataset_name):
+        self.calls.append("read")
+        return self.df.copy()
+
+    def read_tail(self, dataset_name, start, validate=True):
+        self.calls.append(("read_tail", start))
+        return self.df.iloc[:1], self.df.iloc[start:].reset_index(drop=True)
+
+    def fingerprints(self, dataset_names):
+        self.calls.append("fingerprints")
+        if isinstance(self.fingerprint, Exception):
+            raise self.fingerprint
+        return {name: self.fingerprint for name in dataset_names}
+
+
+class FakeBatchBackend(FakeBackend):
+    def read_many(self, dataset_names):
+        self.calls.append(("read_many", sorted(dataset_names)))
+        return {name: self.df.copy() for name in dataset_names}
+
+
+@pytest.fixture(autouse=True)
+def m_datasets():
+    datasets = {
+        "dataset": {"spreadsheet_id": "s1", "append_only": True},
+        "other": {"spreadsheet_id": "s1"},
+        "third": {"spreadsheet_id": "s1"},
+    }
+    with mock.patch("ginnastix_class.utils.dataset_store.DATASETS", datasets) as m:
+        yield m
+    dataset_store._fingerprints.clear()
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame(
+        {
+            "name": ["a", "b", "c", "d"],
+            "date": pd.to_datetime(
+                ["2025-01-01", "2025-01-02", "2025-01-03", "2025-01-04"]
+            ),
+        }
+    )
+
+
+def _store(tmp_path, backend, source="auto", ttl=0):
+    ttls = {"dataset": ttl, "other": ttl, "third": ttl}
+    return DatasetStore(source, data_dir=tmp_path, backend=backend, ttls=ttls)
+
+
+def test_dataset_store__incremental(df, tmp_path):
+    backend = FakeBackend(df)
+    store = _store(tmp_path, backend)
+    store.save("dataset", df.iloc[:2])
+
+    out_df = store.read("dataset")
+
+    pd.testing.assert_frame_equal(out_df, df)
+    assert backend.calls == ["fingerprints", ("read_tail", 1)]
+    with open(store.paths("dataset")[1]) as f:
+        assert json.load(f)["row_count"] == 4
+
+
+def test_dataset_store__incremental_full_read(df, tmp_path):
+    backend = FakeBackend(df)
+    store = _store(tmp_path, backend, source="gsheets")
+    store.save("dataset", df.iloc[:3])
+    df.loc[1, "name"] = "edited"
+
+    out_df = store.read("dataset")
+
+    # Re-reading from the source (`--clear-cache`) reads append-only datasets in
+    # full, picking up edits to cached rows
+    pd.testing.assert_frame_equal(out_df, df)
+    assert backend.calls == ["read"]
+
+
+def test_dataset_store__cached_rows_changed(df, tmp_path):
+    backend = FakeBackend(df)
+    store = _store(tmp_path, backend)
+    store.save("dataset", df.iloc[:2])
+    df.loc[1, "name"] = "edited"
+
+    out_df = store.read("dataset")
+
+    pd.testing.assert_frame_equal(out_df, df)
+    assert backend.calls == ["fingerprints", ("read_tail", 1), "read"]
+
+
+def test_dataset_store__not_append_only(df, m_datasets, tmp_path):
+    m_datasets["dataset"] = {}
+    backend = FakeBackend(df)
+    store = _store(tmp_path, backend, source="gsheets")
+    store.save("dataset", df.iloc[:2])
+
+    store.read("dataset")
+
+    assert backend.calls == ["read"]
+
+
+def test_dataset_store__memoized(df, tmp_path):
+    backend = FakeBackend(df)
+    store = _store(tmp_path, backend, source="gsheets")
+
+    first_df = store.read("other")
+    first_df.loc[0, "name"] = "mutated"
+    second_df = store.load(["other"])["other"]
+
+    # Read once per store, and callers get their own copy
+    assert backend.calls == ["read"]
+    pd.testing.assert_frame_equal(second_df, df)
+
+
+def test_dataset_store__concurrent_loads(df, tmp_path):
+    backend = FakeBackend(df)
+    # Every read waits for the other, so this only completes if the store is
+    # not locked while reading
+    barrier = threading.Barrier(2, timeout=5)
+    read = backend.read
+
+    def read_after_barrier(dataset_name):
+        barrier.wait()
+        return read(dataset_name)
+
+    backend.read = read_after_barrier
+    store = _store(tmp_path, backend, source="gsheets")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(store.read, name) for name in ("other", "third")]
+        for future in futures:
+            pd.testing.assert_frame_equal(future.result(), df)
+    assert backend.calls == ["read", "read"]
+
+
+def test_dataset_store__auto(df, tmp_path):
+    backend = FakeBackend(df)
+    store = _store(tmp_path, backend)
+    store.save("dataset", df, fingerprint="v1")
+    store.save("other", df, fingerprint="v0")
+
+    store.load(["dataset", "other"])
+
+    # One probe for the spreadsheet; only the changed dataset is re-read
+    assert backend.calls == ["fingerprints", "read"]
+    _, manifest = store.load_cached("other")
+    assert manifest["source_revision"] == "v1"
+    assert manifest["schema_hash"] == dataset_store.schema_hash("other")
+
+
+def test_dataset_store__auto_probes_requested(df, tmp_path):
+    backend = FakeBackend(df)
+    backend.fingerprints = mock.Mock(wraps=backend.fingerprints)
+    store = _store(tmp_path, backend)
+
+    store.read("other")
+    store.load(["other", "third"])
+
+    # Only the requested datasets are probed, and each probe is reused
+    assert [c.args for c in backend.fingerprints.call_args_list] == [
+        (["other"],),
+        (["third"],),
+    ]
+
+
+def test_dataset_store__auto_within_ttl(df, tmp_path):
+    backend = FakeBackend(df)
+    store = _store(tmp_path, backend, ttl=300)
+    store.save("other", df, fingerprint="v0")
+
+    store.read("other")
+
+    assert backend.calls == []
+
+
+def test_dataset_store__auto_offline(df, tmp_path):
+    backend = FakeBackend(df, fingerprint=ConnectionError("offline"))
+    store = _store(tmp_path, backend)
+    store.save("other", df, fingerprint="v0")
+
+    out_df = store.read("other")
+
+    pd.testing.assert_frame_equal(out_df, df)
+    assert backend.calls == ["fingerprints"]
+
+
+def test_dataset_store__read_many(df, tmp_path):
+    backend = FakeBatchBackend(df)
+    store = _store(tmp_path, backend, source="gsheets")
+
+    dfs = store.load(["other", "third", "other"])
+
+    assert list(dfs) == ["other", "third"]
+    assert backend.calls == [("read_many", ["other", "third"])]
+
+
+def test_dataset_store__columns(df, tmp_path):
+    backend = FakeBackend(df)
+    store = _store(tmp_path, backend, source="local")
+    store.save("other", df)
+
+    out_df = store.read("other", columns=["date"])
+
+    pd.testing.assert_frame_equal(out_df, df[["date"]])
+    assert backend.calls == []
+    # The projection is memoized separately from the full dataset
+    pd.testing.assert_frame_equal(store.read("other"), df)
+
+
+def test_dataset_store__columns_of_memoized_dataset(df, tmp_path):
+    backend = FakeBackend(df)
+    store = _store(tmp_path, backend, source="gsheets")
+
+    store.read("other")
+    out_df = store.read("other", columns=["name"])
+
+    pd.testing.assert_frame_equal(out_df, df[["name"]])
+    assert backend.calls == ["read"]
+
+
+def test_dataset_store__config_changed(df, m_datasets, tmp_path):
+    backend = FakeBackend(df)
+    store = _store(tmp_path, backend, source="local")
+    store.save("dataset", df.iloc[:2])
+    store.save("other", df)
+    store.save("third", df)
+    m_datasets["dataset"] = {**m_datasets["dataset"], "sheet_range": "Renamed"}
+    m_datasets["other"] = {**m_datasets["other"], "schema": {"name": {"index": 0}}}
+
+    dfs = store.load(["dataset", "other", "third"])
+
+    # Only the changed datasets are read, in full (the append-only one included)
+    assert backend.calls == ["read", "read"]
+    pd.testing.assert_frame_equal(dfs["dataset"], df)
+    assert store.is_current("dataset", store.load_manifest("dataset"))
+
+
+def test_dataset_store__other_backend(df, tmp_path):
+    _store(tmp_path, FakeBackend(df.iloc[:1]), source="local").read("other")
+    backend = FakeBatchBackend(df)
+
+    out_df = _store(tmp_path, backend, source="local").read("other")
+
+    # Datasets cached from another backend are not used, even from "local"
+    pd.testing.assert_frame_equal(out_df, df)
+    assert backend.calls == [("read_many", ["other"])]
+    with open(_store(tmp_path, backend).paths("other")[1]) as f:
+        assert json.load(f)["backend"] == "FakeBatchBackend"
+
+
+def test_dataset_store__sync(df, tmp_path):
+    class FailingBackend(FakeBackend):
+        def read(self, dataset_name):
+            if dataset_name == "third":
+                raise Exception("Schema validation failed")
+            return super().read(dataset_name)
+
+    backend = FailingBackend(df)
+    store = _store(tmp_path, backend)
+    store.save("other", df, fingerprint="v1")
+
+    results = store.sync()
+
+    assert {name: result["status"] for name, result in results.items()} == {
+        "dataset": "read",
+        "other": "cached",
+        "third": "failed",
+    }
+    assert results["dataset"]["rows"] == 4
+    assert results["third"]["rows"] is None
+    assert str(results["third"]["error"]) == "Schema validation failed"
+    assert backend.calls.count("fingerprints") == 1
+
+
+def test_dataset_store__sync_offline(df, tmp_path):
+    backend = FakeBackend(df, fingerprint=ConnectionError("offline"))
+    store = _store(tmp_path, backend)
+    store.save("dataset", df)
+    store.ttls["other"] = 60
+    store.save("other", df)
+
+    results = store.sync(["dataset", "other"])
+
+    # A dataset that could not be checked is not reported as up to date
+    assert results["dataset"]["status"] == "failed"
+    assert isinstance(results["dataset"]["error"], ConnectionError)
+    assert results["other"]["status"] == "cached"
+    assert "read" not in backend.calls
+
+
+def test_dataset_store__swr(df, tmp_path):
+    backend = FakeBackend(df)
+    store = _store(tmp_path, backend, source="swr")
+    store.save("other", df.iloc[:2], fingerprint="v0")
+    store.save("third", df.iloc[:2], fingerprint="v1")
+
+    dfs = store.load(["other", "third"])
+
+    # The cached copies are returned right away...
+    pd.testing.assert_frame_equal(dfs["other"], df.iloc[:2])
+    # ...and the changed dataset is re-read in the background
+    updates = store.take_updates(["other", "third"], timeout=5)
+    assert list(updates) == ["other"]
+    pd.testing.assert_frame_equal(updates["other"], df)
+    assert backend.calls == ["fingerprints", "read"]
+    assert store.take_updates(["other", "third"]) == {}
+    pd.testing.assert_frame_equal(store.read("other"), df)
+
+
+def test_dataset_store__swr_error(df, tmp_path, capsys):
+    backend = FakeBackend(df)
+    backend.read = mock.Mock(side_effect=Exception("quota exceeded"))
+    store = _store(tmp_path, backend, source="swr")
+    store.save("other", df.iloc[:2], fingerprint="v0")
+
+    store.load(["other"])
+    for thread in store._revalidations:
+        thread.join(5)
+
+    # The background error is not printed while the user may be prompted...
+    backend.read.assert_called_once()
+    assert "quota exceeded" not in capsys.readouterr().out
+    # ...but reported on the main thread
+    assert store.take_updates(["other"]) == {}
+    assert "quota exceeded" in capsys.readouterr().out
+    assert store.take_updates(["other"]) == {}
+    assert capsys.readouterr().out == ""
+
+
+def test_dataset_store__incremental_categorical(df, tmp_path):
+    df = df.astype({"name": "category"})
+    backend = FakeBackend(df)
+    store = _store(tmp_path, backend)
+    store.save("dataset", df.iloc[:2].astype({"name": object}).astype("category"))
+
+    out_df = store.read("dataset")
+
+    # The new rows bring new categories
+    assert isinstance(out_df["name"].dtype, pd.CategoricalDtype)
+    assert out_df["name"].tolist() == ["a", "b", "c", "d"]
+
+
+def test_dataset_store__validates_new_rows(df, m_datasets, tmp_path):
+    m_datasets["dataset"]["schema"] = {
+        "name": {"index": 0},
+        "date": {"index": 1, "type": "date"},
+    }
+    backend = FakeBackend(df)
+    backend.read_tail = mock.Mock(wraps=backend.read_tail)
+    store = _store(tmp_path, backend)
+    store.save("dataset", df.iloc[:2])
+
+    with mock.patch.object(
+        dataset_store.compile_schema(m_datasets["dataset"]["schema"]),
+        "validate",
+    ) as m_validate:
+        store.read("dataset")
+
+    # The new rows are validated once, by the store rather than the backend
+    assert backend.read_tail.call_args.kwargs["validate"] is False
+    m_validate.assert_called_once()
+    assert m_validate.call_args.kwargs == {"start": 2}
+    manifest = store.load_manifest("dataset")
+    assert manifest["validated"]["rows"] == 4
+
+
+def test_dataset_store__unvalidated_cached_rows(df, m_datasets, tmp_path):
+    m_datasets["other"]["schema"] = {
+        "name": {"index": 0},
+        "date": {"index": 1, "type": "date"},
+    }
+    store = _store(tmp_path, FakeBackend(df), source="local")
+    store.save("other", df.assign(name=[None, "b", "c", "d"]))
+    manifest = store.load_manifest("other")
+    store._write_manifest("other", {**manifest, "validated": None})
+
+    # The cached rows never passed the schema: they are validated and re-read
+    pd.testing.assert_frame_equal(store.read("other"), df)
+    assert store._backend.calls == ["read"]
+    assert store.load_manifest("other")["validated"]["rows"] == 4
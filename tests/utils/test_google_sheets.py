@@ -1,10 +1,25 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from unittest import mock
 
 import numpy as np
 import pandas as pd
+import pytest
 
+from ginnastix_class.utils.google_sheets import SheetsSession
+from ginnastix_class.utils.google_sheets import _chunk_rows
 from ginnastix_class.utils.google_sheets import _dataframe_to_gsheet_body
+from ginnastix_class.utils.google_sheets import _patch_sheet_properties
+from ginnastix_class.utils.google_sheets import append_dataset_rows
+from ginnastix_class.utils.google_sheets import flush_outbox
+from ginnastix_class.utils.google_sheets import get_sheet_id
 from ginnastix_class.utils.google_sheets import read_dataset
+from ginnastix_class.utils.google_sheets import read_dataset_fingerprints
+from ginnastix_class.utils.google_sheets import read_dataset_tail
+from ginnastix_class.utils.google_sheets import read_datasets
+from ginnastix_class.utils.google_sheets import swap_reload_dataset_rows
+from ginnastix_class.utils.google_sheets import sync_dataset_rows
+from ginnastix_class.utils.outbox import Outbox
 
 
 @mock.patch("ginnastix_class.utils.google_sheets._get_dataset_config")
@@ -42,6 +57,558 @@ def test_read_dataset(m_read_sheet_data, m_get_sheet, m__get_dataset_config):
     pd.testing.assert_frame_equal(out_df, expected_df)
 
 
+@mock.patch("ginnastix_class.utils.google_sheets._get_dataset_config")
+@mock.patch("ginnastix_class.utils.google_sheets.get_sheet")
+@mock.patch("ginnastix_class.utils.google_sheets.read_sheet_data")
+def test_read_dataset__outbox_key(
+    m_read_sheet_data, m_get_sheet, m__get_dataset_config
+):
+    m__get_dataset_config.return_value = {
+        "spreadsheet_id": "spreadsheet_id",
+        "sheet_range": "sheet_range",
+        "schema": {"col0": {"index": 0}, "col1": {"index": 1, "is_nullable": True}},
+    }
+    m_read_sheet_data.return_value = {
+        "values": [
+            ["col0", "col1", "Outbox Key"],
+            ["a", "x"],
+            ["b", "", "key"],
+        ]
+    }
+    out_df = read_dataset(dataset_name="dataset_name", credentials="credentials")
+    # The idempotency keys of rows written from the outbox are dropped
+    expected_df = pd.DataFrame({"col0": ["a", "b"], "col1": ["x", None]})
+    pd.testing.assert_frame_equal(out_df, expected_df)
+
+
+@mock.patch("ginnastix_class.utils.google_sheets._get_dataset_config")
+@mock.patch("ginnastix_class.utils.google_sheets.get_sheet")
+@mock.patch("ginnastix_class.utils.google_sheets.read_sheet_data")
+def test_read_dataset__unformatted(
+    m_read_sheet_data, m_get_sheet, m__get_dataset_config
+):
+    m__get_dataset_config.return_value = {
+        "spreadsheet_id": "spreadsheet_id",
+        "sheet_range": "sheet_range",
+        "value_render_option": "UNFORMATTED_VALUE",
+        "schema": {
+            "text": {"index": 0},
+            "score": {"index": 1, "dtype": "float"},
+            "date": {"index": 2, "dtype": "datetime64[ns]", "format": "%m/%d/%Y"},
+        },
+    }
+    m_read_sheet_data.return_value = {
+        "values": [
+            ["text", "score", "date"],
+            ["a", 0.5, 45658],
+            [7, 1, 45659],
+            [True, 2.25, "01/03/2025"],
+        ]
+    }
+    expected_df = pd.DataFrame(
+        {
+            "text": ["a", "7", "TRUE"],
+            "score": [0.5, 1.0, 2.25],
+            "date": pd.to_datetime(["2025-01-01", "2025-01-02", "2025-01-03"]),
+        }
+    )
+    out_df = read_dataset(dataset_name="dataset_name", credentials="credentials")
+    pd.testing.assert_frame_equal(out_df, expected_df)
+    assert m_read_sheet_data.call_args.kwargs["value_render_option"] == (
+        "UNFORMATTED_VALUE"
+    )
+
+
+@mock.patch("ginnastix_class.utils.google_sheets._get_dataset_config")
+@mock.patch("ginnastix_class.utils.google_sheets.get_sheet")
+@mock.patch("ginnastix_class.utils.google_sheets.read_sheet_data_batch")
+def test_read_dataset_tail(m_read_sheet_data_batch, m_get_sheet, m__get_dataset_config):
+    m__get_dataset_config.return_value = {
+        "spreadsheet_id": "spreadsheet_id",
+        "sheet_range": "Sheet",
+        "schema": {"a": {"index": 0}, "b": {"index": 1, "dtype": "int"}},
+    }
+    m_read_sheet_data_batch.return_value = {
+        "valueRanges": [
+            {"values": [["a", "b"]]},
+            {"values": [["x", "1"]]},
+            {"values": [["y", "2"], ["z", "3"]]},
+        ]
+    }
+    first_df, tail_df = read_dataset_tail(
+        "dataset_name", start=4, credentials="credentials"
+    )
+    pd.testing.assert_frame_equal(first_df, pd.DataFrame({"a": ["x"], "b": [1]}))
+    pd.testing.assert_frame_equal(tail_df, pd.DataFrame({"a": ["y", "z"], "b": [2, 3]}))
+    assert m_read_sheet_data_batch.call_args.kwargs["sheet_ranges"] == [
+        "'Sheet'!A1:B1",
+        "'Sheet'!A2:B2",
+        "'Sheet'!A6:B",
+    ]
+
+
+@mock.patch("ginnastix_class.utils.google_sheets._get_dataset_config")
+@mock.patch("ginnastix_class.utils.google_sheets.get_sheet")
+@mock.patch("ginnastix_class.utils.google_sheets.read_sheet_data_batch")
+def test_read_dataset_fingerprints(
+    m_read_sheet_data_batch, m_get_sheet, m__get_dataset_config
+):
+    m__get_dataset_config.side_effect = lambda name: {
+        "spreadsheet_id": "s1",
+        "sheet_range": name.title(),
+        "append_only": name == "a",
+        "schema": {"col0": {"index": 0}, "col1": {"index": 1}},
+    }
+    value_ranges = {"valueRanges": [{"values": [["x"]]}, {"values": [["x"]]}]}
+    m_read_sheet_data_batch.return_value = value_ranges
+    fingerprints = read_dataset_fingerprints(["a", "b"], credentials="credentials")
+    m_read_sheet_data_batch.assert_called_once_with(
+        m_get_sheet.return_value,
+        spreadsheet_id="s1",
+        sheet_ranges=["'A'!A:A", "'B'!A:B"],
+    )
+    assert fingerprints["a"] == fingerprints["b"]
+
+    m_read_sheet_data_batch.return_value = {"valueRanges": [{"values": [["x"], ["y"]]}]}
+    assert read_dataset_fingerprints(["b"], credentials="credentials") != {
+        "b": fingerprints["b"]
+    }
+
+
+@mock.patch("ginnastix_class.utils.google_sheets._get_dataset_config")
+@mock.patch("ginnastix_class.utils.google_sheets.get_sheet")
+@mock.patch("ginnastix_class.utils.google_sheets.read_sheet_data_batch")
+def test_read_dataset_fingerprints__cell_edit(
+    m_read_sheet_data_batch, m_get_sheet, m__get_dataset_config
+):
+    m__get_dataset_config.return_value = {
+        "spreadsheet_id": "s1",
+        "sheet_range": "Holidays",
+        "schema": {"Holiday": {"index": 0}, "No Practice": {"index": 1}},
+    }
+    # The columns of the schema are probed, so editing a cell outside the first
+    # column is detected
+    row = ["Labor Day", "TRUE"]
+    m_read_sheet_data_batch.return_value = {
+        "valueRanges": [{"values": [["Holiday", "No Practice"], row]}]
+    }
+    fingerprints = read_dataset_fingerprints(["holidays"], credentials="credentials")
+    assert m_read_sheet_data_batch.call_args.kwargs["sheet_ranges"] == [
+        "'Holidays'!A:B"
+    ]
+
+    row[1] = "FALSE"
+    assert (
+        read_dataset_fingerprints(["holidays"], credentials="credentials")
+        != fingerprints
+    )
+
+
+def test__dataframe_to_gsheet_body__datetime_format():
+    schema = {"date": {"dtype": "datetime64[ns]", "format": "%m/%d/%Y"}}
+    df = pd.DataFrame({"date": pd.to_datetime(["2025-01-02", None])})
+    res = _dataframe_to_gsheet_body(df, include_columns=True, schema=schema)
+    assert res == {"values": [["date"], ["01/02/2025"], [""]]}
+
+
+@mock.patch("ginnastix_class.utils.google_sheets._get_dataset_config")
+@mock.patch("ginnastix_class.utils.google_sheets.get_sheet")
+@mock.patch("ginnastix_class.utils.google_sheets.read_sheet_data_batch")
+def test_read_datasets(m_read_sheet_data_batch, m_get_sheet, m__get_dataset_config):
+    schema = {"col0": {"index": 0}, "col1": {"index": 1, "dtype": "int"}}
+    m__get_dataset_config.side_effect = lambda name: {
+        "a": {"spreadsheet_id": "s1", "sheet_range": "A", "schema": schema},
+        "b": {"spreadsheet_id": "s2", "sheet_range": "B", "schema": schema},
+        "c": {"spreadsheet_id": "s1", "sheet_range": "C", "schema": schema},
+    }[name]
+    m_read_sheet_data_batch.side_effect = lambda sheet, sheet_ranges, **kwargs: {
+        "valueRanges": [
+            {"values": [["col0", "col1"], [sheet_range, "1"]]}
+            for sheet_range in sheet_ranges
+        ]
+    }
+
+    out = read_datasets(["a", "b", "c"], credentials="credentials")
+
+    # One request per spreadsheet, each covering all of its datasets
+    assert m_read_sheet_data_batch.call_count == 2
+    m_read_sheet_data_batch.assert_any_call(
+        m_get_sheet.return_value,
+        spreadsheet_id="s1",
+        sheet_ranges=["A", "C"],
+        value_render_option=None,
+    )
+    m_read_sheet_data_batch.assert_any_call(
+        m_get_sheet.return_value,
+        spreadsheet_id="s2",
+        sheet_ranges=["B"],
+        value_render_option=None,
+    )
+    assert list(out) == ["a", "b", "c"]
+    for name, sheet_range in [("a", "A"), ("b", "B"), ("c", "C")]:
+        expected_df = pd.DataFrame({"col0": [sheet_range], "col1": [1]})
+        pd.testing.assert_frame_equal(out[name], expected_df)
+
+
+@mock.patch("ginnastix_class.utils.google_sheets.get_sheet")
+@mock.patch("ginnastix_class.utils.google_sheets.authenticate")
+def test_sheets_session(m_authenticate, m_get_sheet):
+    session = SheetsSession()
+    assert session.sheet is session.sheet
+    assert session.credentials is m_authenticate.return_value
+    m_authenticate.assert_called_once_with()
+    m_get_sheet.assert_called_once_with(m_authenticate.return_value)
+
+
+@mock.patch("ginnastix_class.utils.google_sheets.get_sheet")
+@mock.patch("ginnastix_class.utils.google_sheets.read_sheet_properties")
+def test_sheets_session__sheet_properties(m_read_sheet_properties, m_get_sheet):
+    m_read_sheet_properties.return_value = {
+        "sheets": [
+            {"properties": {"sheetId": 0, "title": "A", "index": 0}},
+            {"properties": {"sheetId": 7, "title": "B", "index": 1}},
+        ]
+    }
+    m_get_sheet.return_value.batchUpdate.return_value.execute.return_value = {
+        "replies": [
+            {
+                "duplicateSheet": {
+                    "properties": {"sheetId": 9, "title": "C", "index": 1}
+                }
+            },
+            {},
+        ]
+    }
+    session = SheetsSession(credentials="credentials")
+    assert get_sheet_id("s1", "A", session=session) == 0
+    assert get_sheet_id("s1", "B", session=session) == 7
+
+    session.batch_update(
+        "s1",
+        [
+            {"duplicateSheet": {"sourceSheetId": 0, "newSheetName": "C"}},
+            {"deleteSheet": {"sheetId": 0}},
+        ],
+    )
+    assert session.sheet_properties("s1") == {
+        "B": {"sheetId": 7, "title": "B", "index": 1},
+        "C": {"sheetId": 9, "title": "C", "index": 0},
+    }
+    m_read_sheet_properties.assert_called_once()
+
+
+def test__patch_sheet_properties():
+    sheet_properties = {
+        "A": {
+            "sheetId": 1,
+            "title": "A",
+            "index": 0,
+            "gridProperties": {"rowCount": 10, "columnCount": 3},
+        },
+    }
+    requests = [
+        {"addSheet": {"properties": {"title": "B"}}},
+        {
+            "updateSheetProperties": {
+                "properties": {"sheetId": 1, "title": "Z"},
+                "fields": "title",
+            }
+        },
+        {
+            "insertDimension": {
+                "range": {
+                    "sheetId": 1,
+                    "dimension": "ROWS",
+                    "startIndex": 2,
+                    "endIndex": 5,
+                }
+            }
+        },
+    ]
+    replies = [
+        {"addSheet": {"properties": {"sheetId": 2, "title": "B", "index": 1}}},
+        {},
+        {},
+    ]
+    _patch_sheet_properties(sheet_properties, requests, replies)
+    assert sheet_properties == {
+        "Z": {
+            "sheetId": 1,
+            "title": "Z",
+            "index": 0,
+            "gridProperties": {"rowCount": 13, "columnCount": 3},
+        },
+        "B": {"sheetId": 2, "title": "B", "index": 1},
+    }
+
+
+@pytest.fixture
+def m_session():
+    session = SheetsSession(credentials="credentials")
+    session._local.sheet = mock.MagicMock()
+    session._sheet_properties["s1"] = {
+        "Live": {"sheetId": 5, "title": "Live", "index": 2},
+    }
+    session.batch_update = mock.MagicMock()
+    return session
+
+
+@mock.patch("ginnastix_class.utils.google_sheets._get_dataset_config")
+def test_swap_reload_dataset_rows(m__get_dataset_config, m_session):
+    m__get_dataset_config.return_value = {
+        "spreadsheet_id": "s1",
+        "sheet_range": "Live",
+        "schema": {"col": {"index": 0}},
+    }
+    df = pd.DataFrame({"col": ["a", "b"]})
+    swap_reload_dataset_rows("dataset_name", df, session=m_session)
+
+    (stage_call, swap_call) = m_session.batch_update.call_args_list
+    duplicate = stage_call.args[1][0]["duplicateSheet"]
+    staging_sheet_id = duplicate["newSheetId"]
+    assert duplicate["sourceSheetId"] == 5
+    m_session.sheet.values().update.assert_called_once_with(
+        spreadsheetId="s1",
+        range=f"'{duplicate['newSheetName']}'!A1",
+        valueInputOption="USER_ENTERED",
+        body={"values": [["col"], ["a"], ["b"]]},
+    )
+    assert swap_call.args[1] == [
+        {"deleteSheet": {"sheetId": 5}},
+        {
+            "updateSheetProperties": {
+                "properties": {
+                    "sheetId": staging_sheet_id,
+                    "title": "Live",
+                    "index": 2,
+                },
+                "fields": "title,index",
+            }
+        },
+    ]
+
+
+@mock.patch("ginnastix_class.utils.google_sheets._get_dataset_config")
+def test_swap_reload_dataset_rows__rollback(m__get_dataset_config, m_session):
+    m__get_dataset_config.return_value = {
+        "spreadsheet_id": "s1",
+        "sheet_range": "Live",
+        "schema": {"col": {"index": 0}},
+    }
+    m_session.sheet.values().update().execute.side_effect = RuntimeError("boom")
+    df = pd.DataFrame({"col": ["a", "b"]})
+    with pytest.raises(RuntimeError):
+        swap_reload_dataset_rows("dataset_name", df, session=m_session)
+
+    # The staging sheet is removed and the live sheet is never touched
+    (stage_call, rollback_call) = m_session.batch_update.call_args_list
+    staging_sheet_id = stage_call.args[1][0]["duplicateSheet"]["newSheetId"]
+    assert rollback_call.args[1] == [{"deleteSheet": {"sheetId": staging_sheet_id}}]
+
+
+@mock.patch("ginnastix_class.utils.google_sheets._get_dataset_config")
+@mock.patch("ginnastix_class.utils.google_sheets.read_sheet_data")
+def test_sync_dataset_rows(m_read_sheet_data, m__get_dataset_config, m_session):
+    m__get_dataset_config.return_value = {
+        "spreadsheet_id": "s1",
+        "sheet_range": "Live",
+        "schema": {"key": {"index": 0}, "value": {"index": 1, "dtype": "float"}},
+    }
+    m_read_sheet_data.return_value = {
+        "values": [
+            ["key", "value"],
+            ["a", "1"],
+            ["b", "2"],  # deleted
+            ["c", "3"],  # changed
+            ["d", "4"],
+        ]
+    }
+    df = pd.DataFrame(
+        {"key": ["a", "c", "x", "d", "y"], "value": [1.0, 30.0, 5.0, 4.0, 6.0]}
+    )
+    sync_dataset_rows("dataset_name", df, key_columns=["key"], session=m_session)
+
+    m_session.batch_update.assert_called_once_with(
+        "s1",
+        [
+            {
+                "deleteDimension": {
+                    "range": {
+                        "sheetId": 5,
+                        "dimension": "ROWS",
+                        "startIndex": 2,
+                        "endIndex": 3,
+                    }
+                }
+            },
+            {
+                "insertDimension": {
+                    "range": {
+                        "sheetId": 5,
+                        "dimension": "ROWS",
+                        "startIndex": 3,
+                        "endIndex": 4,
+                    },
+                    "inheritFromBefore": True,
+                }
+            },
+            {
+                "insertDimension": {
+                    "range": {
+                        "sheetId": 5,
+                        "dimension": "ROWS",
+                        "startIndex": 5,
+                        "endIndex": 6,
+                    },
+                    "inheritFromBefore": True,
+                }
+            },
+        ],
+    )
+    m_session.sheet.values().batchUpdate.assert_called_once_with(
+        spreadsheetId="s1",
+        body={
+            "valueInputOption": "USER_ENTERED",
+            "data": [
+                {"range": "'Live'!B3:B3", "values": [["30.0"]]},
+                {"range": "'Live'!A4:B4", "values": [["x", "5.0"]]},
+                {"range": "'Live'!A6:B6", "values": [["y", "6.0"]]},
+            ],
+        },
+    )
+
+
+@mock.patch("ginnastix_class.utils.google_sheets.swap_reload_dataset_rows")
+@mock.patch("ginnastix_class.utils.google_sheets._get_dataset_config")
+@mock.patch("ginnastix_class.utils.google_sheets.read_sheet_data")
+def test_sync_dataset_rows__reordered(
+    m_read_sheet_data, m__get_dataset_config, m_swap_reload_dataset_rows, m_session
+):
+    m__get_dataset_config.return_value = {
+        "spreadsheet_id": "s1",
+        "sheet_range": "Live",
+        "schema": {"key": {"index": 0}},
+    }
+    m_read_sheet_data.return_value = {"values": [["key"], ["a"], ["b"]]}
+    df = pd.DataFrame({"key": ["b", "a"]})
+    sync_dataset_rows("dataset_name", df, key_columns=["key"], session=m_session)
+
+    m_swap_reload_dataset_rows.assert_called_once()
+    m_session.batch_update.assert_not_called()
+
+
+@mock.patch("ginnastix_class.utils.google_sheets._get_dataset_config")
+def test_append_dataset_rows__resume(m__get_dataset_config, m_session, tmp_path):
+    m__get_dataset_config.return_value = {
+        "spreadsheet_id": "s1",
+        "sheet_range": "Live",
+        "schema": {"col": {"index": 0}},
+    }
+    m_append = m_session.sheet.values().append
+    m_append().execute.side_effect = [
+        {"updates": {"updatedCells": 2}},
+        RuntimeError("interrupted"),
+    ]
+    m_append.reset_mock()
+    df = pd.DataFrame({"col": ["a", "b", "c", "d", "e"]})
+    kwargs = dict(session=m_session, max_rows=2, checkpoint_dir=tmp_path)
+
+    with pytest.raises(RuntimeError):
+        append_dataset_rows("dataset_name", df, **kwargs)
+    assert [c.kwargs["body"] for c in m_append.call_args_list] == [
+        {"values": [["a"], ["b"]]},
+        {"values": [["c"], ["d"]]},
+    ]
+
+    # Retrying only sends the rows after the last committed chunk
+    m_append().execute.side_effect = None
+    m_append().execute.return_value = {"updates": {"updatedCells": 2}}
+    m_append.reset_mock()
+    append_dataset_rows("dataset_name", df, **kwargs)
+    assert [c.kwargs["body"] for c in m_append.call_args_list] == [
+        {"values": [["c"], ["d"]]},
+        {"values": [["e"]]},
+    ]
+    assert not list(tmp_path.iterdir())
+
+
+@mock.patch("ginnastix_class.utils.google_sheets._get_dataset_config")
+def test_append_dataset_rows__sheet_properties(m__get_dataset_config, m_session):
+    m__get_dataset_config.return_value = {
+        "spreadsheet_id": "s1",
+        "sheet_range": "Live",
+        "schema": {"col": {"index": 0}},
+    }
+    m_session.sheet.values().append().execute.return_value = {
+        "updates": {"updatedCells": 1}
+    }
+
+    append_dataset_rows("dataset_name", pd.DataFrame({"col": ["a"]}), session=m_session)
+
+    # The appended rows changed the grid size: properties are read again
+    assert "s1" not in m_session._sheet_properties
+
+
+def test__chunk_rows():
+    values = [["aaaa"], ["b"], ["c"], ["dddd"]]
+    assert list(_chunk_rows(values, max_rows=3, max_bytes=100)) == [
+        [["aaaa"], ["b"], ["c"]],
+        [["dddd"]],
+    ]
+    # ["aaaa"] is 8 bytes of JSON (+1 separator), ["b"] is 5 (+1)
+    assert list(_chunk_rows(values, max_rows=3, max_bytes=15)) == [
+        [["aaaa"], ["b"]],
+        [["c"], ["dddd"]],
+    ]
+
+
+@mock.patch("ginnastix_class.utils.google_sheets._get_dataset_config")
+@mock.patch("ginnastix_class.utils.google_sheets.get_sheet")
+@mock.patch("ginnastix_class.utils.google_sheets.read_sheet_data_batch")
+def test_read_datasets__concurrent(
+    m_read_sheet_data_batch, m_get_sheet, m__get_dataset_config
+):
+    m__get_dataset_config.side_effect = lambda name: {
+        "spreadsheet_id": name,
+        "sheet_range": name,
+        "schema": {"col": {"index": 0}},
+    }
+    # Every request waits for the others, so this only completes if the
+    # spreadsheets are read concurrently
+    barrier = threading.Barrier(3, timeout=5)
+
+    def read_sheet_data_batch(sheet, spreadsheet_id, sheet_ranges, **kwargs):
+        barrier.wait()
+        return {"valueRanges": [{"values": [["col"], [spreadsheet_id]]}]}
+
+    m_read_sheet_data_batch.side_effect = read_sheet_data_batch
+    out = read_datasets(["a", "b", "c"], credentials="credentials", max_workers=3)
+    assert {name: df["col"].tolist() for name, df in out.items()} == {
+        "a": ["a"],
+        "b": ["b"],
+        "c": ["c"],
+    }
+
+
+@mock.patch("ginnastix_class.utils.google_sheets.get_sheet")
+def test_sheets_session__thread_local_sheet(m_get_sheet):
+    m_get_sheet.side_effect = lambda credentials: object()
+    session = SheetsSession(credentials="credentials")
+    barrier = threading.Barrier(2, timeout=5)
+
+    def get_sheets():
+        barrier.wait()
+        return session.sheet, session.sheet
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(get_sheets) for _ in range(2)]
+        first, second = [future.result() for future in futures]
+    # One resource per thread, reused within the thread
+    assert first[0] is first[1]
+    assert first[0] is not second[0]
+    assert m_get_sheet.call_count == 2
+
+
 def test__dataframe_to_gsheet_body():
     df = pd.DataFrame(
         {
@@ -52,3 +619,117 @@ def test__dataframe_to_gsheet_body():
     )
     res = _dataframe_to_gsheet_body(df)
     assert res == {"values": [["1"], ["2.0"], ["three"], [""], [""], [""], [""], [""]]}
+
+
+def test__dataframe_to_gsheet_body__dtypes():
+    df = pd.DataFrame(
+        {
+            "int": [1, 2, 1],
+            "bool": [True, False, True],
+            "float": [0.5, np.nan, 0.1 + 0.2],
+            "nullable_int": pd.array([1, None, 3], dtype="Int64"),
+            "datetime": pd.to_datetime(
+                ["2025-01-01", None, "2025-01-02 03:04:05"], format="ISO8601"
+            ),
+            "category": pd.Categorical(["x", None, "x"]),
+        }
+    )
+    res = _dataframe_to_gsheet_body(df)
+    assert res == {
+        "values": [
+            ["1", "True", "0.5", "1", "2025-01-01 00:00:00", "x"],
+            ["2", "False", "", "", "", ""],
+            ["1", "True", "0.30000000000000004", "3", "2025-01-02 03:04:05", "x"],
+        ]
+    }
+
+
+@mock.patch("ginnastix_class.utils.google_sheets.read_sheet_data")
+@mock.patch("ginnastix_class.utils.google_sheets._get_dataset_config")
+def test_flush_outbox(m__get_dataset_config, m_read_sheet_data, m_session, tmp_path):
+    m__get_dataset_config.return_value = {
+        "spreadsheet_id": "s1",
+        "sheet_range": "Live",
+        "schema": {"col0": {"index": 0}, "col1": {"index": 1}},
+    }
+    m_session._sheet_properties["s1"]["Live"]["gridProperties"] = {"columnCount": 2}
+    m_append = m_session.sheet.values().append
+    m_append().execute.return_value = {"updates": {"updatedCells": 1}}
+    m_append.reset_mock()
+    outbox = Outbox(tmp_path / "outbox.sqlite3")
+    key_a, key_b = outbox.enqueue("attendance", [[["a"]], [["b", "x"]]])
+
+    # A batch left behind by an interrupted flush, that did not reach the sheet
+    outbox.abandon(outbox.claim("attendance", max_rows=2, max_bytes=100)[0])
+    m_read_sheet_data.side_effect = lambda sheet, spreadsheet_id, sheet_range: {
+        "'Live'!1:1": {"values": [["col0", "col1"]]},
+        "'Live'!C2:C": {},
+    }[sheet_range]
+
+    assert flush_outbox(outbox, session=m_session) == {"attendance": 2}
+    # The rows are sent again, with their keys in a new hidden column
+    assert [c.kwargs["body"] for c in m_append.call_args_list] == [
+        {"values": [["a", "", f"'{key_a}"], ["b", "x", f"'{key_b}"]]}
+    ]
+    (requests,) = m_session.batch_update.call_args.args[1:]
+    assert [next(iter(request)) for request in requests] == [
+        "appendDimension",
+        "updateCells",
+        "updateDimensionProperties",
+    ]
+    assert requests[1]["updateCells"]["start"]["columnIndex"] == 2
+    assert outbox.pending() == {}
+
+
+@mock.patch("ginnastix_class.utils.google_sheets.read_sheet_data")
+@mock.patch("ginnastix_class.utils.google_sheets._get_dataset_config")
+def test_flush_outbox__stale_batch_written(
+    m__get_dataset_config, m_read_sheet_data, m_session, tmp_path
+):
+    m__get_dataset_config.return_value = {
+        "spreadsheet_id": "s1",
+        "sheet_range": "Live",
+        "schema": {"col": {"index": 0}},
+    }
+    m_append = m_session.sheet.values().append
+    m_append().execute.return_value = {"updates": {"updatedCells": 1}}
+    m_append.reset_mock()
+    outbox = Outbox(tmp_path / "outbox.sqlite3")
+    key_a, key_b = outbox.enqueue("attendance", [[["a"]], [["b"]]])
+
+    # A batch written by an interrupted flush, followed in the sheet by rows
+    # appended directly
+    outbox.abandon(outbox.claim("attendance", max_rows=1, max_bytes=100)[0])
+    m_read_sheet_data.side_effect = lambda sheet, spreadsheet_id, sheet_range: {
+        "'Live'!1:1": {"values": [["col", "Outbox Key"]]},
+        "'Live'!B2:B": {"values": [[], [key_a], [], []]},
+    }[sheet_range]
+
+    assert flush_outbox(outbox, session=m_session) == {"attendance": 1}
+    assert [c.kwargs["body"] for c in m_append.call_args_list] == [
+        {"values": [["b", f"'{key_b}"]]}
+    ]
+    m_session.batch_update.assert_not_called()
+    assert outbox.pending() == {}
+
+
+@mock.patch("ginnastix_class.utils.google_sheets.get_outbox_flusher")
+@mock.patch("ginnastix_class.utils.google_sheets.get_outbox")
+@mock.patch("ginnastix_class.utils.google_sheets._get_dataset_config")
+def test_append_dataset_rows__deferred(
+    m__get_dataset_config, m_get_outbox, m_get_outbox_flusher, m_session, tmp_path
+):
+    m__get_dataset_config.return_value = {
+        "spreadsheet_id": "s1",
+        "sheet_range": "Live",
+        "schema": {"col": {"index": 0}},
+    }
+    outbox = Outbox(tmp_path / "outbox.sqlite3")
+    m_get_outbox.return_value = outbox
+    df = pd.DataFrame({"col": ["a", "b", "c"]})
+
+    append_dataset_rows("attendance", df, session=m_session, max_rows=2, deferred=True)
+
+    m_session.sheet.values().append.assert_not_called()
+    m_get_outbox_flusher.return_value.wake.assert_called_once()
+    assert outbox.pending() == {"attendance": 3}
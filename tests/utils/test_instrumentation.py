@@ -0,0 +1,53 @@
+import json
+from unittest import mock
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from ginnastix_class.utils.instrumentation import Instrumentation
+from ginnastix_class.utils.instrumentation import tags_dataset
+from ginnastix_class.utils.request_executor import RequestExecutor
+
+
+class FakeRequest:
+    methodId = "sheets.spreadsheets.values.batchGet"
+    uri = "https://sheets.googleapis.com/v4/spreadsheets/s1/values:batchGet?ranges=A"
+    body = None
+
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+
+    def execute(self):
+        if self.statuses:
+            resp = httplib2.Response({"status": self.statuses.pop(0)})
+            raise HttpError(resp, b"{}")
+        return {"valueRanges": [{"values": [["a", "b"], ["c"]]}, {}]}
+
+
+def test_instrumentation(tmp_path):
+    instrumentation = Instrumentation(tmp_path / "calls.jsonl")
+    executor = RequestExecutor(sleep=lambda seconds: None)
+
+    @tags_dataset
+    def read(dataset_names):
+        return executor.execute(FakeRequest(statuses=[503]))
+
+    with mock.patch(
+        "ginnastix_class.utils.request_executor.get_instrumentation",
+        return_value=instrumentation,
+    ):
+        read(dataset_names=["students", "levels"])
+
+    with open(tmp_path / "calls.jsonl") as f:
+        (record,) = [json.loads(line) for line in f]
+    assert record["operation"] == "spreadsheets.values.batchGet"
+    assert record["dataset"] == "students,levels"
+    assert record["spreadsheet_id"] == "s1"
+    assert record["cells"] == 3
+    assert record["retries"] == 1
+    assert record["request_bytes"] == 0
+    assert record["response_bytes"] > 0
+    assert record["error"] is None
+
+    summary = instrumentation.summary()
+    assert "spreadsheets.values.batchGet" in summary.splitlines()[2]
@@ -0,0 +1,100 @@
+from unittest import mock
+
+import pandas as pd
+import pytest
+
+from ginnastix_class.config.datasets import DATASETS
+from ginnastix_class.utils.integrity import check_integrity
+from ginnastix_class.utils.integrity import find_orphans
+from ginnastix_class.utils.integrity import foreign_keys
+
+
+@pytest.fixture(autouse=True)
+def m_datasets():
+    student = {"dataset": "students", "column": "Student"}
+    datasets = {
+        "students": {},
+        "skills": {},
+        "evaluation": {
+            "foreign_keys": {
+                "Athlete": student,
+                "Skill ID": {"dataset": "skills", "column": "Skill ID"},
+            }
+        },
+        "scores": {"data_index": 2, "foreign_keys": {"Athlete": student}},
+    }
+    with mock.patch("ginnastix_class.utils.integrity.DATASETS", datasets) as m:
+        yield m
+
+
+@pytest.fixture
+def dfs():
+    return {
+        "students": pd.DataFrame({"Student": ["Ann", "Bea"], "DOB": ["", ""]}),
+        "skills": pd.DataFrame({"Skill ID": ["BB-1", "VT-1"]}),
+        "evaluation": pd.DataFrame(
+            {
+                "Athlete": pd.Categorical(["Ann", "Cat", None, "Cat", "Bea"]),
+                "Skill ID": ["BB-1", "VT-1", "UB-9", None, "VT-1"],
+            }
+        ),
+        "scores": pd.DataFrame({"Athlete": ["Bea", "Dee"]}),
+    }
+
+
+def test_foreign_keys():
+    assert foreign_keys(["scores"]) == [("scores", "Athlete", "students", "Student")]
+    assert len(foreign_keys()) == 3
+
+
+def test_find_orphans(dfs):
+    results = find_orphans(dfs, foreign_keys())
+
+    assert results == [
+        {
+            "dataset": "evaluation",
+            "column": "Athlete",
+            "references": "students.Student",
+            "orphans": {"Cat": [3, 5]},
+        },
+        {
+            "dataset": "evaluation",
+            "column": "Skill ID",
+            "references": "skills.Skill ID",
+            "orphans": {"UB-9": [4]},
+        },
+        {
+            "dataset": "scores",
+            "column": "Athlete",
+            "references": "students.Student",
+            "orphans": {"Dee": [4]},
+        },
+    ]
+
+
+def test_find_orphans__valid(dfs):
+    dfs["students"].loc[2] = ["Cat", ""]
+    dfs["students"].loc[3] = ["Dee", ""]
+    dfs["skills"].loc[2] = ["UB-9"]
+
+    assert find_orphans(dfs, foreign_keys()) == []
+
+
+def test_check_integrity(dfs):
+    store = mock.Mock()
+    store.load.return_value = dfs
+
+    results = check_integrity(["scores"], store=store)
+
+    store.load.assert_called_once_with(
+        ["scores", "students"],
+        columns={"scores": ["Athlete"], "students": ["Student"]},
+    )
+    assert [result["orphans"] for result in results] == [{"Dee": [4]}]
+
+
+def test_foreign_keys__config():
+    for name, dataset_cfg in DATASETS.items():
+        for column, reference in dataset_cfg.get("foreign_keys", {}).items():
+            assert column in dataset_cfg["schema"]
+            assert reference["column"] in DATASETS[reference["dataset"]]["schema"]
@@ -0,0 +1,46 @@
+import pytest
+
+from ginnastix_class.utils.outbox import Outbox
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    return Outbox(tmp_path / "outbox.sqlite3", lease=60, clock=lambda: 1000.0)
+
+
+def test_outbox__claim_coalesces(outbox):
+    outbox.enqueue("attendance", [[["a"], ["b"]], [["c"]]])
+    outbox.enqueue("attendance", [[["d"], ["e"]]])
+    outbox.enqueue("skill_evaluation", [[["x"]]])
+    assert outbox.pending() == {"attendance": 5, "skill_evaluation": 1}
+
+    batch_id, rows, keys, stale = outbox.claim("attendance", max_rows=3, max_bytes=100)
+    assert rows == [["a"], ["b"], ["c"]]
+    # One idempotency key per entry, repeated for each of its rows
+    assert keys[0] == keys[1] != keys[2]
+    assert not stale
+    # The next batch waits until the claimed one is written
+    assert outbox.claim("attendance", max_rows=3, max_bytes=100) is None
+
+    outbox.complete(batch_id)
+    _, rows, _, _ = outbox.claim("attendance", max_rows=3, max_bytes=100)
+    assert rows == [["d"], ["e"]]
+    assert outbox.pending() == {"attendance": 2, "skill_evaluation": 1}
+
+
+def test_outbox__stale_batch(outbox):
+    outbox.enqueue("attendance", [[["a"]], [["b"]]])
+    batch_id, _, keys, _ = outbox.claim("attendance", max_rows=1, max_bytes=100)
+
+    # An abandoned batch is claimed again, first, and flagged as stale
+    outbox.abandon(batch_id)
+    assert outbox.claim("attendance", max_rows=1, max_bytes=100) == (
+        batch_id,
+        [["a"]],
+        keys,
+        True,
+    )
+
+    # So is a batch whose lease expired
+    outbox._clock = lambda: 1061.0
+    assert outbox.claim("attendance", max_rows=1, max_bytes=100)[3]
@@ -0,0 +1,134 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from ginnastix_class.utils import request_executor
+from ginnastix_class.utils.progress import quiet
+from ginnastix_class.utils.request_executor import RequestExecutor
+from ginnastix_class.utils.request_executor import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeRequest:
+    """Request that fails with the given HTTP statuses before succeeding."""
+
+    def __init__(self, statuses, headers=None):
+        self.statuses = list(statuses)
+        self.headers = headers or {}
+        self.calls = 0
+
+    def execute(self):
+        self.calls += 1
+        if self.statuses:
+            status = self.statuses.pop(0)
+            resp = httplib2.Response({"status": status, **self.headers})
+            raise HttpError(resp, b"{}")
+        return {"ok": True}
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_token_bucket(clock):
+    bucket = TokenBucket(rate=60, period=60, capacity=2, clock=clock, sleep=clock.sleep)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    # Bucket is empty: wait for one token to refill (1 token per second)
+    assert bucket.acquire() == pytest.approx(1)
+    assert clock.sleeps == [pytest.approx(1)]
+
+
+def test_request_executor__retry_after(clock):
+    executor = RequestExecutor(clock=clock, sleep=clock.sleep)
+    request = FakeRequest([429, 429], headers={"retry-after": "7"})
+    assert executor.execute(request) == {"ok": True}
+    assert request.calls == 3
+    assert clock.sleeps == [7, 7]
+    assert executor.stats == {"calls": 3, "throttled": 2, "retried": 2}
+
+
+def test_request_executor__backoff(clock):
+    executor = RequestExecutor(max_delay=4, clock=clock, sleep=clock.sleep)
+    request = FakeRequest([503, 500, 502, 503])
+    assert executor.execute(request) == {"ok": True}
+    # Jittered delays never exceed the exponential (capped) backoff
+    for attempt, delay in enumerate(clock.sleeps):
+        assert 0 <= delay <= min(4, 2**attempt)
+    assert executor.stats == {"calls": 5, "retried": 4}
+
+
+def test_request_executor__gives_up(clock):
+    executor = RequestExecutor(max_retries=2, clock=clock, sleep=clock.sleep)
+    request = FakeRequest([429, 429, 429, 429])
+    with pytest.raises(HttpError):
+        executor.execute(request)
+    assert request.calls == 3
+    assert executor.stats["failed"] == 1
+
+
+def test_request_executor__not_retryable(clock):
+    executor = RequestExecutor(clock=clock, sleep=clock.sleep)
+    request = FakeRequest([400])
+    with pytest.raises(HttpError):
+        executor.execute(request)
+    assert request.calls == 1
+    assert clock.sleeps == []
+
+
+def test_request_executor__write_not_retried(clock):
+    executor = RequestExecutor(clock=clock, sleep=clock.sleep)
+    # The write may have been applied: retrying could duplicate it
+    request = FakeRequest([503])
+    with pytest.raises(HttpError):
+        executor.execute(request, kind="write")
+    assert request.calls == 1
+    assert clock.sleeps == []
+
+    # A throttled write was not applied and is retried
+    request = FakeRequest([429])
+    assert executor.execute(request, kind="write") == {"ok": True}
+    assert request.calls == 2
+
+
+def test_request_executor__quiet_retries(clock, capsys):
+    executor = RequestExecutor(clock=clock, sleep=clock.sleep)
+    with quiet():
+        assert executor.execute(FakeRequest([503])) == {"ok": True}
+    # Retries in a silenced (background) thread are counted, not printed
+    assert capsys.readouterr().out == ""
+    assert executor.stats["retried"] == 1
+
+    executor.execute(FakeRequest([503]))
+    assert "Retrying Google Sheets request" in capsys.readouterr().out
+
+
+def test_get_executor__shared(monkeypatch):
+    monkeypatch.setattr(request_executor, "_executor", None)
+    barrier = threading.Barrier(4, timeout=5)
+
+    def get():
+        barrier.wait()
+        return request_executor.get_executor()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(get) for _ in range(4)]
+        executors = [future.result() for future in futures]
+    # Threads making their first request at once share the same buckets
+    assert all(executor is executors[0] for executor in executors)
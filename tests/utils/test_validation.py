@@ -2,6 +2,7 @@ import numpy as np
 import pandas as pd
 import pytest
 
+from ginnastix_class.utils.validation import compile_schema
 from ginnastix_class.utils.validation import standardize
 from ginnastix_class.utils.validation import validate_dataset
 
@@ -143,3 +144,122 @@ def test_standardize():
     )
     out_df = standardize(in_df, schema)
     pd.testing.assert_frame_equal(out_df, expected_df)
+
+
+def test_standardize__compact_dtypes():
+    schema = {
+        "category": {"dtype": "category"},
+        "string": {"dtype": "string[pyarrow]"},
+        "float32": {"dtype": "float32"},
+        "int8": {"dtype": "Int8"},
+    }
+    in_df = pd.DataFrame(
+        {
+            "category": pd.Series(["Yes", "No", "", "Yes"], dtype=object),
+            "string": pd.Series(["note", "", None, "other"], dtype=object),
+            "float32": pd.Series([0.5, "", 1, 2.25], dtype=object),
+            "int8": pd.Series([1, "", 3, 4], dtype=object),
+        }
+    )
+    expected_df = pd.DataFrame(
+        {
+            "category": pd.Categorical(["Yes", "No", None, "Yes"]),
+            "string": pd.Series(["note", None, None, "other"], dtype="string[pyarrow]"),
+            "float32": pd.Series([0.5, np.nan, 1, 2.25], dtype="float32"),
+            "int8": pd.Series([1, None, 3, 4], dtype="Int8"),
+        }
+    )
+    out_df = standardize(in_df, schema)
+    pd.testing.assert_frame_equal(out_df, expected_df)
+    validate_dataset(
+        out_df,
+        {
+            name: {**spec, "index": i, "is_nullable": True}
+            for i, (name, spec) in enumerate(schema.items())
+        },
+    )
+
+
+def test_standardize__datetime():
+    schema = {
+        "date": {"dtype": "datetime64[ns]", "format": "%m/%d/%Y"},
+        "ts": {"dtype": "datetime64[ns]", "format": "%Y-%m-%d %H:%M:%S"},
+    }
+    in_df = pd.DataFrame(
+        {
+            # serial numbers (UNFORMATTED_VALUE), text and blanks
+            "date": pd.Series([45658, "01/02/2025", ""], dtype=object),
+            "ts": pd.Series([45658.5, "2025-01-02 03:04:05", None], dtype=object),
+        }
+    )
+    expected_df = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2025-01-01", "2025-01-02", None]),
+            "ts": pd.to_datetime(["2025-01-01 12:00:00", "2025-01-02 03:04:05", None]),
+        }
+    )
+    out_df = standardize(in_df, schema)
+    pd.testing.assert_frame_equal(out_df, expected_df)
+
+
+def test_standardize__column_types():
+    schema = {
+        "date": {"index": 0, "type": "date"},
+        "ts": {"index": 1, "type": "datetime"},
+        "flag": {"index": 2, "type": "bool", "is_nullable": True},
+        "answer": {"index": 3, "type": "enum", "values": ["Yes", "No"]},
+    }
+    in_df = pd.DataFrame(
+        {
+            "date": pd.Series([45658, "01/02/2025", "01/03/2025"], dtype=object),
+            "ts": pd.Series(["2025-01-02 03:04:05", 45658.5, 45659], dtype=object),
+            "flag": pd.Series(["TRUE", "false", ""], dtype=object),
+            "answer": pd.Series(["Yes", "No", "Yes"], dtype=object),
+        }
+    )
+    expected_df = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2025-01-01", "2025-01-02", "2025-01-03"]),
+            "ts": pd.to_datetime(
+                ["2025-01-02 03:04:05", "2025-01-01 12:00:00", "2025-01-02 00:00:00"]
+            ),
+            "flag": pd.Series([True, False, None], dtype="boolean"),
+            "answer": pd.Categorical(["Yes", "No", "Yes"], categories=["Yes", "No"]),
+        }
+    )
+    out_df = standardize(in_df, schema)
+    pd.testing.assert_frame_equal(out_df, expected_df)
+    validate_dataset(out_df, schema)
+
+
+def test_validate_dataset__invalid_values():
+    schema = {
+        "flag": {"index": 0, "type": "bool"},
+        "answer": {"index": 1, "type": "enum", "values": ["Yes", "No"]},
+    }
+    in_df = pd.DataFrame(
+        {
+            "flag": pd.Series(["TRUE", "maybe"], dtype=object),
+            "answer": pd.Series(["Yes", "Perhaps"], dtype=object),
+        }
+    )
+    with pytest.raises(Exception) as e:
+        validate_dataset(standardize(in_df, schema), schema)
+    assert "Column 'flag' has invalid values: ['maybe']" in str(e.value)
+    assert "Column 'answer' has invalid values: ['Perhaps']" in str(e.value)
+
+
+def test_compile_schema():
+    schema = {"col": {"index": 0, "type": "date"}}
+    assert compile_schema(schema) is compile_schema(dict(schema))
+    with pytest.raises(ValueError):
+        compile_schema({"col": {"index": 0, "type": "money"}})
+
+
+def test_validate_dataset__start():
+    schema = {"col": {"index": 0}}
+    df = pd.DataFrame({"col": pd.Series([None, "a", "b"], dtype=object)})
+    validate_dataset(df, schema, start=1)
+    with pytest.raises(Exception) as e:
+        validate_dataset(df, schema)
+    assert "Column 'col' has 1 missing values" in str(e.value)